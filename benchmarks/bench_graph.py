@@ -0,0 +1,92 @@
+"""
+在合成的 1M 条引用边上测量 ReferenceGraph 的构建、查询与增量更新耗时，
+并与逐篇递归查询（dict-of-sets 模拟每篇一次 SELECT）的内存占用对比。
+不需要数据库，运行方式（在项目根目录）：
+    python -m benchmarks.bench_graph [edges] [posts]
+"""
+import gc
+import random
+import sys
+import time
+import tracemalloc
+
+from dao.reference_graph import ReferenceGraph
+
+
+def _rows(edges: int, posts: int, seed: int = 7):
+    rng = random.Random(seed)
+    cids = [f"c{i:07d}" for i in range(posts)]
+    rows = []
+    for _ in range(edges):
+        # 偏向引用较早的文章，接近真实的引用分布
+        u = rng.randrange(posts)
+        v = int(rng.random() ** 2 * posts)
+        rows.append((cids[u], cids[v]))
+    rows += [(cid, None) for cid in cids]
+    return cids, rows
+
+
+def _timed(label: str, fn, repeat: int = 1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{label:<28} {elapsed * 1000:10.3f} ms")
+    return result
+
+
+def main():
+    edges = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    posts = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+    cids, rows = _rows(edges, posts)
+    rng = random.Random(1)
+    sample = [rng.choice(cids) for _ in range(1000)]
+
+    graph = ReferenceGraph()
+    start = time.perf_counter()
+    graph.load_rows(rows)
+    build = time.perf_counter() - start
+    print(f"graph      {posts} posts, {graph.edge_count()} edges")
+    print(f"{'build':<28} {build * 1000:10.3f} ms")
+
+    # tracemalloc 会显著拖慢构建，内存单独再构建一次测量
+    gc.collect()
+    tracemalloc.start()
+    measured = ReferenceGraph()
+    measured.load_rows(rows)
+    graph_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del measured
+    print(f"{'memory (graph)':<28} {graph_bytes / 1024 / 1024:10.1f} MiB")
+
+    gc.collect()
+    tracemalloc.start()
+    baseline: dict[str, set[str]] = {}
+    for u, v in rows:
+        if v is not None:
+            baseline.setdefault(u, set()).add(v)
+    baseline_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{'memory (dict of sets)':<28} {baseline_bytes / 1024 / 1024:10.1f} MiB")
+    del baseline
+
+    _timed("references x1000", lambda: [graph.references(c) for c in sample])
+    _timed("cited_by x1000", lambda: [graph.cited_by(c) for c in sample])
+    deps = _timed("dependencies (depth 2)", lambda: graph.dependencies(sample[0], max_depth=2))
+    print(f"{'':<28} {len(deps)} posts reached")
+    closure = _timed("dependencies (full)", lambda: graph.dependencies(sample[1]))
+    print(f"{'':<28} {len(closure)} posts reached")
+    cycles = _timed("cycles", graph.cycles)
+    print(f"{'':<28} {len(cycles)} cycles, largest {max(map(len, cycles), default=0)} posts")
+    _timed("dangling + orphans", lambda: (graph.dangling(), graph.orphans()))
+
+    start = time.perf_counter()
+    for i in range(10_000):
+        graph.add_edge(sample[i % 1000], cids[i % posts])
+        graph.remove_edge(sample[(i + 1) % 1000], cids[i % posts])
+    update = time.perf_counter() - start
+    print(f"{'add+remove':<28} {update / 20_000 * 1e6:10.3f} us/op (incl. compaction)")
+
+
+if __name__ == "__main__":
+    main()
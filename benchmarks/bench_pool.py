@@ -0,0 +1,52 @@
+"""
+对比 post_* 接口在「每次调用新建连接」与「连接池」两种模式下的耗时。
+需要本地 MySQL 已按 dao/init.sql 初始化，运行方式（在项目根目录）：
+    python -m benchmarks.bench_pool [rounds]
+"""
+import sys
+import time
+import uuid
+
+from core import auth, post
+from dao.factory import configure_pool, connection
+
+
+def _run_round(token: str) -> None:
+    cid = post.post_create(token)
+    post.post_update(token, cid, "title", f"bench-{cid}")
+    post.post_update(token, cid, "context", "# bench\n\nbody")
+    post.post_get(token, cid, "title")
+    post.post_list(token, 10)
+    post.post_delete(token, cid)
+
+
+def _measure(label: str, token: str, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        _run_round(token)
+    elapsed = time.perf_counter() - start
+    calls = rounds * 6
+    print(f"{label:<10} {elapsed:8.3f}s  {calls / elapsed:8.1f} calls/s  {elapsed / calls * 1000:6.2f} ms/call")
+    return elapsed
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    username = f"bench_{uuid.uuid4().hex[:8]}"
+    user_id = auth.user_register(username, "bench")
+    token = auth.user_login(username, "bench")
+    try:
+        configure_pool(enabled=False)
+        direct = _measure("connect", token, rounds)
+        configure_pool(enabled=True)
+        pooled = _measure("pool", token, rounds)
+        print(f"speedup    {direct / pooled:8.2f}x")
+    finally:
+        with connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM users WHERE id = %s", (user_id,))
+            conn.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+对比 slugify（预编译正则 + 缓存）与原先逐次 replace 循环的 safe_title，并逐条校验输出一致。
+不需要数据库，运行方式（在项目根目录）：
+    python -m benchmarks.bench_slug [titles]
+titles 超过 CACHE_CONFIG["slug_size"] 时缓存频繁淘汰，memoized 一栏将接近 uncached。
+"""
+import random
+import sys
+import time
+import urllib.parse
+
+from core.url_manager import slugify
+
+_PIECES = ["静态", "站点", "生成器", "数据库", "MySQL", "Python", "cache", "v2.0", "C++", "100%",
+           "a&b", "问题?", "#1", "emoji😀", "Ünïcödé", " ", "  ", "/", "\\", "-", "--", " - ", "\t", "　"]
+
+
+def _reference(title: str) -> str:
+    """改写前的 safe_title 实现，作为对照。"""
+    if not title:
+        return "untitled"
+    safe = title.strip()
+    safe = safe.replace(" ", "-").replace("/", "-").replace("\\", "-")
+    while "--" in safe:
+        safe = safe.replace("--", "-")
+    return urllib.parse.quote(safe)
+
+
+_WORDS = ["Building", "a", "static", "site", "with", "Python", "and", "MySQL", "Part", "notes", "on", "caching"]
+
+
+def _titles(n: int, seed: int = 3) -> list[str]:
+    """刻意构造的边界情况：混合分隔符、CJK、emoji、需要转义的符号。"""
+    rng = random.Random(seed)
+    return ["".join(rng.choice(_PIECES) for _ in range(rng.randint(0, 12))) for _ in range(n)]
+
+
+def _ascii_titles(n: int, seed: int = 4) -> list[str]:
+    """常见的英文标题，无需转义。"""
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(_WORDS) for _ in range(rng.randint(2, 8))) + f" {i}" for i in range(n)]
+
+
+def _timed(label: str, fn, titles: list[str]) -> float:
+    start = time.perf_counter()
+    for title in titles:
+        fn(title)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed / len(titles) * 1e6:10.3f} us/title")
+    return elapsed
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    for name, titles in (("mixed", _titles(n)), ("ascii", _ascii_titles(n))):
+        mismatches = [t for t in titles if slugify(t) != _reference(t)]
+        if mismatches:
+            raise SystemExit(f"{len(mismatches)} mismatches, e.g. {mismatches[0]!r}")
+        print(f"{name:<10} {n} titles, output identical")
+
+        # 重建时同一标题会被多次计算（页面、索引、映射），这里每个标题重复 4 次
+        workload = titles * 4
+        random.Random(5).shuffle(workload)
+        base = _timed("reference", _reference, workload)
+        cold = _timed("slugify (uncached)", slugify.__wrapped__, workload)
+        slugify.cache_clear()
+        warm = _timed("slugify (memoized)", slugify, workload)
+        print(f"{'speedup':<28} {base / cold:10.1f}x uncached, {base / warm:.1f}x memoized")
+
+
+if __name__ == "__main__":
+    main()
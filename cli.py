@@ -1,9 +1,23 @@
 import argparse
 import sys
-from core import auth, post
+from core import auth, exporter, importer, post
 from server import manager as server_manager
 from client import store
 
+def _positive_int(value: str) -> int:
+    """argparse 类型：正整数（分页大小等）。"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+def _non_negative_int(value: str) -> int:
+    """argparse 类型：非负整数（偏移量等）。"""
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be a non-negative integer, got {value}")
+    return number
+
 def main():
     parser = argparse.ArgumentParser(description="MegaCite CLI Tool")
     subparsers = parser.add_subparsers(dest="command", required=True)
@@ -13,6 +27,7 @@ def main():
     server_subs = server_parser.add_subparsers(dest="action", required=True)
     start_parser = server_subs.add_parser("start", help="Start the server")
     start_parser.add_argument("port", type=int, help="Port to listen on")
+    start_parser.add_argument("--workers", type=int, default=None, help="HTTP worker threads")
 
     # --- user ---
     user_parser = subparsers.add_parser("user", help="User management")
@@ -37,7 +52,9 @@ def main():
     
     # list
     list_p = post_subs.add_parser("list", help="List posts")
-    list_p.add_argument("count", nargs="?", type=int, default=None)
+    list_p.add_argument("count", nargs="?", type=_positive_int, default=None)
+    list_p.add_argument("--cursor", default=None, help="Continue after the cursor printed by the previous page")
+    list_p.add_argument("--fields", default=None, help="Comma-separated fields to fetch, e.g. title,date")
     
     # create
     post_subs.add_parser("create", help="Create a post")
@@ -48,25 +65,47 @@ def main():
     update_p.add_argument("field", choices=["title", "context", "description", "catagory", "date"])
     update_p.add_argument("value")
     
+    # set: 一次修改多个字段
+    set_p = post_subs.add_parser("set", help="Update several fields at once")
+    set_p.add_argument("cid")
+    set_p.add_argument("assignments", nargs="+", metavar="field=value")
+
     # delete
     delete_p = post_subs.add_parser("delete", help="Delete post")
     delete_p.add_argument("cid")
     
     # get
     get_p = post_subs.add_parser("get", help="Get field")
-    get_p.add_argument("cid")
-    get_p.add_argument("field")
+    get_p.add_argument("cids", nargs="+", metavar="cid", help="One or more post CIDs")
+    get_p.add_argument("field", help="Field name, or comma-separated field names")
     
+    # import
+    import_p = post_subs.add_parser("import", help="Bulk import posts from a JSONL file or a Markdown directory")
+    import_p.add_argument("path")
+    import_p.add_argument("--chunk-size", type=int, default=None, help="Posts per transaction")
+
+    # export
+    export_p = post_subs.add_parser("export", help="Export posts, URL mappings and references")
+    export_p.add_argument("path", help="Output file (jsonl) or directory (markdown)")
+    export_p.add_argument("--format", choices=["jsonl", "markdown"], default="jsonl")
+    export_p.add_argument("--gzip", action="store_true", help="Compress output with gzip")
+    export_p.add_argument("--all", action="store_true", help="Export posts of all users")
+
     # search
     search_p = post_subs.add_parser("search", help="Search")
     search_p.add_argument("keyword")
+    search_p.add_argument("--offset", type=_non_negative_int, default=0, help="Skip the first N results")
+    search_p.add_argument("--count", type=_non_negative_int, default=None, help="Maximum number of results")
 
     args = parser.parse_args()
 
     try:
         if args.command == "server":
             if args.action == "start":
-                server_manager.server_start(args.port)
+                if args.workers is None:
+                    server_manager.server_start(args.port)
+                else:
+                    server_manager.server_start(args.port, workers=args.workers)
 
         elif args.command == "user":
             if args.action == "register":
@@ -86,7 +125,11 @@ def main():
             token = store.load_local_token()
             
             if args.action == "list":
-                print(f"Posts: {post.post_list(token, args.count)}")
+                fields = [f.strip() for f in args.fields.split(",") if f.strip()] if args.fields else None
+                rows, next_cursor = post.post_page(token, args.count, args.cursor, fields)
+                print(f"Posts: {rows}")
+                if next_cursor:
+                    print(f"Next cursor: {next_cursor}")
             
             elif args.action == "create":
                 new_cid = post.post_create(token)
@@ -98,15 +141,62 @@ def main():
                 ok = post.post_update(token, args.cid, args.field, value)
                 print("Success" if ok else "Failed")
             
+            elif args.action == "set":
+                updates = {}
+                for item in args.assignments:
+                    field, sep, value = item.partition("=")
+                    if not sep:
+                        raise ValueError(f"Expected field=value, got: {item}")
+                    updates[field.strip()] = value.replace("\\n", "\n")
+                ok = post.post_update_fields(token, args.cid, updates)
+                print("Success" if ok else "Failed")
+
             elif args.action == "delete":
                 ok = post.post_delete(token, args.cid)
                 print("Success" if ok else "Failed")
             
             elif args.action == "get":
-                print(f"{args.field}: {post.post_get(token, args.cid, args.field)}")
+                fields = [f.strip() for f in args.field.split(",") if f.strip()]
+                if len(args.cids) > 1:
+                    # 多篇文章一次查询读取
+                    found = post.post_get_many(token, args.cids, fields)
+                    for cid in dict.fromkeys(args.cids):
+                        if cid not in found:
+                            print(f"{cid}: not found")
+                            continue
+                        for field, value in found[cid].items():
+                            print(f"{cid} {field}: {value}")
+                elif "," in args.field:
+                    values = post.post_get_fields(token, args.cids[0], fields)
+                    if values is None:
+                        print("Failed")
+                    else:
+                        for field, value in values.items():
+                            print(f"{field}: {value}")
+                else:
+                    print(f"{args.field}: {post.post_get(token, args.cids[0], args.field)}")
             
+            elif args.action == "import":
+                def report(r):
+                    print(f"\rImported {r.imported} posts, skipped {r.skipped} ({r.rate:.0f} posts/s)", end="", flush=True)
+                kwargs = {"chunk_size": args.chunk_size} if args.chunk_size else {}
+                result = importer.import_posts(token, args.path, on_progress=report, **kwargs)
+                print(f"\rImported {result.imported} posts, skipped {result.skipped} "
+                      f"in {result.elapsed:.2f}s ({result.rate:.0f} posts/s)")
+
+            elif args.action == "export":
+                def report(r):
+                    print(f"\rExported {r.exported} posts ({r.rate:.0f} posts/s)", end="", flush=True)
+                result = exporter.export_posts(token, args.path, fmt=args.format, compress=args.gzip,
+                                               all_users=args.all, on_progress=report)
+                print(f"\rExported {result.exported} posts in {result.elapsed:.2f}s ({result.rate:.0f} posts/s)")
+
             elif args.action == "search":
-                print(f"Results: {post.post_search(token, args.keyword)}")
+                if args.offset or args.count is not None:
+                    results = post.post_search(token, args.keyword, offset=args.offset, count=args.count)
+                else:
+                    results = post.post_search(token, args.keyword)
+                print(f"Results: {results}")
 
     except PermissionError:
         print("Error: Please login first.")
@@ -1,5 +1,6 @@
 from dao import MySQLUserDAO
 from dao.factory import create_connection
+from dao.cache import token_cache
 from core.security import hash_password, generate_token
 
 def user_register(username: str, password: str) -> int:
@@ -30,19 +31,36 @@ def user_login(username: str, password: str) -> str:
     finally:
         conn.close()
 
-def verify_token(token: str) -> int:
+def _lookup_token(conn, token: str) -> int:
+    with conn.cursor() as cur:
+        cur.execute("SELECT id FROM users WHERE token = %s", (token,))
+        row = cur.fetchone()
+
+    if not row:
+        raise PermissionError("Invalid or expired token")
+
+    return row[0]
+
+def verify_token(token: str, conn=None) -> int:
+    """
+    校验 token 并返回 user_id。命中进程内缓存时不访问数据库；
+    传入 conn 时复用该连接，不再单独建连。
+    """
     if not token:
         raise PermissionError("No token provided")
 
-    conn = create_connection()
-    try:
-        with conn.cursor() as cur:
-            cur.execute("SELECT id FROM users WHERE token = %s", (token,))
-            row = cur.fetchone()
-            
-        if not row:
-            raise PermissionError("Invalid or expired token")
-            
-        return row[0]
-    finally:
-        conn.close()
\ No newline at end of file
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        return user_id
+
+    if conn is not None:
+        user_id = _lookup_token(conn, token)
+    else:
+        conn = create_connection()
+        try:
+            user_id = _lookup_token(conn, token)
+        finally:
+            conn.close()
+
+    token_cache.set(token, user_id)
+    return user_id
@@ -0,0 +1,108 @@
+import html
+import re
+import urllib.parse
+from typing import Iterator
+from core.url_manager import URLManager, collation_key
+
+# 一次扫描同时匹配：Markdown 链接 [text](url "title")、HTML href、<url> 自动链接与裸 URL
+_LINK_RE = re.compile(
+    r"""\]\(\s*<?(?P<md>[^\s()<>]+)>?(?:\s+(?:"[^"]*"|'[^']*'))?\s*\)"""
+    r"""|href\s*=\s*(?P<quote>["'])(?P<href>.*?)(?P=quote)"""
+    r"""|<(?P<auto>https?://[^\s<>]+)>"""
+    r"""|(?P<bare>https?://[^\s<>()\[\]"'`]+)""",
+    re.IGNORECASE,
+)
+_GROUPS = ("md", "href", "auto", "bare")
+# 渲染后 HTML 中 <a> 标签的 href 属性；<code> 中的文本已转义为 &lt; / &quot;，不会被匹配
+_ANCHOR_HREF_RE = re.compile(r"""<a\b[^>]*?\bhref\s*=\s*(["'])(.*?)\1""", re.IGNORECASE | re.DOTALL)
+
+
+def iter_links(text: str | None) -> Iterator[tuple[int, int, str]]:
+    """逐个产出文本中的链接 (start, end, url)，[start, end) 为 URL 在原文中的位置。"""
+    if not text:
+        return
+    for m in _LINK_RE.finditer(text):
+        group = m.lastgroup if m.lastgroup in _GROUPS else "href"
+        url = m.group(group)
+        start, end = m.span(group)
+        if group == "bare":
+            # 句末标点不属于 URL
+            stripped = url.rstrip(".,;:!?")
+            end -= len(url) - len(stripped)
+            url = stripped
+        elif group == "href":
+            url = html.unescape(url)
+        if url:
+            yield start, end, url
+
+
+def extract_site_links(text: str | None) -> list[str]:
+    """文本中指向本站的链接（去重，保持出现顺序）。"""
+    return list(dict.fromkeys(url for _, _, url in iter_links(text) if URLManager.site_path(url)))
+
+
+def scan_citations(docs: dict[str, str | None], known: dict[str, str] | None = None,
+                   unresolved: dict[str, list[str]] | None = None) -> dict[str, list[str]]:
+    """
+    批量扫描 cid -> 正文，返回 cid -> 被引用的 CID 列表。
+    known 为尚未提交的 url_path -> cid（例如同一批导入的文章）；其余链接合并为一次
+    URLManager.resolve_urls 调用。指向自身或无法解析的链接被忽略；
+    给出 unresolved 时，无法解析的站内链接按 cid 记入其中，供调用方稍后再解析。
+    """
+    links = {cid: extract_site_links(text) for cid, text in docs.items()}
+    # 本地映射与数据库一样按排序规则匹配
+    local = {collation_key(path): cid for path, cid in (known or {}).items()}
+    resolved: dict[str, str | None] = {}
+    for url in {url for urls in links.values() for url in urls}:
+        resolved[url] = local.get(collation_key(URLManager.site_path(url)))
+    pending = [url for url, cid in resolved.items() if cid is None]
+    if pending:
+        resolved.update(URLManager().resolve_urls(pending))
+    citations = {}
+    for cid, urls in links.items():
+        refs = [resolved[url] for url in urls if resolved[url] and resolved[url] != cid]
+        citations[cid] = list(dict.fromkeys(refs))
+        if unresolved is not None:
+            missing = [url for url in urls if resolved[url] is None]
+            if missing:
+                unresolved[cid] = missing
+    return citations
+
+
+def prefetch_links(texts) -> None:
+    """
+    一次解析若干正文（Markdown 源文）中的全部站内链接，结果留在 URLManager 的路由表与负缓存中，
+    之后逐页调用 rewrite_links 不再查询数据库。供批量生成页面前调用。
+    """
+    urls = {url for text in texts for url in extract_site_links(text)}
+    if urls:
+        URLManager().resolve_urls(urls)
+
+
+def rewrite_links(page_html: str) -> str:
+    """
+    把渲染结果中 <a href> 指向本站文章的链接（完整 URL、大小写不同的路径等）改写为文章当前的站内路径。
+    一次正则扫描收集链接、一次批量解析，不逐个查询数据库；代码块等正文文本保持原样。
+    """
+    spans = []
+    for m in _ANCHOR_HREF_RE.finditer(page_html):
+        url = html.unescape(m.group(2))
+        if url and URLManager.site_path(url):
+            spans.append((m.start(2), m.end(2), url))
+    if not spans:
+        return page_html
+    mgr = URLManager()
+    resolved = mgr.resolve_urls([url for _, _, url in spans])
+    parts, pos = [], 0
+    for start, end, url in spans:
+        cid = resolved.get(url)
+        current = mgr.get_url_by_cid(cid) if cid else None
+        if not current or current == URLManager.site_path(url):
+            continue
+        split = urllib.parse.urlsplit(url)
+        target = urllib.parse.urlunsplit(("", "", current, split.query, split.fragment))
+        parts.append(page_html[pos:start])
+        parts.append(html.escape(target))
+        pos = end
+    parts.append(page_html[pos:])
+    return "".join(parts)
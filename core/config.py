@@ -9,5 +9,64 @@ DB_CONFIG = {
 
 SERVER_CONFIG = {
     "host": "127.0.0.1",
-    "port": 8080
+    "port": 8080,
+    "workers": 16,              # HTTP 工作线程数
+    "keepalive_timeout": 15,    # keep-alive 连接空闲超时（秒）
+    "keepalive_busy_timeout": 1,    # 有连接排队等待工作线程时，空闲 keep-alive 连接最多再占用线程的秒数
+    "page_cache_bytes": 64 * 1024 * 1024,   # 内存页面缓存上限，0 表示关闭
+    "page_cache_max_entry": 1024 * 1024     # 超过该大小的文件不进入内存缓存
+}
+
+POOL_CONFIG = {
+    "enabled": True,
+    "size": 8,              # 最大连接数
+    "timeout": 10,          # 连接池耗尽时的最长等待秒数
+    "idle_timeout": 300,    # 空闲超过该秒数的连接将被回收
+    "ping_interval": 5      # 空闲超过该秒数的连接在取出时先 ping 检查
+}
+
+CACHE_CONFIG = {
+    "token_size": 1024,     # token -> user_id 缓存条目上限
+    "token_ttl": 60,        # token 缓存有效期（秒）
+    "username_size": 4096,  # user_id -> username 缓存条目上限
+    "username_ttl": 600,    # username 缓存有效期（秒）
+    "slug_size": 65536,     # 标题 -> URL slug 缓存条目上限
+    "route_miss_size": 65536  # 数据库中不存在的站内路径（/alice/index.html 等）的负缓存上限，映射变更时清空
+}
+
+WATCHER_CONFIG = {
+    "reconcile_every": 100,     # 每隔多少次增量轮询做一次全表对账
+    "batch_size": 1000,         # 每次从变更日志读取的条数
+    "gap_timeout": 60,          # 游标之前跳过的日志 id 最多等待多少秒（事务晚于更大的 id 提交）
+    "max_gaps": 1000,           # 同时跟踪的空缺 id 上限，超过时改为全表对账
+    "change_retention": 86400,  # 变更日志保留秒数，对账时清理更早的记录
+    "snapshot_path": ".megacite/watcher_snapshot.json.gz",  # 持久化快照位置，None 表示不持久化
+    "snapshot_interval": 10     # 快照有变化时，两次落盘之间的最短间隔（秒）
+}
+
+NOTIFY_CONFIG = {
+    "enabled": True,
+    "host": "127.0.0.1",
+    "port": 8765,               # 本机 UDP 端口，DAO 写入后向此处广播变更事件
+    "safety_interval": 30       # 收到推送时，兜底轮询的间隔（秒）
+}
+
+GENERATOR_CONFIG = {
+    "workers": 4,               # 并行构建的进程/线程数，<= 1 时串行构建
+    "parallel_threshold": 32,   # 单次变更页面数达到该值才启用并行构建
+    "render_cache_dir": ".megacite/render_cache",   # Markdown 渲染缓存目录，None 表示不缓存
+    "render_cache_bytes": 256 * 1024 * 1024,        # 渲染缓存磁盘占用上限
+    "precompress": True,            # 构建时生成 .gz（安装 brotli 时另生成 .br）
+    "precompress_min_bytes": 1024   # 小于该大小的页面不预压缩
+}
+
+
+SEARCH_CONFIG = {
+    "backend": "fulltext",      # fulltext: MySQL FULLTEXT 索引；ngram: 进程内二元组倒排索引（dao/search_index.py），按 post_changes 同步
+    "ngram_token_size": 2,      # 与 MySQL 的 ngram_token_size 保持一致，更短的关键字退回 LIKE 扫描
+    "ngram_warmup": 3           # 同一进程搜索超过该次数才加载 ngram 索引，之前退回数据库查询
+}
+
+IMPORT_CONFIG = {
+    "chunk_size": 1000          # 批量导入时每个事务写入的文章数
 }
\ No newline at end of file
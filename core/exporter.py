@@ -0,0 +1,141 @@
+import gzip
+import json
+import os
+import time
+import urllib.parse
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable, Iterator
+import pymysql.cursors
+from core.session import request_scope
+
+FORMATS = ("jsonl", "markdown")
+# 写入 front matter 的字段（正文单独写在 front matter 之后）
+META_FIELDS = ("title", "date", "description", "catagory", "cid", "author", "url_path", "references")
+
+
+@dataclass
+class ExportResult:
+    exported: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rate(self) -> float:
+        return self.exported / self.elapsed if self.elapsed else 0.0
+
+
+def iter_posts(conn, owner_id: int | None = None) -> Iterator[dict]:
+    """
+    用服务端游标（SSCursor）逐行读取文章及其 URL 映射与引用，内存占用与表大小无关。
+    引用在数据库端按文章聚合为 JSON 数组，避免在同一连接上再开第二个流式查询。
+    """
+    sql = (
+        "SELECT p.cid, p.title, p.`context`, p.description, p.catagory, p.date, u.username, m.url_path, r.refs "
+        "FROM posts p "
+        "JOIN users u ON u.id = p.owner_id "
+        "LEFT JOIN url_mappings m ON m.cid = p.cid "
+        "LEFT JOIN (SELECT post_cid, JSON_ARRAYAGG(ref_cid) AS refs FROM post_references GROUP BY post_cid) r "
+        "ON r.post_cid = p.cid"
+    )
+    params: tuple = ()
+    if owner_id is not None:
+        sql += " WHERE p.owner_id = %s"
+        params = (owner_id,)
+    sql += " ORDER BY p.id"
+    with conn.cursor(pymysql.cursors.SSCursor) as cur:
+        cur.execute(sql, params)
+        for cid, title, context, description, catagory, post_date, author, url_path, refs in cur:
+            yield {
+                "cid": cid,
+                "title": title,
+                "context": context,
+                "description": description,
+                "catagory": catagory,
+                "date": post_date.isoformat() if isinstance(post_date, date) else post_date,
+                "author": author,
+                "url_path": url_path,
+                "references": sorted(json.loads(refs)) if refs else [],
+            }
+
+
+def _open(path: str, compress: bool):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if compress:
+        return gzip.open(path, "wt", encoding="utf-8", compresslevel=6)
+    return open(path, "w", encoding="utf-8")
+
+
+def _safe_segments(rel: str) -> list[str] | None:
+    """拆分相对路径；含空片段、. / ..、反斜杠或 NUL 时返回 None。"""
+    segments = rel.split("/")
+    for seg in segments:
+        if seg in ("", ".", "..") or "\\" in seg or "\0" in seg or (os.altsep and os.altsep in seg):
+            return None
+    return segments
+
+
+def _markdown_path(out_dir: str, post: dict, compress: bool) -> str:
+    """
+    与站点路径一致：<author>/<safe-title>.md，文件名使用解码后的标题（slug 中的 %XX 还原为原字符）；
+    没有 URL 映射或映射含有不安全的片段时用 CID 命名。最终路径必须位于 out_dir 之内。
+    """
+    segments = None
+    if post["url_path"]:
+        rel = urllib.parse.unquote(post["url_path"].lstrip("/"))
+        rel = rel[:-len(".html")] if rel.endswith(".html") else rel
+        segments = _safe_segments(rel)
+    if segments is None:
+        segments = _safe_segments(f"{post['author']}/{post['cid']}")
+    if segments is None:
+        raise ValueError(f"Unsafe export path for post {post['cid']!r}")
+    path = os.path.join(out_dir, *segments) + (".md.gz" if compress else ".md")
+    root = os.path.abspath(out_dir)
+    if os.path.commonpath([root, os.path.abspath(path)]) != root:
+        raise ValueError(f"Export path escapes {out_dir}: {post['url_path']!r}")
+    return path
+
+
+def _write_markdown(path: str, post: dict, compress: bool) -> None:
+    with _open(path, compress) as f:
+        f.write("---\n")
+        for key in META_FIELDS:
+            value = post[key]
+            if value is None or value == []:
+                continue
+            # 字符串按 JSON 写出，保证多行 description 等仍占一行
+            f.write(f"{key}: {json.dumps(value, ensure_ascii=False)}\n")
+        f.write("---\n")
+        f.write(post["context"] or "")
+
+
+def export_posts(token: str, path: str, fmt: str = "jsonl", compress: bool = False,
+                 all_users: bool = False,
+                 on_progress: Callable[[ExportResult], None] | None = None) -> ExportResult:
+    """
+    导出文章（全部字段）、URL 映射与引用。
+    jsonl: path 为单个文件，每行一篇文章；markdown: path 为目录，每篇文章一个带 front matter 的文件。
+    compress=True 时输出 gzip（.gz）。默认只导出当前用户的文章，all_users=True 时导出全部。
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt}")
+    result = ExportResult()
+    start = time.perf_counter()
+    with request_scope(token) as scope:
+        posts = iter_posts(scope.conn, None if all_users else scope.user_id)
+        if fmt == "jsonl":
+            with _open(path, compress) as f:
+                for post in posts:
+                    f.write(json.dumps(post, ensure_ascii=False, separators=(",", ":")) + "\n")
+                    result.exported += 1
+                    if on_progress and result.exported % 1000 == 0:
+                        result.elapsed = time.perf_counter() - start
+                        on_progress(result)
+        else:
+            for post in posts:
+                _write_markdown(_markdown_path(path, post, compress), post, compress)
+                result.exported += 1
+                if on_progress and result.exported % 1000 == 0:
+                    result.elapsed = time.perf_counter() - start
+                    on_progress(result)
+    result.elapsed = time.perf_counter() - start
+    return result
@@ -0,0 +1,222 @@
+import gzip
+import itertools
+import json
+import os
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Callable, Iterator
+from core.citations import scan_citations
+from core.config import IMPORT_CONFIG
+from core.security import generate_cid
+from core.session import request_scope
+from core.url_manager import URLManager, collation_key
+
+FIELDS = ("title", "context", "description", "catagory", "date")
+# mc post export 额外写出的字段：导入时沿用原 CID 与引用（url_path 仅供参考，总是重新生成）
+EXPORT_FIELDS = ("cid", "url_path", "references")
+
+
+@dataclass
+class ImportResult:
+    imported: int = 0
+    skipped: int = 0        # 标题、URL 或 CID 与已有文章重复而跳过的条数
+    elapsed: float = 0.0
+
+    @property
+    def rate(self) -> float:
+        return self.imported / self.elapsed if self.elapsed else 0.0
+
+
+MARKDOWN_SUFFIXES = (".md", ".markdown", ".md.gz")
+
+
+def _open_text(path: str):
+    """.gz 文件（例如 mc post export --gzip 的输出）透明解压。"""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def _front_matter_value(value: str):
+    value = value.strip()
+    if value.startswith(('"', "[")):
+        # mc post export 按 JSON 写出取值
+        try:
+            return json.loads(value)
+        except ValueError:
+            pass
+    return value.strip('"\'')
+
+
+def _parse_markdown(path: str) -> dict:
+    """
+    读取 Markdown 文件。支持开头的 front matter（--- 包围的 key: value 行）；
+    未给出 title 时依次使用一级标题、文件名。
+    """
+    with _open_text(path) as f:
+        text = f.read()
+    record: dict = {}
+    if text.startswith("---\n"):
+        end = text.find("\n---", 4)
+        if end != -1:
+            for line in text[4:end].splitlines():
+                key, sep, value = line.partition(":")
+                if sep and key.strip() in FIELDS + EXPORT_FIELDS:
+                    record[key.strip()] = _front_matter_value(value)
+            text = text[end + 4:].lstrip("\n")
+    if not record.get("title"):
+        first = text.lstrip().split("\n", 1)[0]
+        name = os.path.basename(path)
+        stem = next((name[:-len(s)] for s in MARKDOWN_SUFFIXES if name.endswith(s)), name)
+        record["title"] = first[2:].strip() if first.startswith("# ") else stem
+    record["context"] = text
+    return record
+
+
+def iter_records(path: str) -> Iterator[dict]:
+    """
+    流式读取待导入的文章：JSONL 文件（每行一个对象）或 Markdown 目录（递归读取 *.md）。
+    .gz 压缩的文件同样支持。
+    """
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith(MARKDOWN_SUFFIXES):
+                    file_path = os.path.join(root, name)
+                    yield _check_date(_parse_markdown(file_path), file_path)
+        return
+    with _open_text(path) as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{lineno}: invalid JSON ({e})") from None
+            if not isinstance(record, dict):
+                raise ValueError(f"{path}:{lineno}: expected a JSON object")
+            yield _check_date(record, f"{path}:{lineno}")
+
+
+def _normalize_date(value) -> date:
+    if not value:
+        return datetime.now().date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+
+def _check_date(record: dict, where: str) -> dict:
+    """读取时校验日期，错误信息带上文件与行号，而不是在写入时才中断。"""
+    try:
+        _normalize_date(record.get("date"))
+    except ValueError:
+        raise ValueError(f"{where}: invalid date {record.get('date')!r} (expected YYYY-MM-DD)") from None
+    return record
+
+
+def _exported_cid(record: dict) -> str | None:
+    cid = record.get("cid")
+    return cid if isinstance(cid, str) and 0 < len(cid) <= 32 and cid.isalnum() else None
+
+
+def _exported_references(record: dict) -> list[str]:
+    refs = record.get("references")
+    return [r for r in refs if isinstance(r, str) and r] if isinstance(refs, list) else []
+
+
+def import_posts(token: str, path: str, chunk_size: int = IMPORT_CONFIG["chunk_size"],
+                 on_progress: Callable[[ImportResult], None] | None = None) -> ImportResult:
+    """
+    批量导入文章到当前用户名下。
+    每 chunk_size 篇为一个事务：文章、URL 映射、引用与变更日志各用一次 executemany 写入。
+    正文中指向本站已有文章或本次已导入文章的链接记为引用。
+    mc post export 的输出可以原样导入：沿用其中的 cid 与 references，url_path 按标题重新生成。
+    引用可能指向之后的块才导入的文章：本块无法解析的链接与导出的引用在全部块提交后统一写入。
+    标题、URL 或 CID 与已有文章重复的记录会被跳过。
+    每个事务提交后只发布一条汇总事件，明细由 post_changes 记录。
+    """
+    result = ImportResult()
+    url_mgr = URLManager()
+    seen_titles: set[str] = set()
+    seen_urls: set[str] = set()
+    seen_cids: set[str] = set()
+    file_urls: dict[str, str] = {}              # 本次导入的 collation_key(url_path) -> cid
+    deferred: dict[str, list[str]] = {}         # cid -> 本块内无法解析的站内链接
+    late_refs: list[tuple[str, str]] = []       # 全部块提交后再写入的引用
+    username = None
+    start = time.perf_counter()
+
+    records = iter_records(path)
+    while chunk := list(itertools.islice(records, chunk_size)):
+        with request_scope(token) as scope:
+            if username is None:
+                username = scope.users.get_usernames([scope.user_id]).get(scope.user_id)
+                if not username:
+                    raise PermissionError("User not found")
+
+            candidates = []
+            for record in chunk:
+                title = str(record.get("title") or "").strip() or f"Untitled-{generate_cid()}"
+                # 站内路径总是按标题重新生成：必须与 Generator 实际写出的页面一致，
+                # 导出文件中的 url_path 不可信（可能含 ../ 等片段）
+                url_path = url_mgr.url_path(username, title)
+                cid = _exported_cid(record)
+                # 本地去重按数据库排序规则比较（不区分大小写、重音与全半角），否则提交时才触发唯一键冲突
+                title_key, url_key = collation_key(title), collation_key(url_path)
+                cid_key = collation_key(cid) if cid else None
+                if title_key in seen_titles or url_key in seen_urls or cid_key in seen_cids:
+                    result.skipped += 1
+                    continue
+                seen_titles.add(title_key)
+                seen_urls.add(url_key)
+                if cid_key:
+                    seen_cids.add(cid_key)
+                candidates.append((cid, title, url_path, record))
+
+            taken_titles = {collation_key(t) for t in scope.posts.existing_titles(
+                scope.user_id, [c[1] for c in candidates])}
+            taken_urls = {collation_key(u) for u in scope.url_maps.get_cids_by_urls([c[2] for c in candidates])}
+            taken_cids = {collation_key(c) for c in scope.posts.get_many([c[0] for c in candidates if c[0]], ["cid"])}
+
+            posts, mappings = [], []
+            for cid, title, url_path, record in candidates:
+                if (collation_key(title) in taken_titles or collation_key(url_path) in taken_urls
+                        or (cid and collation_key(cid) in taken_cids)):
+                    result.skipped += 1
+                    continue
+                cid = cid or generate_cid()
+                posts.append((cid, title, record.get("context"), record.get("description"),
+                              record.get("catagory"), _normalize_date(record.get("date"))))
+                mappings.append((cid, url_path))
+                late_refs.extend((cid, ref) for ref in _exported_references(record) if ref != cid)
+
+            # 本块的映射尚未提交，直接交给扫描；之前的块已提交，由 URLManager 解析
+            citations = scan_citations({p[0]: p[2] for p in posts},
+                                       known={url_path: cid for cid, url_path in mappings},
+                                       unresolved=deferred)
+            file_urls.update((collation_key(url_path), cid) for cid, url_path in mappings)
+
+            scope.posts.create_posts(scope.user_id, posts)
+            scope.url_maps.upsert_mappings(mappings)
+            scope.references.add_references(
+                [(cid, ref) for cid, refs in citations.items() for ref in refs])
+        result.imported += len(posts)
+        result.elapsed = time.perf_counter() - start
+        if on_progress:
+            on_progress(result)
+
+    # 指向之后的块才导入的文章的链接，按整个文件的 url_path -> cid 解析
+    for cid, urls in deferred.items():
+        for url in urls:
+            target = file_urls.get(collation_key(URLManager.site_path(url)))
+            if target and target != cid:
+                late_refs.append((cid, target))
+    for i in range(0, len(late_refs), chunk_size):
+        with request_scope(token) as scope:
+            scope.references.add_references(late_refs[i:i + chunk_size])
+
+    result.elapsed = time.perf_counter() - start
+    return result
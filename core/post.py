@@ -1,100 +1,104 @@
 from typing import Any
 import pymysql.err
-from dao import MySQLPostDAO, MySQLUrlMapDAO, MySQLUserDAO
-from dao.factory import create_connection
-from core.auth import verify_token
+from core.citations import scan_citations
 from core.security import generate_cid
+from core.session import RequestScope, request_scope
 from core.url_manager import URLManager
 
-def _update_url_mapping(conn, cid: str, owner_id: int, title: str | None):
-    """内部辅助函数：计算并更新 URL 映射"""
-    user_dao = MySQLUserDAO(conn)
-    with conn.cursor() as cur:
-        cur.execute("SELECT username FROM users WHERE id = %s", (owner_id,))
-        row = cur.fetchone()
-        if not row: return
-        username = row[0]
+_url_mgr = URLManager()
 
-    safe_title = URLManager().safe_title(title or "untitled")
-    url_path = f"/{username}/{safe_title}.html"
+def _update_url_mapping(scope: RequestScope, cid: str, title: str | None, owner_id: int | None = None):
+    """内部辅助函数：计算并更新 URL 映射（与调用方处于同一事务）"""
+    if owner_id is not None:
+        username = scope.users.get_usernames([owner_id]).get(owner_id)
+    else:
+        with scope.conn.cursor() as cur:
+            cur.execute(
+                "SELECT u.username FROM posts p JOIN users u ON u.id = p.owner_id WHERE p.cid = %s",
+                (cid,),
+            )
+            row = cur.fetchone()
+        username = row[0] if row else None
+    if not username: return
 
-    map_dao = MySQLUrlMapDAO(conn)
-    map_dao.upsert_mapping(cid, url_path)
+    scope.url_maps.upsert_mapping(cid, _url_mgr.url_path(username, title))
+
+def _update_references(scope: RequestScope, cid: str, context: str | None):
+    """内部辅助函数：重新扫描正文中的站内链接，替换该文章的引用（与调用方处于同一事务）"""
+    scope.references.set_references(cid, scan_citations({cid: context})[cid])
 
 def post_list(token: str, count: int | None = None) -> list[str]:
-    verify_token(token)
-    conn = create_connection()
-    try:
-        dao = MySQLPostDAO(conn)
+    """最新的 count 篇文章的 CID，即 post_page 的第一页。"""
+    return post_page(token, count)[0]
+
+def post_page(token: str, count: int | None = None, cursor: str | None = None,
+              fields: list[str] | None = None) -> tuple[list, str | None]:
+    """按 (date, id) 游标分页，返回 (rows, next_cursor)；fields 指定时 rows 为字典列表。"""
+    with request_scope(token) as scope:
         limit = count if count is not None else 100
-        return dao.list_posts(offset=0, limit=limit)
-    finally:
-        conn.close()
+        return scope.posts.list_page(limit, cursor=cursor, fields=fields)
 
 def post_create(token: str) -> str:
-    user_id = verify_token(token)
     new_cid = generate_cid()
-    
+
     # 自动生成唯一默认标题: Untitled-{CID}
     # CID 是唯一的，所以 Title 在用户范围内也绝对唯一
     default_title = f"Untitled-{new_cid}"
-    
-    conn = create_connection()
-    try:
-        dao = MySQLPostDAO(conn)
-        dao.create_post(owner_id=user_id, cid=new_cid, title=default_title, date=None)
-        
-        # 立即更新映射表
-        _update_url_mapping(conn, new_cid, user_id, default_title)
-        
+
+    with request_scope(token) as scope:
+        scope.posts.create_post(owner_id=scope.user_id, cid=new_cid, title=default_title, date=None)
+
+        # 映射与文章在同一事务中写入
+        _update_url_mapping(scope, new_cid, default_title, owner_id=scope.user_id)
+
         return new_cid
-    finally:
-        conn.close()
 
 def post_update(token: str, cid: str, field: str, value: str) -> bool:
-    verify_token(token)
-    conn = create_connection()
-    try:
-        dao = MySQLPostDAO(conn)
-        
+    with request_scope(token) as scope:
         try:
-            result = dao.update_field(cid, field, value)
+            result = scope.posts.update_field(cid, field, value)
         except pymysql.err.IntegrityError:
             # 捕获违反唯一性约束 (IntegrityError)，即 Title 重复
             return False
-        
+
         if result and field == "title":
-            owner_id = dao.get_field(cid, "owner_id")
-            if owner_id:
-                _update_url_mapping(conn, cid, owner_id, value)
-                
+            _update_url_mapping(scope, cid, value)
+        elif result and field == "context":
+            _update_references(scope, cid, value)
+
+        return result
+
+def post_update_fields(token: str, cid: str, updates: dict[str, str]) -> bool:
+    """一次提交同时修改多个字段（编辑器保存）；修改 title / context 时在同一事务中更新 URL 映射 / 引用。"""
+    with request_scope(token) as scope:
+        try:
+            result = scope.posts.update_fields(cid, updates)
+        except pymysql.err.IntegrityError:
+            return False
+
+        if result and "title" in updates:
+            _update_url_mapping(scope, cid, updates["title"])
+        if result and "context" in updates:
+            _update_references(scope, cid, updates["context"])
+
         return result
-    finally:
-        conn.close()
 
 def post_delete(token: str, cid: str) -> bool:
-    verify_token(token)
-    conn = create_connection()
-    try:
-        dao = MySQLPostDAO(conn)
-        return dao.delete_post(cid)
-    finally:
-        conn.close()
+    with request_scope(token) as scope:
+        return scope.posts.delete_post(cid)
 
 def post_get(token: str, cid: str, field: str) -> Any:
-    verify_token(token)
-    conn = create_connection()
-    try:
-        dao = MySQLPostDAO(conn)
-        return dao.get_field(cid, field)
-    finally:
-        conn.close()
-
-def post_search(token: str, keyword: str) -> list[str]:
-    verify_token(token)
-    conn = create_connection()
-    try:
-        dao = MySQLPostDAO(conn)
-        return dao.search_posts(keyword)
-    finally:
-        conn.close()
\ No newline at end of file
+    with request_scope(token) as scope:
+        return scope.posts.get_field(cid, field)
+
+def post_get_fields(token: str, cid: str, fields: list[str]) -> dict[str, Any] | None:
+    with request_scope(token) as scope:
+        return scope.posts.get_fields(cid, fields)
+
+def post_get_many(token: str, cids: list[str], fields: list[str]) -> dict[str, dict[str, Any]]:
+    with request_scope(token) as scope:
+        return scope.posts.get_many(cids, fields)
+
+def post_search(token: str, keyword: str, offset: int = 0, count: int | None = None) -> list[str]:
+    with request_scope(token) as scope:
+        return scope.posts.search_posts(keyword, offset=offset, limit=count)
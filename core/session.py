@@ -0,0 +1,48 @@
+from contextlib import contextmanager
+from typing import Iterator
+from dao import MySQLPostDAO, MySQLUrlMapDAO, MySQLUserDAO, MySQLPostReferenceDAO
+from dao import events
+from dao.factory import create_connection
+from core.auth import verify_token
+
+
+class RequestScope:
+    """
+    一次请求的工作单元：整个请求共用一条连接、一个事务。
+    通过属性获取的 DAO 均不自行提交，由 request_scope 在结束时统一 commit。
+    """
+
+    def __init__(self, conn, user_id: int):
+        self.conn = conn
+        self.user_id = user_id
+        self.posts = MySQLPostDAO(conn, autocommit=False)
+        self.url_maps = MySQLUrlMapDAO(conn, autocommit=False)
+        self.users = MySQLUserDAO(conn, autocommit=False)
+        self.references = MySQLPostReferenceDAO(conn, autocommit=False)
+
+    def publish_pending(self) -> None:
+        """事务提交后广播各 DAO 暂存的变更事件。"""
+        for dao in (self.posts, self.url_maps, self.users, self.references):
+            pending, dao.pending_events = dao.pending_events, []
+            for event in pending:
+                events.publish(*event)
+
+
+@contextmanager
+def request_scope(token: str) -> Iterator[RequestScope]:
+    """
+    在同一连接上完成 token 校验与后续读写，正常退出时提交一次，异常时回滚。
+    """
+    conn = create_connection()
+    try:
+        user_id = verify_token(token, conn)
+        scope = RequestScope(conn, user_id)
+        try:
+            yield scope
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        scope.publish_pending()
+    finally:
+        conn.close()
@@ -1,14 +1,63 @@
+import functools
+import re
+import threading
+import unicodedata
 import urllib.parse
-from core.config import SERVER_CONFIG
+from core.config import CACHE_CONFIG, SERVER_CONFIG
+from dao import events
 from dao.factory import create_connection
 from dao.url_map_dao import MySQLUrlMapDAO
 
+_HYPHEN_RUNS = re.compile(r"-{2,}")
+# 与 urllib.parse.quote 相同的保留字符；其余 UTF-8 字节按查表转为 %XX
+_SLUG_SAFE = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_.-~"
+_QUOTE_TABLE = [chr(b) if b in _SLUG_SAFE else f"%{b:02X}" for b in range(256)]
+
+
+@functools.lru_cache(maxsize=CACHE_CONFIG["slug_size"])
+def slugify(title: str) -> str:
+    """
+    生成 URL 安全标题 (Slug)，结果按标题缓存。
+    与原先的 replace 循环 + urllib.parse.quote 输出完全一致（见 benchmarks/bench_slug.py）。
+    """
+    if not title:
+        return "untitled"
+    safe = title.strip().replace(" ", "-").replace("/", "-").replace("\\", "-")
+    if "--" in safe:
+        safe = _HYPHEN_RUNS.sub("-", safe)
+    raw = safe.encode("utf-8")
+    if not raw.rstrip(_SLUG_SAFE):
+        return safe
+    return raw.decode("latin-1").translate(_QUOTE_TABLE)
+
+
+@functools.lru_cache(maxsize=CACHE_CONFIG["slug_size"])
+def collation_key(text: str) -> str:
+    """
+    近似 utf8mb4_unicode_ci 的比较键：兼容字符（全角等）归一、去掉重音、不区分大小写、忽略尾部空格。
+    数据库判为相等的两个字符串（"Café" 与 "cafe"），比较键也相等。
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold().rstrip(" ")
+
+
 class URLManager:
     """
     负责路径映射和 URL 解析。
+    url_mappings 在内存中维护 url_path <-> cid 双向索引：首次解析时一次性载入，
+    之后随 upsert_mapping 发布的变更事件更新；DBWatcher 全量对账时重新载入，
+    纠正错过的跨进程事件（UDP 通知不保证送达）。
+    url_path -> cid 按 collation_key 建索引，与数据库排序规则一样不区分大小写。
+    数据库中也不存在的路径（用户主页、图片等非文章路径）记入负缓存，收到映射变更时清空。
     """
     _instance = None
     _cid_map: dict[str, str] = {} # cid -> rel_path
+    _url_to_cid: dict[str, str] = {}  # collation_key(url_path) -> cid
+    _cid_to_url: dict[str, str] = {}  # cid -> url_path
+    _missing: set[str] = set()  # 查询过但不存在的 collation_key(url_path)
+    _routes_loaded = False
+    _subscribed = False
+    _routes_lock = threading.RLock()
 
     def __new__(cls):
         if cls._instance is None:
@@ -17,14 +66,11 @@ class URLManager:
 
     def safe_title(self, title: str) -> str:
         """生成 URL 安全标题 (Slug)。"""
-        if not title:
-            return "untitled"
-        
-        safe = title.strip()
-        safe = safe.replace(" ", "-").replace("/", "-").replace("\\", "-")
-        while "--" in safe:
-            safe = safe.replace("--", "-")
-        return urllib.parse.quote(safe)
+        return slugify(title)
+
+    def url_path(self, username: str, title: str | None) -> str:
+        """文章页面的站内路径: /username/safe-title.html"""
+        return f"/{username}/{self.safe_title(title or 'untitled')}.html"
 
     def register_mapping(self, cid: str, username: str, title: str) -> str:
         """返回相对路径前缀: username/safe-title"""
@@ -35,27 +81,123 @@ class URLManager:
     def remove_mapping(self, cid: str) -> str | None:
         return self._cid_map.pop(cid, None)
 
-    def get_cid_from_external_url(self, url: str) -> str | None:
-        """
-        解析外界传入的完整 URL，返回对应的 CID。
-        """
+    def get_mapping(self, cid: str) -> str | None:
+        return self._cid_map.get(cid)
+
+    def load_mappings(self, mappings: dict[str, str]) -> None:
+        """批量恢复 cid -> 相对路径 映射（例如从 Watcher 快照恢复）。"""
+        self._cid_map.update(mappings)
+
+    def mappings(self) -> dict[str, str]:
+        return dict(self._cid_map)
+
+    # ---- url_path <-> cid 路由表 ----
+
+    def load_routes(self) -> None:
+        """一次查询载入全部 url_mappings，并订阅后续的映射变更。"""
+        with self._routes_lock:
+            if not URLManager._subscribed:
+                events.subscribe(self.handle_event)
+                URLManager._subscribed = True
+            conn = create_connection()
+            try:
+                rows = MySQLUrlMapDAO(conn).list_mappings()
+            finally:
+                conn.close()
+            self._url_to_cid.clear()
+            self._cid_to_url.clear()
+            self._missing.clear()
+            for cid, url_path in rows:
+                self.set_route(cid, url_path)
+            URLManager._routes_loaded = True
+
+    def set_route(self, cid: str, url_path: str) -> None:
+        with self._routes_lock:
+            old = self._cid_to_url.get(cid)
+            if old is not None and self._url_to_cid.get(collation_key(old)) == cid:
+                del self._url_to_cid[collation_key(old)]
+            self._cid_to_url[cid] = url_path
+            self._url_to_cid[collation_key(url_path)] = cid
+            self._missing.discard(collation_key(url_path))
+
+    def drop_route(self, cid: str) -> None:
+        with self._routes_lock:
+            old = self._cid_to_url.pop(cid, None)
+            if old is not None and self._url_to_cid.get(collation_key(old)) == cid:
+                del self._url_to_cid[collation_key(old)]
+
+    def handle_event(self, event: events.ChangeEvent) -> None:
+        """变更事件回调：进程内订阅，DBWatcher 也会转发其他进程的事件。"""
+        if event.kind == "url_mapping" and event.op == "upsert":
+            self.set_route(event.key, event.value)
+        elif event.kind == "post" and event.op == "delete":
+            # 映射随外键级联删除
+            self.drop_route(event.key)
+        elif event.kind == "post" and event.op == "import":
+            # 批量导入不逐条发布映射事件，之前不存在的路径可能已经有了映射
+            self._missing.clear()
+        elif event.kind == "user" and event.op == "delete":
+            URLManager._routes_loaded = False
+
+    def get_url_by_cid(self, cid: str) -> str | None:
+        if not self._routes_loaded:
+            self.load_routes()
+        return self._cid_to_url.get(cid)
+
+    @staticmethod
+    def site_path(url: str) -> str | None:
+        """本站 URL（或以 / 开头的站内路径）中的路径部分；外站 URL 返回 None。"""
         try:
             parsed = urllib.parse.urlparse(url)
         except ValueError:
             return None
-        
-        # 1. 验证域名和端口
+        if not parsed.netloc:
+            return parsed.path if parsed.path.startswith("/") and not parsed.scheme else None
+        # 验证域名和端口
         expected_netloc = f"{SERVER_CONFIG['host']}:{SERVER_CONFIG['port']}"
         if parsed.netloc != expected_netloc:
             return None
-            
-        # 2. 提取路径 (严格匹配)
-        url_path = parsed.path
-        
-        # 3. 查库
-        conn = create_connection()
-        try:
-            map_dao = MySQLUrlMapDAO(conn)
-            return map_dao.get_cid_by_url(url_path)
-        finally:
-            conn.close()
\ No newline at end of file
+        # 路径严格匹配
+        return parsed.path
+
+    def resolve_urls(self, urls) -> dict[str, str | None]:
+        """
+        批量解析 URL，返回 url -> cid（外站或未知 URL 为 None）。
+        先查内存路由表与负缓存，其余路径（例如其他进程刚写入的映射）合并为一次数据库查询。
+        """
+        if not self._routes_loaded:
+            self.load_routes()
+        result: dict[str, str | None] = {}
+        misses: dict[str, list[str]] = {}  # url_path -> 原始 URL
+        for url in urls:
+            path = self.site_path(url)
+            cid = self._url_to_cid.get(collation_key(path)) if path else None
+            result[url] = cid
+            if path and cid is None and collation_key(path) not in self._missing:
+                misses.setdefault(path, []).append(url)
+
+        if misses:
+            conn = create_connection()
+            try:
+                found = MySQLUrlMapDAO(conn).get_cids_by_urls(list(misses))
+            finally:
+                conn.close()
+            # 返回的是库中保存的写法，可能与查询的大小写不同，统一按 collation_key 对应
+            for path, cid in found.items():
+                self.set_route(cid, path)
+            if len(self._missing) + len(misses) > CACHE_CONFIG["route_miss_size"]:
+                self._missing.clear()
+            for path, originals in misses.items():
+                cid = self._url_to_cid.get(collation_key(path))
+                if cid is None:
+                    self._missing.add(collation_key(path))
+                    continue
+                for url in originals:
+                    result[url] = cid
+        return result
+
+    def get_cid_from_external_url(self, url: str) -> str | None:
+        """
+        解析外界传入的完整 URL，返回对应的 CID。
+        """
+        return self.resolve_urls([url])[url]
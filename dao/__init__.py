@@ -8,4 +8,5 @@ from .user_dao import MySQLUserDAO
 from .auth_dao import MySQLAuthDAO
 from .post_dao import MySQLPostDAO
 from .reference_dao import MySQLPostReferenceDAO
-from .url_map_dao import MySQLUrlMapDAO
\ No newline at end of file
+from .url_map_dao import MySQLUrlMapDAO
+from .change_dao import ChangeCursor, MySQLPostChangeDAO
\ No newline at end of file
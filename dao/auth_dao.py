@@ -3,8 +3,13 @@ import pymysql.connections
 class MySQLAuthDAO:
     """MySQL 实现的 AuthDAO。"""
 
-    def __init__(self, conn: pymysql.connections.Connection):
+    def __init__(self, conn: pymysql.connections.Connection, autocommit: bool = True):
         self.conn = conn
+        self.autocommit = autocommit
+
+    def _commit(self) -> None:
+        if self.autocommit:
+            self.conn.commit()
 
     def add_platform_auth(self, user_id: int, platform: str, credential: str) -> None:
         with self.conn.cursor() as cur:
@@ -13,7 +18,7 @@ class MySQLAuthDAO:
                 "ON DUPLICATE KEY UPDATE credential = %s",
                 (user_id, platform, credential, credential),
             )
-        self.conn.commit()
+        self._commit()
 
     def remove_platform_auth(self, user_id: int, platform: str) -> bool:
         with self.conn.cursor() as cur:
@@ -22,7 +27,7 @@ class MySQLAuthDAO:
                 (user_id, platform),
             )
             deleted = cur.rowcount
-        self.conn.commit()
+        self._commit()
         return deleted > 0
 
     def list_platform_auths(self, user_id: int) -> list[str]:
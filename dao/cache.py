@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+from core.config import CACHE_CONFIG
+from . import events
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    线程安全的进程内 LRU 缓存，条目在写入 ttl 秒后过期。
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+            value, expires = item
+            if expires <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def discard_values(self, value: Any) -> None:
+        """删除所有值等于 value 的条目。"""
+        with self._lock:
+            for key in [k for k, (v, _) in self._data.items() if v == value]:
+                del self._data[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# token -> user_id
+token_cache = TTLCache(maxsize=CACHE_CONFIG["token_size"], ttl=CACHE_CONFIG["token_ttl"])
+# user_id -> username
+username_cache = TTLCache(maxsize=CACHE_CONFIG["username_size"], ttl=CACHE_CONFIG["username_ttl"])
+
+
+def invalidate_user(user_id: int) -> None:
+    """用户的 token、用户名等信息发生变化时调用，清除与该用户相关的缓存条目。"""
+    token_cache.discard_values(user_id)
+    username_cache.pop(user_id)
+
+
+def _on_event(event: events.ChangeEvent) -> None:
+    # user 事件在事务提交后才发布（RequestScope.publish_pending），
+    # 在此失效可避免并发的 verify_token 在提交前把旧 token 重新写回缓存
+    if event.kind == "user":
+        invalidate_user(int(event.key))
+
+
+events.subscribe(_on_event)
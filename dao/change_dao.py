@@ -0,0 +1,137 @@
+import time
+from typing import Iterator
+import pymysql.connections
+from core.config import WATCHER_CONFIG
+
+class MySQLPostChangeDAO:
+    """文章变更日志 (post_changes)，供 DBWatcher 按游标增量读取。"""
+
+    def __init__(self, conn: pymysql.connections.Connection, autocommit: bool = True):
+        self.conn = conn
+        self.autocommit = autocommit
+
+    def _commit(self) -> None:
+        if self.autocommit:
+            self.conn.commit()
+
+    def log_change(self, cid: str, op: str) -> None:
+        """记录一次变更。op: create / update / delete / reference（引用增删）"""
+        with self.conn.cursor() as cur:
+            cur.execute("INSERT INTO post_changes (cid, op) VALUES (%s, %s)", (cid, op))
+        self._commit()
+
+    def log_changes(self, cids: list[str], op: str) -> None:
+        """批量记录同一类变更（批量导入）。"""
+        with self.conn.cursor() as cur:
+            cur.executemany("INSERT INTO post_changes (cid, op) VALUES (%s, %s)", [(cid, op) for cid in cids])
+        self._commit()
+
+    def log_owner_changes(self, owner_id: int, op: str) -> None:
+        """为某用户的全部文章记录变更（删除用户时文章随外键级联删除，不会逐篇记录）。"""
+        with self.conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO post_changes (cid, op) SELECT cid, %s FROM posts WHERE owner_id = %s",
+                (op, owner_id),
+            )
+        self._commit()
+
+    def list_changes(self, after_id: int, limit: int = 1000) -> list[tuple[int, str, str]]:
+        """返回 id > after_id 的变更 [(id, cid, op), ...]，按 id 升序。"""
+        with self.conn.cursor() as cur:
+            cur.execute(
+                "SELECT id, cid, op FROM post_changes WHERE id > %s ORDER BY id LIMIT %s",
+                (after_id, limit),
+            )
+            rows = cur.fetchall()
+        return [(r[0], r[1], r[2]) for r in rows] if rows else []
+
+    def get_changes(self, ids: list[int]) -> list[tuple[int, str, str]]:
+        """按 id 读取变更 [(id, cid, op), ...]（补读游标之前晚提交的记录）。"""
+        if not ids:
+            return []
+        placeholders = ", ".join(["%s"] * len(ids))
+        with self.conn.cursor() as cur:
+            cur.execute(f"SELECT id, cid, op FROM post_changes WHERE id IN ({placeholders}) ORDER BY id", list(ids))
+            rows = cur.fetchall()
+        return [(r[0], r[1], r[2]) for r in rows] if rows else []
+
+    def get_bounds(self) -> tuple[int, int]:
+        """返回当前日志中的 (最小 id, 最大 id)，日志为空时为 (0, 0)。"""
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT COALESCE(MIN(id), 0), COALESCE(MAX(id), 0) FROM post_changes")
+            row = cur.fetchone()
+        return row[0], row[1]
+
+    def prune_changes(self, older_than_seconds: int) -> int:
+        """删除早于指定秒数的日志，返回删除条数。"""
+        with self.conn.cursor() as cur:
+            cur.execute(
+                "DELETE FROM post_changes WHERE changed_at < NOW() - INTERVAL %s SECOND",
+                (older_than_seconds,),
+            )
+            deleted = cur.rowcount
+        self._commit()
+        return deleted
+
+
+class ChangeCursor:
+    """
+    post_changes 的增量读取游标，供 DBWatcher 与各进程内索引共用。
+    自增 id 按插入顺序分配、按提交顺序可见：游标越过的 id 可能属于尚未提交的事务，
+    记为空缺并在之后按 id 补读；超过 gap_timeout 仍未出现的视为回滚或自增跳号。
+    """
+
+    def __init__(self, position: int | None = None,
+                 gap_timeout: float = WATCHER_CONFIG["gap_timeout"],
+                 max_gaps: int = WATCHER_CONFIG["max_gaps"]):
+        self.position = position  # 已处理到的 id，None 表示尚未全量加载
+        self.gap_timeout = gap_timeout
+        self.max_gaps = max_gaps
+        self.gaps: dict[int, float] = {}  # 游标之前尚未出现的 id -> 发现时间
+        self.overflow = False
+
+    def reset(self, position: int) -> None:
+        """全量加载完成后调用；position 应为加载前读取的最大 id。"""
+        self.position = position
+        self.gaps.clear()
+        self.overflow = False
+
+    def needs_full(self, changes: MySQLPostChangeDAO) -> bool:
+        """尚未全量加载、空缺过多，或游标之后的日志已被清理时，增量无法保证完整。"""
+        if self.position is None or self.overflow:
+            return True
+        min_id, _ = changes.get_bounds()
+        return min_id > self.position + 1
+
+    def poll(self, changes: MySQLPostChangeDAO, batch_size: int = WATCHER_CONFIG["batch_size"]
+             ) -> Iterator[list[tuple[int, str, str]]]:
+        """逐批产出新可见的变更 [(id, cid, op), ...]；调用方处理完一批后游标才前进。"""
+        if self.gaps:
+            rows = changes.get_changes(list(self.gaps))
+            for row_id, _, _ in rows:
+                del self.gaps[row_id]
+            expired = time.monotonic() - self.gap_timeout
+            self.gaps = {i: t for i, t in self.gaps.items() if t > expired}
+            if rows:
+                yield rows
+        while True:
+            rows = changes.list_changes(self.position, batch_size)
+            if not rows:
+                return
+            yield rows
+            self._note_gaps(rows)
+            self.position = rows[-1][0]
+            if len(rows) < batch_size:
+                return
+
+    def _note_gaps(self, rows) -> None:
+        now = time.monotonic()
+        expected = self.position + 1
+        for row_id, _, _ in rows:
+            for missing in range(expected, min(row_id, expected + self.max_gaps + 1)):
+                self.gaps[missing] = now
+            expected = row_id + 1
+        if len(self.gaps) > self.max_gaps:
+            # 空缺过多时逐个补读不划算，改为由调用方全量重建
+            self.gaps.clear()
+            self.overflow = True
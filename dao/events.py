@@ -0,0 +1,95 @@
+import json
+import os
+import select
+import socket
+import threading
+from dataclasses import dataclass, asdict
+from typing import Callable
+from core.config import NOTIFY_CONFIG
+
+
+@dataclass
+class ChangeEvent:
+    kind: str               # post / url_mapping / reference / user
+    key: str                # 相关文章 CID（user 事件与批量 import 事件为用户 ID）
+    op: str                 # create / update / delete / upsert / add / remove / import
+    value: str | None = None  # 附加信息，如 url_path、被引用的 CID 或导入的篇数
+    origin: int = 0         # 发布事件的进程 PID
+
+
+_subscribers: list[Callable[[ChangeEvent], None]] = []
+_lock = threading.Lock()
+_sock: socket.socket | None = None
+
+
+def subscribe(callback: Callable[[ChangeEvent], None]) -> None:
+    """注册进程内订阅者，事件在发布线程中同步回调。"""
+    with _lock:
+        _subscribers.append(callback)
+
+
+def unsubscribe(callback: Callable[[ChangeEvent], None]) -> None:
+    with _lock:
+        if callback in _subscribers:
+            _subscribers.remove(callback)
+
+
+def _send(event: ChangeEvent) -> None:
+    global _sock
+    try:
+        if _sock is None:
+            _sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            _sock.setblocking(False)
+        payload = json.dumps(asdict(event), separators=(",", ":")).encode("utf-8")
+        _sock.sendto(payload, (NOTIFY_CONFIG["host"], NOTIFY_CONFIG["port"]))
+    except OSError:
+        # 通知只是加速手段，没有监听者或发送失败都不影响写入
+        pass
+
+
+def publish(kind: str, key: str, op: str, value: str | None = None) -> None:
+    """
+    发布一条变更事件：先同步通知进程内订阅者，再通过本机 UDP 广播给其他进程
+    （例如 `mc server start` 中的 DBWatcher）。应在事务提交之后调用。
+    """
+    event = ChangeEvent(kind, key, op, value, os.getpid())
+    with _lock:
+        subscribers = list(_subscribers)
+    for callback in subscribers:
+        try:
+            callback(event)
+        except Exception as e:
+            print(f"[Event Error] {e}")
+    if NOTIFY_CONFIG["enabled"]:
+        _send(event)
+
+
+class ChangeListener:
+    """在本机 UDP 端口上接收其他进程发布的变更事件。"""
+
+    def __init__(self, host: str = NOTIFY_CONFIG["host"], port: int = NOTIFY_CONFIG["port"]):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.sock.setblocking(False)
+
+    def wait(self, timeout: float) -> list[ChangeEvent]:
+        """最多阻塞 timeout 秒，返回期间收到的全部事件（可能为空）。"""
+        ready, _, _ = select.select([self.sock], [], [], timeout)
+        if not ready:
+            return []
+        events = []
+        while True:
+            try:
+                data = self.sock.recv(65535)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                break
+            try:
+                events.append(ChangeEvent(**json.loads(data)))
+            except (ValueError, TypeError):
+                continue
+        return events
+
+    def close(self) -> None:
+        self.sock.close()
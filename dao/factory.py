@@ -1,12 +1,18 @@
+import select
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
 import pymysql
-from core.config import DB_CONFIG
+from pymysql.constants import SERVER_STATUS
+from core.config import DB_CONFIG, POOL_CONFIG
 from dao.driver import get_mysql_connection
 
-def create_connection() -> pymysql.connections.Connection:
-    """
-    根据 core/config.py 的配置创建一个新的数据库连接。
-    调用者有责任在使用完毕后关闭连接。
-    """
+
+def _connect() -> pymysql.connections.Connection:
+    """按 core/config.py 的配置建立一条新的物理连接。"""
     return get_mysql_connection(
         host=DB_CONFIG["host"],
         port=DB_CONFIG["port"],
@@ -14,4 +20,242 @@ def create_connection() -> pymysql.connections.Connection:
         password=DB_CONFIG["password"],
         database=DB_CONFIG["database"],
         charset=DB_CONFIG["charset"]
-    )
\ No newline at end of file
+    )
+
+
+class PooledConnection:
+    """
+    连接池借出的连接代理。
+    除 close() 外的属性均透传给底层 pymysql 连接；close() 不会断开连接，而是归还给连接池。
+    """
+
+    def __init__(self, pool: "ConnectionPool", raw: pymysql.connections.Connection):
+        self._pool = pool
+        self._raw = raw
+
+    def __getattr__(self, name):
+        raw = self.__dict__.get("_raw")
+        if raw is None:
+            raise pymysql.err.InterfaceError("Connection already returned to pool")
+        return getattr(raw, name)
+
+    def close(self) -> None:
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool.release(raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    线程安全的 MySQL 连接池。
+    - size: 同时存在的最大连接数，耗尽时 acquire 最多阻塞 timeout 秒
+    - ping_interval: 空闲超过该秒数的连接在借出前先 ping 一次，失效则重建；
+      更短的空闲只检查套接字，服务器已断开的连接同样会被重建
+    - idle_timeout: 空闲超过该秒数的连接会被关闭回收
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], pymysql.connections.Connection] = _connect,
+        size: int = 8,
+        timeout: float = 10,
+        idle_timeout: float = 300,
+        ping_interval: float = 5,
+    ):
+        if size < 1:
+            raise ValueError("Pool size must be >= 1")
+        self._connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.ping_interval = ping_interval
+        self._idle: deque[tuple[pymysql.connections.Connection, float]] = deque()
+        self._total = 0
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def _evict_idle(self, now: float) -> list:
+        """移除空闲过久的连接（调用方需持有锁），返回待关闭的连接。"""
+        stale = []
+        # 最久未用的连接位于队首
+        while self._idle and now - self._idle[0][1] > self.idle_timeout:
+            stale.append(self._idle.popleft()[0])
+            self._total -= 1
+        return stale
+
+    def _healthy(self, raw, idle_since: float, now: float) -> bool:
+        if _peer_closed(raw):
+            return False
+        if now - idle_since < self.ping_interval:
+            return True
+        try:
+            raw.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def acquire(self) -> PooledConnection:
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise pymysql.err.InterfaceError("Connection pool is closed")
+                now = time.monotonic()
+                stale = self._evict_idle(now)
+                item = None
+                if self._idle:
+                    # LIFO: 优先复用最近归还的热连接
+                    item = self._idle.pop()
+                elif self._total < self.size:
+                    self._total += 1
+                else:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise TimeoutError(f"No free connection within {self.timeout}s")
+                    self._cond.wait(remaining)
+                    continue
+            _close_quietly(stale)
+
+            if item is not None:
+                raw, idle_since = item
+                if self._healthy(raw, idle_since, now):
+                    return PooledConnection(self, raw)
+                self._discard(raw)
+                continue
+
+            try:
+                return PooledConnection(self, self._connect())
+            except Exception:
+                with self._cond:
+                    self._total -= 1
+                    self._cond.notify()
+                raise
+
+    def release(self, raw) -> None:
+        """归还连接。未提交的事务会被回滚，避免把事务快照带给下一个使用者。"""
+        try:
+            if raw.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+                raw.rollback()
+        except Exception:
+            self._discard(raw)
+            return
+
+        with self._cond:
+            if not self._closed:
+                self._idle.append((raw, time.monotonic()))
+                self._cond.notify()
+                return
+            self._total -= 1
+        _close_quietly([raw])
+
+    def _discard(self, raw) -> None:
+        with self._cond:
+            self._total -= 1
+            self._cond.notify()
+        _close_quietly([raw])
+
+    @contextmanager
+    def connection(self) -> Iterator[PooledConnection]:
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def close_all(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle = [raw for raw, _ in self._idle]
+            self._total -= len(idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        _close_quietly(idle)
+
+
+def _peer_closed(raw) -> bool:
+    """
+    不经往返判断空闲连接是否已被服务器关闭：空闲连接上不应有可读数据，
+    可读说明对端已断开（EOF）或发来了错误包（例如 wait_timeout 超时）。
+    """
+    if getattr(raw, "open", True) is False:
+        return True
+    sock = getattr(raw, "_sock", None)
+    if sock is None:
+        return False
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+    except (OSError, ValueError):
+        return True
+    return bool(readable)
+
+
+def _close_quietly(conns) -> None:
+    for raw in conns:
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+
+_pool: ConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """返回进程内共享的连接池（首次调用时按 POOL_CONFIG 创建）。"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    size=POOL_CONFIG["size"],
+                    timeout=POOL_CONFIG["timeout"],
+                    idle_timeout=POOL_CONFIG["idle_timeout"],
+                    ping_interval=POOL_CONFIG["ping_interval"],
+                )
+    return _pool
+
+
+def configure_pool(enabled: bool | None = None, **options) -> None:
+    """
+    调整连接池配置（size / timeout / idle_timeout / ping_interval / enabled）。
+    已存在的连接池会被关闭，下次取连接时按新配置重建。未知的配置项抛出 ValueError。
+    """
+    global _pool
+    unknown = set(options) - set(POOL_CONFIG) - {"enabled"}
+    if unknown:
+        raise ValueError(f"Unknown pool option(s): {', '.join(sorted(unknown))}")
+    if enabled is not None:
+        POOL_CONFIG["enabled"] = enabled
+    POOL_CONFIG.update(options)
+    with _pool_lock:
+        old, _pool = _pool, None
+    if old is not None:
+        old.close_all()
+
+
+def create_connection() -> pymysql.connections.Connection:
+    """
+    根据 core/config.py 的配置获取一个数据库连接。
+    启用连接池时返回池化连接，调用 close() 即归还连接池；
+    调用者有责任在使用完毕后关闭连接。
+    """
+    if POOL_CONFIG["enabled"]:
+        return get_pool().acquire()
+    return _connect()
+
+
+@contextmanager
+def connection() -> Iterator[pymysql.connections.Connection]:
+    """create_connection 的上下文管理器形式，退出时自动关闭/归还连接。"""
+    conn = create_connection()
+    try:
+        yield conn
+    finally:
+        conn.close()
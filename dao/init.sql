@@ -4,6 +4,7 @@ CREATE DATABASE IF NOT EXISTS `megacite` DEFAULT CHARACTER SET = utf8mb4 COLLATE
 USE `megacite`;
 
 -- 为避免重复执行报错，先删除可能已存在的表（按外键依赖顺序）
+DROP TABLE IF EXISTS post_changes;
 DROP TABLE IF EXISTS url_mappings;
 DROP TABLE IF EXISTS post_references;
 DROP TABLE IF EXISTS posts;
@@ -26,6 +27,9 @@ CREATE TABLE auth_platforms (
     CONSTRAINT fk_auth_user FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- 关闭 FULLTEXT 停用词：ngram 分词会丢弃包含停用词的词元，英文单字母停用词会让大量关键字无法命中
+SET SESSION innodb_ft_enable_stopword = OFF;
+
 CREATE TABLE posts (
     id BIGINT PRIMARY KEY AUTO_INCREMENT,
     cid VARCHAR(32) UNIQUE NOT NULL,
@@ -37,6 +41,12 @@ CREATE TABLE posts (
     date DATE NOT NULL,
     -- 确保同一个用户的 title 不重复
     UNIQUE KEY ux_owner_title (owner_id, title),
+    -- 按日期倒序的游标分页（list_page）
+    INDEX idx_date_id (date, id),
+    -- 全文检索（ngram 分词，支持中文与子串匹配），供 search_posts 使用
+    FULLTEXT KEY ft_title (title) WITH PARSER ngram,
+    FULLTEXT KEY ft_description (description) WITH PARSER ngram,
+    FULLTEXT KEY ft_context (`context`) WITH PARSER ngram,
     CONSTRAINT fk_post_owner FOREIGN KEY (owner_id) REFERENCES users(id) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
@@ -44,7 +54,8 @@ CREATE TABLE post_references (
     id BIGINT PRIMARY KEY AUTO_INCREMENT,
     post_cid VARCHAR(32) NOT NULL,
     ref_cid VARCHAR(32) NOT NULL,
-    INDEX idx_post_cid (post_cid),
+    -- 同一引用只记录一次（add_reference 使用 INSERT IGNORE）
+    UNIQUE KEY ux_post_ref (post_cid, ref_cid),
     INDEX idx_ref_cid (ref_cid),
     CONSTRAINT fk_ref_post FOREIGN KEY (post_cid) REFERENCES posts(cid) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -58,5 +69,15 @@ CREATE TABLE url_mappings (
     CONSTRAINT fk_map_cid FOREIGN KEY (cid) REFERENCES posts(cid) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- 文章变更日志：由 DAO 写操作在同一事务内追加，供 DBWatcher 增量轮询
+-- 不设外键，以便保留已删除文章的记录
+CREATE TABLE post_changes (
+    id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    cid VARCHAR(32) NOT NULL,
+    op VARCHAR(16) NOT NULL,
+    changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_changed_at (changed_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 ALTER USER 'root'@'localhost' IDENTIFIED BY '114514';
 FLUSH PRIVILEGES;
\ No newline at end of file
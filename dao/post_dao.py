@@ -1,13 +1,32 @@
 from datetime import datetime
 import pymysql.connections
+from core.config import SEARCH_CONFIG
+from . import events, search_index
+from .change_dao import MySQLPostChangeDAO
 
 class MySQLPostDAO:
     """MySQL 实现的 PostDAO。"""
 
     ALLOWED_FIELDS = {"context", "title", "date", "description", "catagory"}
 
-    def __init__(self, conn: pymysql.connections.Connection):
+    def __init__(self, conn: pymysql.connections.Connection, autocommit: bool = True):
         self.conn = conn
+        # autocommit=False 时由调用方统一提交（见 core.session.request_scope）
+        self.autocommit = autocommit
+        self.pending_events: list[tuple] = []
+        # 变更日志与文章写入共用同一事务
+        self.changes = MySQLPostChangeDAO(conn, autocommit=False)
+
+    def _commit(self) -> None:
+        if self.autocommit:
+            self.conn.commit()
+
+    def _publish(self, kind: str, key: str, op: str, value: str | None = None) -> None:
+        """提交后广播变更；由调用方统一提交时先暂存，提交后再由调用方发布。"""
+        if self.autocommit:
+            events.publish(kind, key, op, value)
+        else:
+            self.pending_events.append((kind, key, op, value))
 
     def create_post(self, owner_id: int, cid: str, title: str, date: str = None) -> None:
         """创建文章，必须提供 title"""
@@ -18,7 +37,41 @@ class MySQLPostDAO:
                 "INSERT INTO posts (cid, owner_id, title, date) VALUES (%s, %s, %s, %s)",
                 (cid, owner_id, title, date),
             )
-        self.conn.commit()
+        self.changes.log_change(cid, "create")
+        self._commit()
+        self._publish("post", cid, "create")
+
+    def create_posts(self, owner_id: int, rows: list[tuple]) -> None:
+        """
+        批量创建文章（导入），rows 为 [(cid, title, context, description, catagory, date), ...]。
+        executemany 合并为多行 INSERT，变更日志同样批量写入。
+        只发布一条汇总事件 (post, owner_id, import, 篇数)，订阅者按 post_changes 读取明细。
+        """
+        if not rows:
+            return
+        with self.conn.cursor() as cur:
+            cur.executemany(
+                "INSERT INTO posts (cid, owner_id, title, `context`, description, catagory, date) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                [(cid, owner_id, *rest) for cid, *rest in rows],
+            )
+        self.changes.log_changes([r[0] for r in rows], "create")
+        self._commit()
+        self._publish("post", str(owner_id), "import", str(len(rows)))
+
+    def existing_titles(self, owner_id: int, titles: list[str]) -> set[str]:
+        """返回 titles 中该用户已使用的标题（按数据库排序规则比较）。"""
+        titles = list(dict.fromkeys(titles))
+        if not titles:
+            return set()
+        placeholders = ", ".join(["%s"] * len(titles))
+        with self.conn.cursor() as cur:
+            cur.execute(
+                f"SELECT title FROM posts WHERE owner_id = %s AND title IN ({placeholders})",
+                (owner_id, *titles),
+            )
+            rows = cur.fetchall() or []
+        return {r[0] for r in rows}
 
     def update_field(self, cid: str, field: str, value: str) -> bool:
         if field not in self.ALLOWED_FIELDS:
@@ -27,7 +80,11 @@ class MySQLPostDAO:
         with self.conn.cursor() as cur:
             cur.execute(sql, (value, cid))
             changed = cur.rowcount
-        self.conn.commit()
+        if changed > 0:
+            self.changes.log_change(cid, "update")
+        self._commit()
+        if changed > 0:
+            self._publish("post", cid, "update")
         return changed > 0
 
     def get_field(self, cid: str, field: str) -> any:
@@ -40,11 +97,53 @@ class MySQLPostDAO:
             return None
         return row[0]
 
+    def update_fields(self, cid: str, updates: dict[str, str]) -> bool:
+        """一条 UPDATE 同时修改多个字段，只记录一次变更、发布一次事件。"""
+        if not updates or any(f not in self.ALLOWED_FIELDS for f in updates):
+            return False
+        assignments = ", ".join(f"`{f}` = %s" for f in updates)
+        with self.conn.cursor() as cur:
+            cur.execute(f"UPDATE posts SET {assignments} WHERE cid = %s", (*updates.values(), cid))
+            changed = cur.rowcount
+        if changed > 0:
+            self.changes.log_change(cid, "update")
+        self._commit()
+        if changed > 0:
+            self._publish("post", cid, "update")
+        return changed > 0
+
+    def _columns(self, fields: list[str]) -> list[str]:
+        unknown = [f for f in fields if f != "cid" and f not in self.ALLOWED_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown field: {', '.join(unknown)}")
+        return list(dict.fromkeys(fields))
+
+    def get_fields(self, cid: str, fields: list[str]) -> dict[str, any] | None:
+        """一次查询读取多个字段，文章不存在时返回 None。"""
+        return self.get_many([cid], fields).get(cid)
+
+    def get_many(self, cids: list[str], fields: list[str]) -> dict[str, dict[str, any]]:
+        """一次查询读取多篇文章的多个字段，返回 cid -> {字段: 值}，不存在的文章不出现在结果中。"""
+        columns = self._columns(fields)
+        cids = list(dict.fromkeys(cids))
+        if not cids:
+            return {}
+        select = ", ".join(["cid"] + [f"`{f}`" for f in columns])
+        placeholders = ", ".join(["%s"] * len(cids))
+        with self.conn.cursor() as cur:
+            cur.execute(f"SELECT {select} FROM posts WHERE cid IN ({placeholders})", cids)
+            rows = cur.fetchall() or []
+        return {r[0]: dict(zip(columns, r[1:])) for r in rows}
+
     def delete_post(self, cid: str) -> bool:
         with self.conn.cursor() as cur:
             cur.execute("DELETE FROM posts WHERE cid = %s", (cid,))
             deleted = cur.rowcount
-        self.conn.commit()
+        if deleted > 0:
+            self.changes.log_change(cid, "delete")
+        self._commit()
+        if deleted > 0:
+            self._publish("post", cid, "delete")
         return deleted > 0
 
     def list_posts(self, offset: int, limit: int, orderby=None) -> list[str]:
@@ -58,31 +157,88 @@ class MySQLPostDAO:
             rows = cur.fetchall()
         return [r[0] for r in rows] if rows else []
 
-    def search_posts(self, keyword: str) -> list[str]:
-        like = f"%{keyword}%"
-        results: list[str] = []
-        seen = set()
+    @staticmethod
+    def _encode_cursor(date, post_id: int) -> str:
+        return f"{date.isoformat()}_{post_id}"
 
+    @staticmethod
+    def _decode_cursor(cursor: str) -> tuple[str, int]:
+        try:
+            date, post_id = cursor.rsplit("_", 1)
+            return datetime.strptime(date, "%Y-%m-%d").date().isoformat(), int(post_id)
+        except ValueError:
+            raise ValueError(f"Invalid cursor: {cursor}") from None
+
+    def list_page(self, limit: int, cursor: str | None = None,
+                  fields: list[str] | None = None) -> tuple[list, str | None]:
+        """
+        按 (date, id) 倒序的游标分页，每页一次索引范围扫描，与翻页深度无关。
+        fields 为 None 时返回 CID 列表，否则返回包含 cid 与所选字段的字典列表。
+        返回 (rows, next_cursor)，没有下一页时 next_cursor 为 None。
+        """
+        if limit < 1:
+            raise ValueError(f"Invalid page size: {limit}")
+        keys = self._columns(["cid"] + (fields or []))
+        columns = ["id", "date"] + [f"`{k}`" for k in keys]
+
+        sql = f"SELECT {', '.join(columns)} FROM posts"
+        params: list = []
+        if cursor:
+            date, post_id = self._decode_cursor(cursor)
+            sql += " WHERE date < %s OR (date = %s AND id < %s)"
+            params += [date, date, post_id]
+        # 多取一行用于判断是否还有下一页
+        sql += " ORDER BY date DESC, id DESC LIMIT %s"
+        params.append(limit + 1)
         with self.conn.cursor() as cur:
-            cur.execute("SELECT cid FROM posts WHERE title LIKE %s", (like,))
-            for r in cur.fetchall():
-                cid = r[0]
-                if cid not in seen:
-                    seen.add(cid)
-                    results.append(cid)
-
-            cur.execute("SELECT cid FROM posts WHERE description LIKE %s", (like,))
-            for r in cur.fetchall():
-                cid = r[0]
-                if cid not in seen:
-                    seen.add(cid)
-                    results.append(cid)
-
-            cur.execute("SELECT cid FROM posts WHERE context LIKE %s", (like,))
-            for r in cur.fetchall():
-                cid = r[0]
-                if cid not in seen:
-                    seen.add(cid)
-                    results.append(cid)
-
-        return results
\ No newline at end of file
+            cur.execute(sql, params)
+            rows = list(cur.fetchall() or [])
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self._encode_cursor(rows[-1][1], rows[-1][0])
+        if not fields:
+            return [r[2] for r in rows], next_cursor
+        return [dict(zip(keys, r[2:])) for r in rows], next_cursor
+
+    # 按 title > description > context 的优先级合并命中结果，同一篇文章只保留最高优先级
+    SEARCH_FIELDS = ("title", "description", "`context`")
+
+    def _search(self, condition: str, param: str, offset: int, limit: int | None) -> list[str]:
+        branches = " UNION ALL ".join(
+            f"SELECT id, cid, {tier} AS tier FROM posts WHERE {condition.format(field=field)}"
+            for tier, field in enumerate(self.SEARCH_FIELDS)
+        )
+        sql = f"SELECT cid FROM ({branches}) hits GROUP BY id, cid ORDER BY MIN(tier), id"
+        params = [param] * len(self.SEARCH_FIELDS)
+        if limit is not None:
+            sql += " LIMIT %s OFFSET %s"
+            params += [limit, offset]
+        elif offset:
+            sql += " LIMIT 18446744073709551615 OFFSET %s"
+            params.append(offset)
+        with self.conn.cursor() as cur:
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+        return [r[0] for r in rows] if rows else []
+
+    def search_posts(self, keyword: str, offset: int = 0, limit: int | None = None) -> list[str]:
+        """
+        关键字搜索，一条语句完成三个字段的检索、去重、排序与分页。
+        关键字长度不小于 ngram 词元长度时走 FULLTEXT 索引（短语匹配，等价于子串匹配），
+        否则退回 LIKE 扫描。backend 为 ngram 且索引已驻留时优先使用进程内倒排索引。
+        """
+        if offset < 0 or (limit is not None and limit < 0):
+            raise ValueError(f"Invalid search offset/limit: {offset}, {limit}")
+        if SEARCH_CONFIG["backend"] == "ngram":
+            index = search_index.get_index(SEARCH_CONFIG["ngram_warmup"])
+            results = None if index is None else index.search(keyword, offset, limit)
+            if results is not None:
+                return results
+        if len(keyword) >= SEARCH_CONFIG["ngram_token_size"]:
+            # 短语查询：去掉会破坏 BOOLEAN MODE 语法的双引号
+            phrase = '"' + keyword.replace('"', " ") + '"'
+            return self._search("MATCH({field}) AGAINST (%s IN BOOLEAN MODE)", phrase, offset, limit)
+        like = "%" + keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        return self._search("{field} LIKE %s", like, offset, limit)
@@ -1,10 +1,26 @@
 import pymysql.connections
+from . import events
+from .change_dao import MySQLPostChangeDAO
 
 class MySQLPostReferenceDAO:
     """MySQL 实现的 PostReferenceDAO。"""
 
-    def __init__(self, conn: pymysql.connections.Connection):
+    def __init__(self, conn: pymysql.connections.Connection, autocommit: bool = True):
         self.conn = conn
+        self.autocommit = autocommit
+        self.pending_events: list[tuple] = []
+        # 引用变化记为源文章的 reference 变更，DBWatcher 据此增量更新引用区块
+        self.changes = MySQLPostChangeDAO(conn, autocommit=False)
+
+    def _commit(self) -> None:
+        if self.autocommit:
+            self.conn.commit()
+
+    def _publish(self, kind: str, key: str, op: str, value: str | None = None) -> None:
+        if self.autocommit:
+            events.publish(kind, key, op, value)
+        else:
+            self.pending_events.append((kind, key, op, value))
 
     def add_reference(self, post_cid: str, ref_cid: str) -> None:
         with self.conn.cursor() as cur:
@@ -12,7 +28,52 @@ class MySQLPostReferenceDAO:
                 "INSERT IGNORE INTO post_references (post_cid, ref_cid) VALUES (%s, %s)",
                 (post_cid, ref_cid),
             )
-        self.conn.commit()
+            added = cur.rowcount
+        if added > 0:
+            self.changes.log_change(post_cid, "reference")
+        self._commit()
+        if added > 0:
+            self._publish("reference", post_cid, "add", ref_cid)
+
+    def add_references(self, pairs: list[tuple[str, str]]) -> None:
+        """
+        批量添加引用（批量导入），pairs 为 [(post_cid, ref_cid), ...]，已存在的引用被忽略。
+        不逐条发布事件：明细记入 post_changes，提交后只发布一条汇总事件 (reference, *, import, 引用数)。
+        """
+        pairs = list(dict.fromkeys(pairs))
+        if not pairs:
+            return
+        with self.conn.cursor() as cur:
+            cur.executemany("INSERT IGNORE INTO post_references (post_cid, ref_cid) VALUES (%s, %s)", pairs)
+        self.changes.log_changes(list(dict.fromkeys(p[0] for p in pairs)), "reference")
+        self._commit()
+        self._publish("reference", "*", "import", str(len(pairs)))
+
+    def set_references(self, post_cid: str, ref_cids: list[str]) -> None:
+        """把文章的引用替换为 ref_cids（正文修改后重新扫描），只写入增删的部分。"""
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT ref_cid FROM post_references WHERE post_cid = %s", (post_cid,))
+            current = {r[0] for r in cur.fetchall() or []}
+            wanted = set(ref_cids)
+            added, removed = sorted(wanted - current), sorted(current - wanted)
+            if removed:
+                placeholders = ", ".join(["%s"] * len(removed))
+                cur.execute(
+                    f"DELETE FROM post_references WHERE post_cid = %s AND ref_cid IN ({placeholders})",
+                    (post_cid, *removed),
+                )
+            if added:
+                cur.executemany(
+                    "INSERT IGNORE INTO post_references (post_cid, ref_cid) VALUES (%s, %s)",
+                    [(post_cid, ref) for ref in added],
+                )
+        if added or removed:
+            self.changes.log_change(post_cid, "reference")
+        self._commit()
+        for ref in added:
+            self._publish("reference", post_cid, "add", ref)
+        for ref in removed:
+            self._publish("reference", post_cid, "remove", ref)
 
     def remove_reference(self, post_cid: str, ref_cid: str) -> None:
         with self.conn.cursor() as cur:
@@ -20,7 +81,12 @@ class MySQLPostReferenceDAO:
                 "DELETE FROM post_references WHERE post_cid = %s AND ref_cid = %s",
                 (post_cid, ref_cid),
             )
-        self.conn.commit()
+            removed = cur.rowcount
+        if removed > 0:
+            self.changes.log_change(post_cid, "reference")
+        self._commit()
+        if removed > 0:
+            self._publish("reference", post_cid, "remove", ref_cid)
 
     def list_references(self, post_cid: str) -> list[str]:
         with self.conn.cursor() as cur:
@@ -0,0 +1,354 @@
+import threading
+from array import array
+from bisect import bisect_left
+from collections import deque
+from .change_dao import ChangeCursor, MySQLPostChangeDAO
+from .factory import connection
+
+
+class _Adjacency:
+    """
+    CSR 邻接表：节点 u 的邻居为 targets[offsets[u]:offsets[u + 1]]，且升序排列。
+    每条边只占 4 字节，另加每个节点 4 字节的偏移量。
+    """
+
+    def __init__(self, n: int = 0, keys: list[int] = ()):
+        # keys 为已排序、去重的 u * n + v
+        self.offsets = array("I", bytes(4 * (n + 1)))
+        self.targets = array("I")
+        for key in keys:
+            u, v = divmod(key, n)
+            self.offsets[u + 1] += 1
+            self.targets.append(v)
+        for u in range(n):
+            self.offsets[u + 1] += self.offsets[u]
+
+    def row(self, u: int) -> array:
+        if u + 1 >= len(self.offsets):
+            return array("I")
+        return self.targets[self.offsets[u]:self.offsets[u + 1]]
+
+    def contains(self, u: int, v: int) -> bool:
+        if u + 1 >= len(self.offsets):
+            return False
+        lo, hi = self.offsets[u], self.offsets[u + 1]
+        i = bisect_left(self.targets, v, lo, hi)
+        return i < hi and self.targets[i] == v
+
+    def __len__(self) -> int:
+        return len(self.targets)
+
+
+class ReferenceGraph:
+    """
+    post_references 的内存引用图：正向（引用）与反向（被引用）各一份 CSR 数组。
+    增删边先记在增量集合中，增量超过边数的 1/COMPACT_RATIO 时重建数组。
+    按 post_changes 变更日志同步（见 sync），其他进程的写入同样可见。
+    由 DBWatcher 驱动时（driven=True）sync 不做任何事：Watcher 用自己的游标维护引用图，
+    并依赖每次更新的引用差异决定重建哪些页面，别处同步会吞掉这些差异。
+    """
+
+    COMPACT_RATIO = 8
+    COMPACT_MIN = 1024
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._ids: dict[str, int] = {}      # cid -> 节点编号
+        self._cids: list[str] = []          # 节点编号 -> cid
+        self._exists = bytearray()          # 节点对应的文章是否存在（被引用的文章可能已删除）
+        self._fwd = _Adjacency()
+        self._bwd = _Adjacency()
+        self._added_out: dict[int, set[int]] = {}
+        self._added_in: dict[int, set[int]] = {}
+        self._removed: set[tuple[int, int]] = set()
+        self._delta = 0
+        self.changes = ChangeCursor()
+        self.driven = False                 # 是否由 DBWatcher 驱动更新
+
+    # ---- 构建 ----
+
+    def _id(self, cid: str) -> int:
+        node = self._ids.get(cid)
+        if node is None:
+            node = self._ids[cid] = len(self._cids)
+            self._cids.append(cid)
+            self._exists.append(0)
+        return node
+
+    def _build(self, edges) -> None:
+        n = len(self._cids)
+        self._fwd = _Adjacency(n, sorted({u * n + v for u, v in edges}))
+        self._bwd = _Adjacency(n, sorted(v * n + u for u, v in self._iter_base_edges()))
+        self._added_out.clear()
+        self._added_in.clear()
+        self._removed.clear()
+        self._delta = 0
+
+    def _iter_base_edges(self):
+        offsets, targets = self._fwd.offsets, self._fwd.targets
+        for u in range(len(offsets) - 1):
+            for i in range(offsets[u], offsets[u + 1]):
+                yield u, targets[i]
+
+    def load_rows(self, rows) -> None:
+        """rows 为 (post_cid, ref_cid)；ref_cid 为 None 的行只声明文章存在。"""
+        with self._lock:
+            self._ids, self._cids, self._exists = {}, [], bytearray()
+            edges = []
+            for post_cid, ref_cid in rows:
+                u = self._id(post_cid)
+                if ref_cid is None:
+                    self._exists[u] = 1
+                else:
+                    edges.append((u, self._id(ref_cid)))
+            self._build(edges)
+
+    def load(self, conn) -> None:
+        """一次查询载入全部引用边与文章列表，并把变更日志游标置于加载前的位置。"""
+        _, max_id = MySQLPostChangeDAO(conn).get_bounds()
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT post_cid, ref_cid FROM post_references "
+                "UNION ALL SELECT cid, NULL FROM posts"
+            )
+            rows = cur.fetchall() or []
+        conn.commit()  # 结束只读事务，后续 sync 才能看到新提交的变更
+        self.load_rows(rows)
+        self.changes.reset(max_id)
+
+    def refresh(self, conn, cids) -> set[str]:
+        """重新读取若干文章的存在性与引用，返回引用关系发生变化的 CID（含增删的目标）。"""
+        cids = list(cids)
+        if not cids:
+            return set()
+        placeholders = ", ".join(["%s"] * len(cids))
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT cid FROM posts WHERE cid IN ({placeholders})", cids)
+            existing = {r[0] for r in cur.fetchall() or []}
+            cur.execute(f"SELECT post_cid, ref_cid FROM post_references WHERE post_cid IN ({placeholders})", cids)
+            refs: dict[str, set[str]] = {}
+            for post_cid, ref_cid in cur.fetchall() or []:
+                refs.setdefault(post_cid, set()).add(ref_cid)
+        changed = set()
+        for cid in cids:
+            self.set_post(cid, cid in existing)
+            diff = self.set_refs(cid, refs.get(cid, ()))
+            if diff:
+                changed |= diff | {cid}
+        return changed
+
+    def sync(self, conn) -> None:
+        """按 post_changes 增量同步；日志已被清理到游标之后时重新全量加载。由 Watcher 驱动时跳过。"""
+        if self.driven:
+            return
+        changes = MySQLPostChangeDAO(conn)
+        if self.changes.needs_full(changes):
+            self.load(conn)
+            return
+        for rows in self.changes.poll(changes):
+            self.refresh(conn, {r[1] for r in rows})
+        conn.commit()
+
+    def _compact(self) -> None:
+        self._build([(u, v) for u in range(len(self._cids)) for v in self._out(u)])
+
+    # ---- 增量维护 ----
+
+    def _has_edge(self, u: int, v: int) -> bool:
+        if v in self._added_out.get(u, ()):
+            return True
+        return self._fwd.contains(u, v) and (u, v) not in self._removed
+
+    def add_edge(self, post_cid: str, ref_cid: str) -> None:
+        with self._lock:
+            u, v = self._id(post_cid), self._id(ref_cid)
+            if self._has_edge(u, v):
+                return
+            if (u, v) in self._removed:
+                self._removed.discard((u, v))
+            else:
+                self._added_out.setdefault(u, set()).add(v)
+                self._added_in.setdefault(v, set()).add(u)
+            self._exists[u] = 1
+            self._after_change()
+
+    def remove_edge(self, post_cid: str, ref_cid: str) -> None:
+        with self._lock:
+            u, v = self._ids.get(post_cid), self._ids.get(ref_cid)
+            if u is None or v is None or not self._has_edge(u, v):
+                return
+            if v in self._added_out.get(u, ()):
+                self._added_out[u].discard(v)
+                self._added_in[v].discard(u)
+            else:
+                self._removed.add((u, v))
+            self._after_change()
+
+    def _after_change(self) -> None:
+        self._delta += 1
+        if self._delta > max(self.COMPACT_MIN, len(self._fwd) // self.COMPACT_RATIO):
+            self._compact()
+
+    def set_post(self, cid: str, exists: bool) -> None:
+        """文章创建/删除。删除时其引用随外键级联删除，但指向它的引用保留（成为悬空引用）。"""
+        with self._lock:
+            u = self._id(cid)
+            self._exists[u] = 1 if exists else 0
+            if not exists:
+                for v in self._out(u):
+                    self.remove_edge(cid, self._cids[v])
+
+    def set_refs(self, cid: str, refs) -> set[str]:
+        """把 cid 的引用集合替换为 refs，返回新增或移除的被引用 CID。"""
+        with self._lock:
+            u = self._ids.get(cid)
+            old = set() if u is None else {self._cids[v] for v in self._out(u)}
+            refs = set(refs)
+            for ref in old - refs:
+                self.remove_edge(cid, ref)
+            for ref in refs - old:
+                self.add_edge(cid, ref)
+            return old ^ refs
+
+    # ---- 查询 ----
+
+    def _out(self, u: int) -> list[int]:
+        row = self._fwd.row(u)
+        if self._removed:
+            row = [v for v in row if (u, v) not in self._removed]
+        added = self._added_out.get(u)
+        return list(row) + sorted(added) if added else list(row)
+
+    def _in(self, v: int) -> list[int]:
+        row = self._bwd.row(v)
+        if self._removed:
+            row = [u for u in row if (u, v) not in self._removed]
+        added = self._added_in.get(v)
+        return list(row) + sorted(added) if added else list(row)
+
+    def references(self, cid: str) -> list[str]:
+        """cid 直接引用的文章。"""
+        with self._lock:
+            u = self._ids.get(cid)
+            return [] if u is None else [self._cids[v] for v in self._out(u)]
+
+    def cited_by(self, cid: str) -> list[str]:
+        """直接引用 cid 的文章（反向链接）。"""
+        with self._lock:
+            v = self._ids.get(cid)
+            return [] if v is None else [self._cids[u] for u in self._in(v)]
+
+    def _walk(self, cid: str, step, max_depth: int | None) -> list[str]:
+        with self._lock:
+            start = self._ids.get(cid)
+            if start is None:
+                return []
+            seen = bytearray(len(self._cids))
+            seen[start] = 1
+            result = []
+            queue = deque([(start, 0)])
+            while queue:
+                u, depth = queue.popleft()
+                if max_depth is not None and depth >= max_depth:
+                    continue
+                for v in step(u):
+                    if not seen[v]:
+                        seen[v] = 1
+                        result.append(self._cids[v])
+                        queue.append((v, depth + 1))
+            return result
+
+    def dependencies(self, cid: str, max_depth: int | None = None) -> list[str]:
+        """cid 直接或间接引用的全部文章（按广度优先顺序，不含 cid 自身）。"""
+        return self._walk(cid, self._out, max_depth)
+
+    def dependents(self, cid: str, max_depth: int | None = None) -> list[str]:
+        """直接或间接引用 cid 的全部文章。"""
+        return self._walk(cid, self._in, max_depth)
+
+    def cycles(self) -> list[list[str]]:
+        """返回所有循环引用（强连通分量，含自引用），每个分量内按 CID 排序。"""
+        with self._lock:
+            n = len(self._cids)
+            index, low = [-1] * n, [0] * n
+            on_stack = bytearray(n)
+            stack, result = [], []
+            counter = 0
+            # 迭代版 Tarjan，避免深链触发递归深度限制
+            for root in range(n):
+                if index[root] != -1:
+                    continue
+                index[root] = low[root] = counter
+                counter += 1
+                stack.append(root)
+                on_stack[root] = 1
+                work = [(root, iter(self._out(root)))]
+                while work:
+                    u, it = work[-1]
+                    for v in it:
+                        if index[v] == -1:
+                            index[v] = low[v] = counter
+                            counter += 1
+                            stack.append(v)
+                            on_stack[v] = 1
+                            work.append((v, iter(self._out(v))))
+                            break
+                        if on_stack[v] and index[v] < low[u]:
+                            low[u] = index[v]
+                    else:
+                        work.pop()
+                        if work:
+                            parent = work[-1][0]
+                            if low[u] < low[parent]:
+                                low[parent] = low[u]
+                        if low[u] == index[u]:
+                            component = []
+                            while True:
+                                w = stack.pop()
+                                on_stack[w] = 0
+                                component.append(w)
+                                if w == u:
+                                    break
+                            if len(component) > 1 or self._has_edge(u, u):
+                                result.append(sorted(self._cids[w] for w in component))
+            return result
+
+    def dangling(self) -> list[tuple[str, str]]:
+        """指向不存在文章的引用 [(post_cid, ref_cid), ...]。"""
+        with self._lock:
+            return [
+                (self._cids[u], self._cids[v])
+                for v in range(len(self._cids)) if not self._exists[v]
+                for u in self._in(v)
+            ]
+
+    def orphans(self) -> list[str]:
+        """既不引用其他文章、也不被引用的文章。"""
+        with self._lock:
+            return [
+                self._cids[u] for u in range(len(self._cids))
+                if self._exists[u] and not self._out(u) and not self._in(u)
+            ]
+
+    def edge_count(self) -> int:
+        with self._lock:
+            return len(self._fwd) - len(self._removed) + sum(map(len, self._added_out.values()))
+
+
+_graph: ReferenceGraph | None = None
+_graph_lock = threading.Lock()
+
+
+def get_graph(sync: bool = True) -> ReferenceGraph:
+    """
+    返回进程内引用图。sync=True 时先按 post_changes 同步（首次调用时全量加载）。
+    DBWatcher 以 sync=False 获取并用自己的游标驱动更新，此后 sync=True 不再同步该图。
+    """
+    global _graph
+    with _graph_lock:
+        if _graph is None:
+            _graph = ReferenceGraph()
+        if sync:
+            with connection() as conn:
+                _graph.sync(conn)
+        return _graph
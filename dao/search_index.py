@@ -0,0 +1,219 @@
+import gc
+import re
+import threading
+import unicodedata
+import pymysql.cursors
+from .change_dao import ChangeCursor, MySQLPostChangeDAO
+from .factory import connection
+
+# 中日韩字符（CJK 统一表意文字、扩展 A、兼容表意文字、假名、谚文）
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"
+# CJK 连续片段，或不含 CJK 的字母数字单词
+_RUN_RE = re.compile(f"[{_CJK}]+|[^\\W_{_CJK}]+")
+
+
+def tokenize(text: str | None) -> list[str]:
+    """
+    与 MySQL ngram 解析器（ngram_token_size=2）一致的分词：每个片段切分为相邻二元组，
+    单字片段保留单字。CJK 片段与字母数字单词分属不同片段，二元组不跨越片段。
+    返回值的下标即词元位置，短语查询要求词元位置连续，因此英文关键字同样按子串匹配。
+    与 LIKE 的差别：标点、空白与下划线都视为分隔符，"a-b" 与 "a b" 可以互相命中。
+    """
+    if not text:
+        return []
+    tokens: list[str] = []
+    for run in _RUN_RE.findall(unicodedata.normalize("NFKC", text).casefold()):
+        if len(run) > 1:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def _positions(value: int | tuple[int, ...]) -> tuple[int, ...]:
+    return (value,) if isinstance(value, int) else value
+
+
+class NgramIndex:
+    """
+    进程内的 title / description / context 倒排索引（带词元位置，支持短语查询）。
+    结果排序与 search_posts 一致：title > description > context，同级按文章写入顺序。
+    其他进程（命令行、导入）的写入通过 post_changes 变更日志同步，见 sync。
+    """
+
+    FIELDS = ("title", "description", "context")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._docnos: dict[str, int] = {}   # cid -> 文档序号（决定同级结果的先后）
+        self._docs: dict[int, tuple] = {}   # 文档序号 -> (cid, owner_id, 各字段的词元集合)
+        self._next_docno = 0
+        # 每个字段一份倒排表：词元 -> {文档序号: 位置}；只出现一次的词元直接存 int，省去元组分配
+        self._postings: list[dict[str, dict[int, int | tuple[int, ...]]]] = [{} for _ in self.FIELDS]
+        self.changes = ChangeCursor()
+
+    def __len__(self) -> int:
+        return len(self._docnos)
+
+    def add(self, cid: str, owner_id: int | None, *texts: str | None) -> None:
+        """写入或替换一篇文章，texts 按 FIELDS 的顺序给出。"""
+        fields = []
+        for text in texts:
+            positions: dict[str, list[int]] = {}
+            for pos, token in enumerate(tokenize(text)):
+                positions.setdefault(token, []).append(pos)
+            fields.append(positions)
+
+        with self._lock:
+            docno = self._docnos.get(cid)
+            if docno is None:
+                docno = self._docnos[cid] = self._next_docno
+                self._next_docno += 1
+            else:
+                self._unindex(docno)
+            for postings, positions in zip(self._postings, fields):
+                for token, pos in positions.items():
+                    postings.setdefault(token, {})[docno] = pos[0] if len(pos) == 1 else tuple(pos)
+            self._docs[docno] = (cid, owner_id, tuple(tuple(p) for p in fields))
+
+    def remove(self, cid: str) -> None:
+        with self._lock:
+            docno = self._docnos.pop(cid, None)
+            if docno is not None:
+                self._unindex(docno)
+                del self._docs[docno]
+
+    def remove_owner(self, owner_id: int) -> None:
+        """用户被删除时，其文章随外键级联删除，不会产生逐篇的 post 事件。"""
+        with self._lock:
+            cids = [doc[0] for doc in self._docs.values() if doc[1] == owner_id]
+        for cid in cids:
+            self.remove(cid)
+
+    def _unindex(self, docno: int) -> None:
+        for postings, tokens in zip(self._postings, self._docs[docno][2]):
+            for token in tokens:
+                docs = postings.get(token)
+                if docs is not None:
+                    docs.pop(docno, None)
+                    if not docs:
+                        del postings[token]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._docnos.clear()
+            self._docs.clear()
+            for postings in self._postings:
+                postings.clear()
+
+    def _match_field(self, postings: dict, tokens: list[str]) -> list[int]:
+        lists = [postings.get(token) for token in dict.fromkeys(tokens)]
+        if not all(lists):
+            return []
+        lists.sort(key=len)
+        candidates = set(lists[0]).intersection(*lists[1:])
+        if len(tokens) == 1:
+            return list(candidates)
+
+        hits = []
+        first = postings[tokens[0]]
+        rest = [(offset, postings[token]) for offset, token in enumerate(tokens) if offset]
+        for docno in candidates:
+            # 存在起点 p，使第 i 个词元出现在 p + i，即为短语命中
+            following = [(offset, _positions(docs[docno])) for offset, docs in rest]
+            if any(all(p + offset in pos for offset, pos in following) for p in _positions(first[docno])):
+                hits.append(docno)
+        return hits
+
+    def search(self, keyword: str, offset: int = 0, limit: int | None = None) -> list[str] | None:
+        """
+        短语查询，返回 CID 列表。
+        关键字含有单字片段时索引无法回答（只保存了二元组），返回 None，由调用方退回数据库查询。
+        """
+        tokens = tokenize(keyword)
+        if not tokens or any(len(t) == 1 for t in tokens):
+            return None
+        results: list[str] = []
+        seen: set[int] = set()
+        with self._lock:
+            for postings in self._postings:
+                for docno in sorted(self._match_field(postings, tokens)):
+                    if docno not in seen:
+                        seen.add(docno)
+                        results.append(self._docs[docno][0])
+        end = None if limit is None else offset + limit
+        return results[offset:end]
+
+    def load(self, conn) -> None:
+        """一次流式查询重建整个索引，并把变更日志游标置于加载前的位置。"""
+        _, max_id = MySQLPostChangeDAO(conn).get_bounds()
+        self.clear()
+        # 批量构建会产生大量长期存活的小对象，期间暂停分代 GC 可将构建时间缩短数倍
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            with conn.cursor(pymysql.cursors.SSCursor) as cur:
+                cur.execute("SELECT cid, owner_id, title, description, `context` FROM posts ORDER BY id")
+                for cid, owner_id, *texts in cur:
+                    self.add(cid, owner_id, *texts)
+        finally:
+            if gc_enabled:
+                gc.enable()
+        conn.commit()  # 结束只读事务，后续 sync 才能看到新提交的变更
+        self.changes.reset(max_id)
+
+    def refresh(self, conn, cids) -> None:
+        """一次查询重新读取若干文章；已不存在的文章从索引中移除。"""
+        cids = list(cids)
+        if not cids:
+            return
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT cid, owner_id, title, description, `context` FROM posts "
+                f"WHERE cid IN ({', '.join(['%s'] * len(cids))})",
+                cids,
+            )
+            rows = cur.fetchall() or []
+        for row in rows:
+            self.add(*row)
+        found = {row[0] for row in rows}
+        for cid in cids:
+            if cid not in found:
+                self.remove(cid)
+
+    def sync(self, conn) -> None:
+        """
+        按 post_changes 增量同步（包括其他进程的写入与级联删除）；
+        日志已被清理到游标之后时重新全量加载。
+        """
+        changes = MySQLPostChangeDAO(conn)
+        if self.changes.needs_full(changes):
+            self.load(conn)
+            return
+        for rows in self.changes.poll(changes):
+            self.refresh(conn, {r[1] for r in rows})
+        conn.commit()
+
+
+_index: NgramIndex | None = None
+_index_lock = threading.Lock()
+_misses = 0
+
+
+def get_index(warmup: int = 0) -> NgramIndex | None:
+    """
+    返回同步到最新变更的进程内索引。
+    索引尚未驻留时，前 warmup 次调用返回 None 而不加载：一次性的命令行进程只搜索一两次，
+    全量加载整张表得不偿失，由调用方退回数据库查询。
+    """
+    global _index, _misses
+    with _index_lock:
+        if _index is None:
+            _misses += 1
+            if _misses <= warmup:
+                return None
+        index = NgramIndex() if _index is None else _index
+        with connection() as conn:
+            index.sync(conn)
+        _index = index
+        return index
@@ -1,10 +1,23 @@
 import pymysql.connections
+from . import events
 
 class MySQLUrlMapDAO:
     """维护 URL 到 CID 的双向映射。"""
 
-    def __init__(self, conn: pymysql.connections.Connection):
+    def __init__(self, conn: pymysql.connections.Connection, autocommit: bool = True):
         self.conn = conn
+        self.autocommit = autocommit
+        self.pending_events: list[tuple] = []
+
+    def _commit(self) -> None:
+        if self.autocommit:
+            self.conn.commit()
+
+    def _publish(self, kind: str, key: str, op: str, value: str | None = None) -> None:
+        if self.autocommit:
+            events.publish(kind, key, op, value)
+        else:
+            self.pending_events.append((kind, key, op, value))
 
     def upsert_mapping(self, cid: str, url_path: str) -> None:
         """插入或更新映射。url_path 必须以 / 开头，例如 /user/title.html"""
@@ -14,7 +27,42 @@ class MySQLUrlMapDAO:
                 "ON DUPLICATE KEY UPDATE url_path = %s",
                 (cid, url_path, url_path),
             )
-        self.conn.commit()
+        self._commit()
+        self._publish("url_mapping", cid, "upsert", url_path)
+
+    def upsert_mappings(self, items: list[tuple[str, str]]) -> None:
+        """
+        批量插入或更新映射（批量导入），items 为 [(cid, url_path), ...]。
+        不逐条发布事件：同一事务中 create_posts 的汇总事件已通知订阅者。
+        """
+        if not items:
+            return
+        with self.conn.cursor() as cur:
+            # executemany 会把多行合并为一条 INSERT；ON DUPLICATE 子句中不能再带参数
+            cur.executemany(
+                "INSERT INTO url_mappings (cid, url_path) VALUES (%s, %s) "
+                "ON DUPLICATE KEY UPDATE url_path = VALUES(url_path)",
+                items,
+            )
+        self._commit()
+
+    def get_cids_by_urls(self, url_paths: list[str]) -> dict[str, str]:
+        """批量通过 URL 查找 CID，返回 url_path -> cid，未找到的 URL 不出现在结果中。"""
+        url_paths = list(dict.fromkeys(url_paths))
+        if not url_paths:
+            return {}
+        placeholders = ", ".join(["%s"] * len(url_paths))
+        with self.conn.cursor() as cur:
+            cur.execute(f"SELECT url_path, cid FROM url_mappings WHERE url_path IN ({placeholders})", url_paths)
+            rows = cur.fetchall() or []
+        return {r[0]: r[1] for r in rows}
+
+    def list_mappings(self) -> list[tuple[str, str]]:
+        """返回全部映射 [(cid, url_path), ...]，供 URLManager 一次性载入路由表。"""
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT cid, url_path FROM url_mappings")
+            rows = cur.fetchall()
+        return [(r[0], r[1]) for r in rows] if rows else []
 
     def get_cid_by_url(self, url_path: str) -> str | None:
         """通过 URL 查找 CID。"""
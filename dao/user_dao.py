@@ -1,11 +1,27 @@
 import pymysql.connections
+from . import events
 from .models import User
+from .cache import username_cache
+from .change_dao import MySQLPostChangeDAO
 
 class MySQLUserDAO:
     """MySQL 实现的 UserDAO。"""
 
-    def __init__(self, conn: pymysql.connections.Connection):
+    def __init__(self, conn: pymysql.connections.Connection, autocommit: bool = True):
         self.conn = conn
+        self.autocommit = autocommit
+        self.pending_events: list[tuple] = []
+        self.changes = MySQLPostChangeDAO(conn, autocommit=False)
+
+    def _commit(self) -> None:
+        if self.autocommit:
+            self.conn.commit()
+
+    def _publish(self, kind: str, key: str, op: str, value: str | None = None) -> None:
+        if self.autocommit:
+            events.publish(kind, key, op, value)
+        else:
+            self.pending_events.append((kind, key, op, value))
 
     def create_user(self, username: str, password_hash: str) -> int:
         with self.conn.cursor() as cur:
@@ -14,7 +30,7 @@ class MySQLUserDAO:
                 (username, password_hash),
             )
             user_id = cur.lastrowid
-        self.conn.commit()
+        self._commit()
         return user_id
 
     def get_user_by_username(self, username: str) -> User | None:
@@ -28,6 +44,28 @@ class MySQLUserDAO:
             return None
         return User(id=row[0], username=row[1], password_hash=row[2])
 
+    def get_usernames(self, user_ids) -> dict[int, str]:
+        """
+        批量查询用户名，返回 {user_id: username}，不存在的用户不会出现在结果中。
+        优先读取进程内缓存，未命中的 id 合并为一次查询。
+        """
+        names = {}
+        missing = []
+        for uid in set(user_ids):
+            name = username_cache.get(uid)
+            if name is None:
+                missing.append(uid)
+            else:
+                names[uid] = name
+        if missing:
+            placeholders = ", ".join(["%s"] * len(missing))
+            with self.conn.cursor() as cur:
+                cur.execute(f"SELECT id, username FROM users WHERE id IN ({placeholders})", missing)
+                for uid, name in cur.fetchall():
+                    username_cache.set(uid, name)
+                    names[uid] = name
+        return names
+
     def update_user(self, user_id: int, updates: dict[str, any]) -> bool:
         if not updates:
             return False
@@ -41,12 +79,18 @@ class MySQLUserDAO:
         with self.conn.cursor() as cur:
             cur.execute(sql, tuple(values))
             changed = cur.rowcount
-        self.conn.commit()
+        self._commit()
+        if "token" in updates or "username" in updates:
+            # 缓存由 dao.cache 订阅 user 事件失效，事件在提交后才发布
+            self._publish("user", str(user_id), "update")
         return changed > 0
 
     def delete_user(self, user_id: int) -> bool:
+        # 文章、映射与引用随外键级联删除；先为这些文章记录删除，DBWatcher 才能增量清理页面
+        self.changes.log_owner_changes(user_id, "delete")
         with self.conn.cursor() as cur:
             cur.execute("DELETE FROM users WHERE id = %s", (user_id,))
             deleted = cur.rowcount
-        self.conn.commit()
+        self._commit()
+        self._publish("user", str(user_id), "delete")
         return deleted > 0
\ No newline at end of file
@@ -1,17 +1,49 @@
+import gzip
+import hashlib
 import os
+import tempfile
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable
+from core.citations import prefetch_links, rewrite_links
+from core.config import GENERATOR_CONFIG
 from core.url_manager import URLManager
-from generator.renderer import HTMLRenderer
+from generator.renderer import HTMLRenderer, render_markdown
+from generator.render_cache import RenderCache
+from dao import MySQLUserDAO
 from dao.factory import create_connection
 
+try:
+    import brotli
+except ImportError:  # 可选依赖，未安装时只生成 .gz
+    brotli = None
+
 class StaticSiteGenerator:
     """
     生成静态文件到 public/ 目录。
     """
     
-    def __init__(self, base_dir="public"):
+    def __init__(self, base_dir="public", workers: int | None = None):
         self.base_dir = base_dir
         self.url_mgr = URLManager()
-        self.renderer = HTMLRenderer()
+        cache_dir = GENERATOR_CONFIG["render_cache_dir"]
+        cache = RenderCache(cache_dir, GENERATOR_CONFIG["render_cache_bytes"]) if cache_dir else None
+        self.renderer = HTMLRenderer(cache, link_rewriter=rewrite_links)
+        self.workers = workers if workers is not None else GENERATOR_CONFIG["workers"]
+        self._render_pool: ProcessPoolExecutor | None = None
+        self._write_pool: ThreadPoolExecutor | None = None
+        self._digests: dict[str, bytes] = {}  # 文件路径 -> 最近一次写入/校验的内容摘要
+        self._listeners: list[Callable[[str], None]] = []
+
+    def add_listener(self, callback: Callable[[str], None]):
+        """注册文件变更回调，文件被改写或删除后以其绝对路径调用（例如让 HTTP 页面缓存失效）。"""
+        self._listeners.append(callback)
+
+    def _notify(self, full_path: str):
+        abs_path = os.path.abspath(full_path)
+        for callback in self._listeners:
+            callback(abs_path)
 
     def init_output_dir(self):
         if not os.path.exists(self.base_dir):
@@ -20,58 +52,245 @@ class StaticSiteGenerator:
     def _get_abs_path(self, rel_path: str) -> str:
         return os.path.join(self.base_dir, rel_path)
 
-    def sync_post_file(self, post_data: dict, author_name: str):
+    def _post_path(self, post_data: dict, author_name: str) -> str:
         cid = post_data["cid"]
         title = post_data["title"] or "untitled"
-        
+
+        old_prefix = self.url_mgr.get_mapping(cid)
         rel_prefix = self.url_mgr.register_mapping(cid, author_name, title)
-        filename = rel_prefix + ".html"
-        full_path = self._get_abs_path(filename)
-        
-        os.makedirs(os.path.dirname(full_path), exist_ok=True)
-        html = self.renderer.render_post(post_data, author_name, cid)
-        
-        with open(full_path, "w", encoding="utf-8") as f:
-            f.write(html)
-        
-        print(f"[Gen] Generated: {full_path}")
+        if old_prefix and old_prefix != rel_prefix:
+            # 标题或作者变化导致路径改变，清理旧文件
+            self._remove_file(self._get_abs_path(old_prefix + ".html"))
+        return self._get_abs_path(rel_prefix + ".html")
+
+    def _atomic_write(self, full_path: str, data: bytes):
+        """先写同目录临时文件再 rename，HTTP 服务不会读到写了一半的文件。"""
+        dir_name = os.path.dirname(full_path)
+        os.makedirs(dir_name, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=dir_name, prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, full_path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self._notify(full_path)
+
+    def _variants(self, data: bytes) -> list[tuple[str, bytes | None]]:
+        """
+        返回预压缩变体 [(后缀, 内容)]；内容为 None 表示该变体不应存在（需删除旧文件）。
+        gzip 固定 mtime=0，保证相同输入得到相同输出。
+        """
+        enabled = GENERATOR_CONFIG["precompress"] and len(data) >= GENERATOR_CONFIG["precompress_min_bytes"]
+        gz = gzip.compress(data, compresslevel=9, mtime=0) if enabled else None
+        br = brotli.compress(data, mode=brotli.MODE_TEXT) if enabled and brotli is not None else None
+        return [(".gz", gz), (".br", br)]
+
+    def _write_variants(self, full_path: str, data: bytes):
+        for suffix, payload in self._variants(data):
+            if payload is None:
+                if os.path.exists(full_path + suffix):
+                    os.remove(full_path + suffix)
+                    self._notify(full_path + suffix)
+            else:
+                self._atomic_write(full_path + suffix, payload)
+
+    def _variants_complete(self, full_path: str, data: bytes) -> bool:
+        """
+        检查每个配置的变体：应存在的变体解压后须与 data 一致，不应存在的变体（未启用、
+        低于阈值或未安装 brotli）须不存在。只在磁盘上的原文件未变时调用，每个文件每进程最多一次。
+        """
+        enabled = GENERATOR_CONFIG["precompress"] and len(data) >= GENERATOR_CONFIG["precompress_min_bytes"]
+        decoders = ((".gz", gzip.decompress), (".br", brotli.decompress if brotli is not None else None))
+        for suffix, decompress in decoders:
+            path = full_path + suffix
+            if not enabled or decompress is None:
+                if os.path.exists(path):
+                    return False
+                continue
+            try:
+                with open(path, "rb") as f:
+                    if decompress(f.read()) != data:
+                        return False
+            except Exception:
+                # 不存在、损坏或截断的变体都需要重新生成
+                return False
+        return True
+
+    def _write_file(self, full_path: str, html: str) -> bool:
+        """
+        内容与现有文件相同时跳过写入（保留 mtime，避免客户端缓存失效）；
+        否则原子替换文件，并在启用时同步生成 .gz / .br 预压缩变体。
+        返回是否实际写入。
+        """
+        data = html.encode("utf-8")
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        if self._digests.get(full_path) == digest and os.path.exists(full_path):
+            return False
+        try:
+            with open(full_path, "rb") as f:
+                same = hashlib.blake2b(f.read(), digest_size=16).digest() == digest
+        except OSError:
+            same = False
+        if same and self._variants_complete(full_path, data):
+            self._digests[full_path] = digest
+            return False
+
+        # 先写变体再替换原文件，原文件更新后变体一定已是新内容
+        self._write_variants(full_path, data)
+        if not same:
+            self._atomic_write(full_path, data)
+        self._digests[full_path] = digest
+        return not same
+
+    def _remove_file(self, full_path: str) -> bool:
+        self._digests.pop(full_path, None)
+        for suffix in (".gz", ".br"):
+            if os.path.exists(full_path + suffix):
+                os.remove(full_path + suffix)
+                self._notify(full_path + suffix)
+        if os.path.exists(full_path):
+            os.remove(full_path)
+            self._notify(full_path)
+            print(f"[Gen] Deleted: {full_path}")
+            return True
+        return False
+
+    def sync_post_file(self, post_data: dict, author_name: str) -> bool:
+        """生成单篇文章页面，返回是否实际写入。"""
+        full_path = self._post_path(post_data, author_name)
+        html = self.renderer.render_post(post_data, author_name, post_data["cid"])
+        if self._write_file(full_path, html):
+            print(f"[Gen] Generated: {full_path}")
+            return True
+        return False
+
+    def _pools(self) -> tuple[ProcessPoolExecutor, ThreadPoolExecutor]:
+        if self._render_pool is None:
+            # 宿主进程里有 HTTP/Watcher 线程，使用 spawn 避免 fork 带来的锁状态问题
+            self._render_pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            self._write_pool = ThreadPoolExecutor(max_workers=self.workers)
+        return self._render_pool, self._write_pool
+
+    def sync_post_files(self, items: list[tuple[dict, str]]) -> int:
+        """
+        批量生成文章页面，items 为 [(post_data, author_name), ...]。
+        页面数达到 parallel_threshold 时，Markdown 在进程池中渲染、文件写入在线程池中完成。
+        返回生成的页面数。
+        """
+        if not items:
+            return 0
+        start = time.perf_counter()
+        if self.renderer.link_rewriter is rewrite_links:
+            # 整批页面的站内链接一次解析，逐页改写时只查内存
+            prefetch_links(str(p.get("context", "") or "") for p, _ in items)
+        if self.workers <= 1 or len(items) < GENERATOR_CONFIG["parallel_threshold"]:
+            written = sum(1 for post_data, author_name in items if self.sync_post_file(post_data, author_name))
+            self._report(len(items), written, start, "serial")
+            return len(items)
+
+        render_pool, write_pool = self._pools()
+        paths = [self._post_path(p, a) for p, a in items]
+        bodies = [str(p.get("context", "") or "") for p, _ in items]
+        contents = self._render_bodies(render_pool, bodies)
+
+        writes = []
+        for (post_data, author_name), full_path, content in zip(items, paths, contents):
+            html = self.renderer.render_post(post_data, author_name, post_data["cid"], content)
+            writes.append(write_pool.submit(self._write_file, full_path, html))
+        written = sum(1 for w in writes if w.result())
+        self._report(len(items), written, start, f"{self.workers} workers")
+        return len(items)
+
+    @staticmethod
+    def _report(pages: int, written: int, start: float, mode: str):
+        """串行与并行路径输出同样格式的吞吐量，便于对比。"""
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        print(f"[Gen] Generated {pages} pages in {elapsed:.2f}s "
+              f"({pages / elapsed:.1f} pages/s, {mode}, {written} written)")
+
+    def _render_bodies(self, render_pool: ProcessPoolExecutor, bodies: list[str]) -> list[str]:
+        """只把渲染缓存未命中的正文提交给进程池。"""
+        cache = self.renderer.cache
+        contents: list[str | None] = [None] * len(bodies)
+        misses = {}  # key -> 需要该结果的下标列表，相同正文只渲染一次
+        for i, raw in enumerate(bodies):
+            if cache is None:
+                misses.setdefault(i, []).append(i)
+                continue
+            key = cache.key(raw)
+            hit = cache.get(key) if key not in misses else None
+            if hit is None:
+                misses.setdefault(key, []).append(i)
+            else:
+                contents[i] = hit
+
+        keys = list(misses)
+        chunksize = max(1, len(keys) // (self.workers * 4))
+        rendered = render_pool.map(render_markdown, [bodies[misses[k][0]] for k in keys], chunksize=chunksize)
+        for key, html in zip(keys, rendered):
+            if cache is not None:
+                cache.put(key, html)
+            for i in misses[key]:
+                contents[i] = html
+        return contents
+
+    def close(self):
+        """关闭并行构建使用的进程池与线程池。"""
+        if self._render_pool is not None:
+            self._render_pool.shutdown()
+            self._write_pool.shutdown()
+            self._render_pool = self._write_pool = None
 
     def sync_user_index(self, user_id: int):
+        self.sync_user_indexes([user_id])
+
+    def sync_user_indexes(self, user_ids):
+        """批量重建作者索引页：用户名与文章列表各只查询一次。"""
+        user_ids = list(set(user_ids))
+        if not user_ids:
+            return
         conn = create_connection()
         try:
-            with conn.cursor() as cur:
-                cur.execute("SELECT username FROM users WHERE id=%s", (user_id,))
-                row = cur.fetchone()
-                if not row: return
-                username = row[0]
+            usernames = MySQLUserDAO(conn).get_usernames(user_ids)
+            if not usernames:
+                return
 
+            owners = list(usernames)
+            placeholders = ", ".join(["%s"] * len(owners))
             with conn.cursor() as cur:
-                cur.execute("SELECT cid, title FROM posts WHERE owner_id=%s ORDER BY date DESC", (user_id,))
+                cur.execute(
+                    f"SELECT owner_id, cid, title FROM posts WHERE owner_id IN ({placeholders}) "
+                    "ORDER BY owner_id, date DESC",
+                    owners,
+                )
                 rows = cur.fetchall()
+        finally:
+            conn.close()
 
-            post_list = []
-            for r in rows:
-                p_cid, p_title = r[0], r[1] or "untitled"
-                rel_prefix = self.url_mgr.register_mapping(p_cid, username, p_title)
-                file_name = os.path.basename(rel_prefix) + ".html"
-                post_list.append({"title": p_title, "filename": file_name})
-            
+        post_lists = {uid: [] for uid in owners}
+        for owner_id, p_cid, p_title in rows:
+            p_title = p_title or "untitled"
+            rel_prefix = self.url_mgr.register_mapping(p_cid, usernames[owner_id], p_title)
+            file_name = os.path.basename(rel_prefix) + ".html"
+            post_lists[owner_id].append({"title": p_title, "filename": file_name})
+
+        for uid, post_list in post_lists.items():
+            username = usernames[uid]
             html = self.renderer.render_user_index(username, post_list)
             index_path = self._get_abs_path(f"{username}/index.html")
-            
-            os.makedirs(os.path.dirname(index_path), exist_ok=True)
-            with open(index_path, "w", encoding="utf-8") as f:
-                f.write(html)
-            
-            print(f"[Gen] Index Updated: {index_path}")
+            if self._write_file(index_path, html):
+                print(f"[Gen] Index Updated: {index_path}")
 
-        finally:
-            conn.close()
+    def has_post_file(self, cid: str) -> bool:
+        rel_prefix = self.url_mgr.get_mapping(cid)
+        return bool(rel_prefix) and os.path.exists(self._get_abs_path(rel_prefix + ".html"))
 
     def remove_post_file(self, cid: str):
         rel_prefix = self.url_mgr.remove_mapping(cid)
         if rel_prefix:
-            full_path = self._get_abs_path(rel_prefix + ".html")
-            if os.path.exists(full_path):
-                os.remove(full_path)
-                print(f"[Gen] Deleted: {full_path}")
\ No newline at end of file
+            self._remove_file(self._get_abs_path(rel_prefix + ".html"))
\ No newline at end of file
@@ -0,0 +1,95 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+import markdown
+
+class RenderCache:
+    """
+    以正文内容哈希为键的 Markdown 渲染结果缓存。
+    HTML 片段保存在磁盘上（重启后仍可命中），总大小超过 max_bytes 时按 LRU 淘汰。
+    """
+
+    SUFFIX = ".html"
+
+    def __init__(self, cache_dir: str, max_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._index: OrderedDict[str, int] = OrderedDict()  # key -> 文件大小，按最近使用排序
+        self._size = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def key(raw_content: str) -> str:
+        # 渲染器版本参与哈希，升级 markdown 后旧结果自动失效
+        h = hashlib.sha256(markdown.__version__.encode("utf-8"))
+        h.update(b"\0")
+        h.update(raw_content.encode("utf-8"))
+        return h.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + self.SUFFIX)
+
+    def _load(self):
+        """启动时按文件 mtime 重建 LRU 顺序。"""
+        entries = []
+        if os.path.isdir(self.cache_dir):
+            for sub in os.scandir(self.cache_dir):
+                if not sub.is_dir():
+                    continue
+                for entry in os.scandir(sub.path):
+                    if entry.name.endswith(self.SUFFIX):
+                        st = entry.stat()
+                        entries.append((st.st_mtime, entry.name[:-len(self.SUFFIX)], st.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._size += size
+        self._evict()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            if key not in self._index:
+                return None
+            self._index.move_to_end(key)
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                html = f.read()
+            os.utime(path)  # 更新 mtime，供下次启动恢复 LRU 顺序
+            return html
+        except OSError:
+            with self._lock:
+                self._size -= self._index.pop(key, 0)
+            return None
+
+    def put(self, key: str, html: str) -> None:
+        data = html.encode("utf-8")
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        with self._lock:
+            self._size += len(data) - self._index.pop(key, 0)
+            self._index[key] = len(data)
+            self._evict()
+
+    def _evict(self):
+        while self._size > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self._size -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def __len__(self) -> int:
+        return len(self._index)
@@ -1,8 +1,21 @@
+import html
 import markdown
+from typing import Callable
+from generator.render_cache import RenderCache
+
+def render_markdown(raw_content: str) -> str:
+    """Markdown -> HTML 片段。模块级函数，可直接提交给进程池执行。"""
+    return markdown.markdown(raw_content)
 
 class HTMLRenderer:
     """渲染 HTML 内容"""
 
+    def __init__(self, cache: RenderCache | None = None,
+                 link_rewriter: Callable[[str], str] | None = None):
+        self.cache = cache
+        # 正文 HTML 的站内链接改写（例如 core.citations.rewrite_links）；缓存中保存的是改写前的 HTML
+        self.link_rewriter = link_rewriter
+
     TEMPLATE_INDEX = """<!DOCTYPE html>
 <html lang="en">
 <head>
@@ -31,7 +44,7 @@ class HTMLRenderer:
     <hr>
     <div>
         {content}
-    </div>
+    </div>{links}
     <hr>
     <a href="index.html">Back to Index</a>
 </body>
@@ -48,14 +61,59 @@ class HTMLRenderer:
             list_items="\n".join(items) if items else "<li>No posts.</li>"
         )
 
-    def render_post(self, post_data: dict, author_name: str, cid: str) -> str:
-        raw_content = str(post_data.get("context", "") or "")
-        content = markdown.markdown(raw_content)
-        
+    def render_content(self, raw_content: str) -> str:
+        """渲染正文 Markdown，内容未变时直接复用缓存的 HTML 片段。"""
+        if self.cache is None:
+            return render_markdown(raw_content)
+        key = self.cache.key(raw_content)
+        content = self.cache.get(key)
+        if content is None:
+            content = render_markdown(raw_content)
+            self.cache.put(key, content)
+        return content
+
+    @staticmethod
+    def _link_items(links: list[dict]) -> str:
+        items = []
+        for link in links:
+            title = html.escape(link.get("title") or link["cid"])
+            if link.get("url"):
+                items.append(f'<li><a href="{html.escape(link["url"])}">{title}</a></li>')
+            else:
+                # 被引用的文章已删除
+                items.append(f"<li>{title} (unavailable)</li>")
+        return "\n        ".join(items)
+
+    def render_links(self, references: list[dict], cited_by: list[dict]) -> str:
+        """
+        「引用」与「被引用」区块，每项为 {"cid", "title", "url"}（url 为 None 表示文章不存在）。
+        两者都为空时返回空串，页面与没有引用区块时完全相同。
+        """
+        blocks = []
+        for heading, links in (("References", references), ("Cited by", cited_by)):
+            if links:
+                blocks.append(f"""
+    <h2>{heading}</h2>
+    <ul>
+        {self._link_items(links)}
+    </ul>""")
+        return "\n    <hr>" + "".join(blocks) if blocks else ""
+
+    def render_post(self, post_data: dict, author_name: str, cid: str, content: str | None = None) -> str:
+        """
+        content 为预先渲染好的正文 HTML；为 None 时在此处渲染 Markdown。
+        post_data 中的 references / cited_by 渲染为正文后的链接区块。
+        """
+        if content is None:
+            content = self.render_content(str(post_data.get("context", "") or ""))
+        if self.link_rewriter is not None:
+            content = self.link_rewriter(content)
+
         return self.TEMPLATE_POST.format(
             title=post_data.get("title", "Untitled"),
             date=post_data.get("date", ""),
             author=author_name,
             cid=cid,
-            content=content
+            content=content,
+            links=self.render_links(post_data.get("references") or [], post_data.get("cited_by") or []),
         )
\ No newline at end of file
@@ -0,0 +1,67 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+
+SNAPSHOT_VERSION = 2
+
+
+def post_digest(data_map: dict) -> str:
+    """
+    文章内容的稳定摘要（跨进程、跨重启一致）。
+    内置 hash() 对字符串加盐，每次启动结果都不同，不能持久化。
+    """
+    payload = json.dumps(list(data_map.values()), ensure_ascii=False, default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def save_snapshot(path: str, base_dir: str, cursor: int | None,
+                  snapshot: dict, paths: dict[str, str]) -> None:
+    """
+    原子地写入 gzip 压缩的 JSON 快照。
+    每篇文章保存为 cid -> [owner_id, digest, rel_path]，记录了标题与引用时追加 [title, refs]。
+    """
+    posts = {}
+    for cid, info in snapshot.items():
+        row = [info["owner_id"], info["signature"], paths.get(cid)]
+        if "title" in info or info.get("refs"):
+            row += [info.get("title"), sorted(info.get("refs", ()))]
+        posts[cid] = row
+    doc = {"version": SNAPSHOT_VERSION, "base_dir": os.path.abspath(base_dir),
+           "cursor": cursor, "posts": posts}
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with gzip.open(os.fdopen(fd, "wb"), "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump(doc, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def load_snapshot(path: str, base_dir: str) -> tuple[int | None, dict, dict[str, str]] | None:
+    """
+    读取快照，返回 (cursor, snapshot, paths)。
+    文件不存在、已损坏、版本不符或属于其他输出目录时返回 None。
+    """
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            doc = json.load(f)
+    except (OSError, ValueError, EOFError):
+        return None
+    if doc.get("version") != SNAPSHOT_VERSION or doc.get("base_dir") != os.path.abspath(base_dir):
+        return None
+
+    snapshot, paths = {}, {}
+    for cid, (owner_id, digest, rel_path, *extra) in doc["posts"].items():
+        snapshot[cid] = {"owner_id": owner_id, "signature": digest}
+        if extra:
+            snapshot[cid]["title"] = extra[0]
+            if extra[1]:
+                snapshot[cid]["refs"] = frozenset(extra[1])
+        if rel_path:
+            paths[cid] = rel_path
+    return doc.get("cursor"), snapshot, paths
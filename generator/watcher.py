@@ -1,84 +1,338 @@
+import threading
 import time
+from core.config import WATCHER_CONFIG, NOTIFY_CONFIG
+from dao import ChangeCursor, MySQLPostChangeDAO, MySQLUserDAO
+from dao.cache import invalidate_user
+from dao.events import ChangeListener
 from dao.factory import create_connection
+from dao.reference_graph import ReferenceGraph, get_graph
 from generator.builder import StaticSiteGenerator
+from generator.snapshot import post_digest, load_snapshot, save_snapshot
 
 class DBWatcher:
     """
     后台轮询监听器。
-    周期性检查数据库指纹，发现变化时调用 Generator。
+    平时按 post_changes 变更日志的游标增量拉取变化的文章，
+    并周期性做一次全表对账，发现变化时调用 Generator。
+    快照与游标会持久化到磁盘，重启后只重建内容确有变化的文章。
+    页面中的「引用 / 被引用」区块按引用差异增量更新：只重建引用邻域发生变化的页面。
+    进程内的引用图（dao.reference_graph）由 Watcher 驱动更新，get_graph() 不再另行同步它。
     """
-    def __init__(self, generator: StaticSiteGenerator):
+    POST_COLUMNS = "cid, owner_id, title, context, description, date, catagory"
+
+    def __init__(self, generator: StaticSiteGenerator,
+                 reconcile_every: int = WATCHER_CONFIG["reconcile_every"],
+                 snapshot_path: str | None = WATCHER_CONFIG["snapshot_path"],
+                 graph: ReferenceGraph | None = None):
         self.gen = generator
         self.running = False
-        self._snapshot = {} 
+        self.reconcile_every = reconcile_every
+        self.snapshot_path = snapshot_path
+        self._snapshot = {}  # cid -> {"owner_id", "signature", "title"}；引用关系保存在 self.graph
+        self.graph = graph if graph is not None else get_graph(sync=False)
+        self.graph.driven = True
+        # post_changes 游标，position 为 None 表示尚未做过全量扫描；不与引用图共用，避免被其他同步推进
+        self._changes = ChangeCursor()
+        self._polls = 0
+        self._dirty = False
+        self._last_save = 0.0
+        self._lock = threading.Lock()
+
+    def load_snapshot(self) -> bool:
+        """从磁盘恢复快照、游标与文件路径映射，成功返回 True。"""
+        if not self.snapshot_path:
+            return False
+        loaded = load_snapshot(self.snapshot_path, self.gen.base_dir)
+        if loaded is None:
+            return False
+        with self._lock:
+            cursor, self._snapshot, paths = loaded
+            rows = []
+            for cid, info in self._snapshot.items():
+                rows.append((cid, None))
+                rows.extend((cid, ref) for ref in info.pop("refs", ()))
+            # 引用图恢复到快照时的状态，之后的变更随游标增量补上
+            self.graph.load_rows(rows)
+            self._changes.reset(cursor)
+            self.gen.url_mgr.load_mappings(paths)
+        print(f"[*] Restored watcher snapshot: {len(self._snapshot)} posts, cursor={self._changes.position}")
+        return True
+
+    def save_snapshot(self, force: bool = False):
+        if not self.snapshot_path or not (self._dirty or force):
+            return
+        if not force and time.monotonic() - self._last_save < WATCHER_CONFIG["snapshot_interval"]:
+            return
+        with self._lock:
+            snapshot = {}
+            for cid, info in self._snapshot.items():
+                refs = self.graph.references(cid)
+                snapshot[cid] = {**info, "refs": frozenset(refs)} if refs else info
+            save_snapshot(self.snapshot_path, self.gen.base_dir, self._changes.position,
+                          snapshot, self.gen.url_mgr.mappings())
+            self._dirty = False
+            self._last_save = time.monotonic()
 
-    def _get_current_state(self):
+    def _build_state(self, rows) -> dict:
         state = {}
+        for r in rows:
+            cid, owner_id = r[0], r[1]
+            data_map = {
+                "cid": cid, "owner_id": owner_id,
+                "title": r[2], "context": r[3],
+                "description": r[4], "date": str(r[5]),
+                "catagory": r[6]
+            }
+            sig = post_digest(data_map)
+            state[cid] = {"owner_id": owner_id, "data": data_map, "signature": sig}
+        return state
+
+    def _get_current_state(self, conn):
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT {self.POST_COLUMNS} FROM posts")
+            return self._build_state(cur.fetchall())
+
+    def _get_posts_state(self, conn, cids: list[str]):
+        if not cids:
+            return {}
+        placeholders = ", ".join(["%s"] * len(cids))
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT {self.POST_COLUMNS} FROM posts WHERE cid IN ({placeholders})", cids)
+            return self._build_state(cur.fetchall())
+
+    def _get_refs(self, conn, cids: list[str] | None = None) -> dict[str, frozenset]:
+        """读取 cid -> 引用的 CID 集合；cids 为 None 时读取全部引用。"""
+        sql = "SELECT post_cid, ref_cid FROM post_references"
+        params: list = []
+        if cids is not None:
+            if not cids:
+                return {}
+            sql += f" WHERE post_cid IN ({', '.join(['%s'] * len(cids))})"
+            params = cids
+        with conn.cursor() as cur:
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+        refs: dict[str, set[str]] = {}
+        for post_cid, ref_cid in rows or []:
+            refs.setdefault(post_cid, set()).add(ref_cid)
+        return {cid: frozenset(r) for cid, r in refs.items()}
+
+    def _get_link_targets(self, cids: set[str]) -> dict[str, dict]:
+        """引用区块中链接的标题与站内路径，按 batch_size 分批查询。"""
+        targets = {}
+        cids = list(cids)
+        batch_size = WATCHER_CONFIG["batch_size"]
         conn = create_connection()
         try:
-            with conn.cursor() as cur:
-                cur.execute("SELECT cid, owner_id, title, context, description, date, catagory FROM posts")
-                rows = cur.fetchall()
-                for r in rows:
-                    cid, owner_id = r[0], r[1]
-                    data_map = {
-                        "cid": cid, "owner_id": owner_id, 
-                        "title": r[2], "context": r[3], 
-                        "description": r[4], "date": str(r[5]), 
-                        "catagory": r[6]
-                    }
-                    sig = hash(tuple(data_map.values()))
-                    state[cid] = {"owner_id": owner_id, "data": data_map, "signature": sig}
+            for i in range(0, len(cids), batch_size):
+                batch = cids[i:i + batch_size]
+                with conn.cursor() as cur:
+                    cur.execute(
+                        "SELECT p.cid, p.title, u.username FROM posts p JOIN users u ON u.id = p.owner_id "
+                        f"WHERE p.cid IN ({', '.join(['%s'] * len(batch))})",
+                        batch,
+                    )
+                    for cid, title, username in cur.fetchall():
+                        targets[cid] = {"cid": cid, "title": title,
+                                        "url": self.gen.url_mgr.url_path(username, title)}
         finally:
             conn.close()
-        return state
+        return targets
 
-    def _trigger_update(self, info):
+    def _attach_links(self, infos: list[dict]):
+        """为待生成的页面附上 references / cited_by 列表。"""
+        links = {}
+        for info in infos:
+            cid = info["data"]["cid"]
+            links[cid] = (self.graph.references(cid), self.graph.cited_by(cid))
+        link_cids = {c for refs, citers in links.values() for c in refs + citers}
+        targets = self._get_link_targets(link_cids) if link_cids else {}
+
+        def order(link):
+            return ((link["title"] or "").casefold(), link["cid"])
+
+        for info in infos:
+            refs, citers = links[info["data"]["cid"]]
+            info["data"]["references"] = sorted(
+                (targets.get(r) or {"cid": r, "title": None, "url": None} for r in refs), key=order)
+            info["data"]["cited_by"] = sorted(
+                (targets[c] for c in citers if c in targets), key=order)
+
+    def _get_usernames(self, owner_ids: set[int]) -> dict[int, str]:
+        if not owner_ids:
+            return {}
         conn = create_connection()
         try:
-            with conn.cursor() as cur:
-                cur.execute("SELECT username FROM users WHERE id=%s", (info["owner_id"],))
-                row = cur.fetchone()
-                if row:
-                    self.gen.sync_post_file(info["data"], row[0])
+            return MySQLUserDAO(conn).get_usernames(owner_ids)
         finally:
             conn.close()
 
-    def _scan(self):
-        new_state = self._get_current_state()
+    def _trigger_updates(self, infos: list[dict]):
+        if not infos:
+            return
+        authors = self._get_usernames({info["owner_id"] for info in infos})
+        self._attach_links(infos)
+        self.gen.sync_post_files([
+            (info["data"], authors[info["owner_id"]])
+            for info in infos if info["owner_id"] in authors
+        ])
+
+    def _apply(self, conn, new_state: dict, new_refs: dict[str, frozenset], checked: set[str] | None = None):
+        """
+        将 new_state / new_refs 与快照比较并生成文件。
+        checked 为本次检查过的 cid 集合（增量模式）；为 None 时表示 new_state 与 new_refs 是全量状态。
+        """
         affected_users = set()
+        updates = {}
+        # 新建、删除或标题/作者变化的文章：邻居页面中指向它的链接需要更新
+        relinked = set()
 
-        # 1. 变更检测
+        # 1. 变更检测（全量对账时顺带补齐被外部删除的页面文件）
         for cid, info in new_state.items():
             old_info = self._snapshot.get(cid)
-            if not old_info or old_info["signature"] != info["signature"]:
-                if old_info:
-                     self.gen.remove_post_file(cid) # 清理旧文件
-                self._trigger_update(info)
+            missing = checked is None and old_info is not None and not self.gen.has_post_file(cid)
+            if not old_info or old_info["signature"] != info["signature"] or missing:
+                # 路径变化时旧文件由 Generator 清理，路径不变则原地替换
+                updates[cid] = info
                 affected_users.add(info["owner_id"])
+                if old_info:
+                    affected_users.add(old_info["owner_id"])
+            title = info["data"]["title"]
+            if not old_info or old_info.get("title") != title or old_info["owner_id"] != info["owner_id"]:
+                relinked.add(cid)
+            self.graph.set_post(cid, True)
+            self._snapshot[cid] = {"owner_id": info["owner_id"], "signature": info["signature"], "title": title}
 
-        # 2. 删除检测
-        for cid, info in self._snapshot.items():
-            if cid not in new_state:
+        # 2. 引用差异：引用集合变化的文章及其增删的目标（已删除文章的引用随外键级联删除）
+        neighbors = set()
+        ref_candidates = set(self._snapshot) | set(new_refs) if checked is None else checked
+        for cid in ref_candidates:
+            refs = new_refs.get(cid, frozenset()) if cid in new_state else frozenset()
+            changed = self.graph.set_refs(cid, refs)
+            if changed:
+                neighbors.add(cid)
+                neighbors |= changed
+
+        # 3. 删除检测
+        candidates = self._snapshot.keys() if checked is None else checked
+        for cid in [c for c in candidates if c not in new_state]:
+            old_info = self._snapshot.pop(cid, None)
+            self.graph.set_post(cid, False)
+            if old_info:
                 self.gen.remove_post_file(cid)
-                affected_users.add(info["owner_id"])
+                affected_users.add(old_info["owner_id"])
+                relinked.add(cid)
 
-        # 3. 更新索引
-        for uid in affected_users:
-            self.gen.sync_user_index(uid)
+        for cid in relinked:
+            neighbors.update(self.graph.cited_by(cid))
+            neighbors.update(self.graph.references(cid))
 
-        self._snapshot = new_state
+        # 4. 生成页面：内容变化的文章，加上引用邻域变化的文章
+        for cid in neighbors:
+            if cid in new_state and cid not in updates:
+                updates[cid] = new_state[cid]
+        unloaded = [cid for cid in neighbors if cid in self._snapshot and cid not in updates]
+        if unloaded:
+            updates.update(self._get_posts_state(conn, unloaded))
+            conn.commit()
+        self._trigger_updates(list(updates.values()))
+
+        # 5. 更新索引
+        self.gen.sync_user_indexes(affected_users)
+        if updates or affected_users:
+            self._dirty = True
+
+    def _reconcile(self, conn):
+        """全表对账：兜底处理变更日志未覆盖的情况（日志清理、空缺过多等）。"""
+        changes = MySQLPostChangeDAO(conn)
+        # 先取游标再扫描，扫描期间产生的变更会在下一次增量轮询中再处理一遍
+        _, max_id = changes.get_bounds()
+        new_state = self._get_current_state(conn)
+        new_refs = self._get_refs(conn)
+        conn.commit()  # 结束只读事务
+        # 跨进程的映射变更只靠尽力而为的 UDP 通知，对账时重新载入路由表
+        self.gen.url_mgr.load_routes()
+        self._apply(conn, new_state, new_refs)
+        self._changes.reset(max_id)
+        changes.prune_changes(WATCHER_CONFIG["change_retention"])
+
+    def _apply_changes(self, conn, cids: set[str]):
+        new_state = self._get_posts_state(conn, list(cids))
+        new_refs = self._get_refs(conn, list(cids))
+        conn.commit()
+        self._apply(conn, new_state, new_refs, checked=cids)
+
+    def _poll_changes(self, conn):
+        for rows in self._changes.poll(MySQLPostChangeDAO(conn)):
+            self._apply_changes(conn, {r[1] for r in rows})
+
+    def _scan(self):
+        with self._lock:
+            self._scan_locked()
+        self.save_snapshot()
+
+    def _scan_locked(self):
+        conn = create_connection()
+        try:
+            need_full = self._polls >= self.reconcile_every or self._changes.needs_full(MySQLPostChangeDAO(conn))
+            if need_full:
+                self._reconcile(conn)
+                self._polls = 0
+            else:
+                self._poll_changes(conn)
+                self._polls += 1
+        finally:
+            conn.close()
+
+    def _handle_events(self, received):
+        for event in received:
+            if event.kind == "user":
+                # 其他进程修改了用户信息，丢弃本进程缓存的用户名
+                invalidate_user(int(event.key))
+            # 其他进程写入的 URL 映射同步到本进程的路由表
+            self.gen.url_mgr.handle_event(event)
+
+    def _open_listener(self) -> ChangeListener | None:
+        if not NOTIFY_CONFIG["enabled"]:
+            return None
+        try:
+            return ChangeListener(NOTIFY_CONFIG["host"], NOTIFY_CONFIG["port"])
+        except OSError as e:
+            print(f"[!] Change notifications unavailable ({e}), falling back to polling.")
+            return None
 
     def start(self, interval=3):
         self.gen.init_output_dir()
         self.running = True
-        print(f"[*] DB Watcher started. Polling every {interval}s...")
-        while self.running:
-            try:
-                self._scan()
-            except Exception as e:
-                print(f"[Watcher Error] {e}")
-            time.sleep(interval)
+        self.load_snapshot()
+        listener = self._open_listener()
+        if listener:
+            # 写入方会推送变更事件，轮询只作为兜底
+            interval = max(interval, NOTIFY_CONFIG["safety_interval"])
+            print(f"[*] DB Watcher started. Listening on udp://{NOTIFY_CONFIG['host']}:{NOTIFY_CONFIG['port']}, "
+                  f"safety poll every {interval}s...")
+        else:
+            print(f"[*] DB Watcher started. Polling every {interval}s...")
+        try:
+            while self.running:
+                try:
+                    self._scan()
+                except Exception as e:
+                    print(f"[Watcher Error] {e}")
+                if listener:
+                    received = listener.wait(interval)
+                    if received:
+                        # 合并紧随其后的一串事件，避免一次写入触发多次扫描
+                        while batch := listener.wait(0.02):
+                            received.extend(batch)
+                        self._handle_events(received)
+                else:
+                    time.sleep(interval)
+        finally:
+            if listener:
+                listener.close()
 
     def stop(self):
-        self.running = False
\ No newline at end of file
+        self.running = False
+        # 等待进行中的扫描结束后落盘，下次启动即可增量恢复
+        self.save_snapshot(force=True)
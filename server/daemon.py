@@ -1,26 +1,17 @@
-import http.server
-import socketserver
 import os
 import threading
+from core.config import SERVER_CONFIG
 from generator.builder import StaticSiteGenerator
 from generator.watcher import DBWatcher
+from server.httpd import make_handler, serve
 
-def run_http_server(port: int, root_dir: str):
+def run_http_server(port: int, root_dir: str, workers: int = SERVER_CONFIG["workers"], on_shutdown=None):
     """启动 HTTP 服务，阻塞运行"""
     abs_root = os.path.abspath(root_dir)
-    
-    class Handler(http.server.SimpleHTTPRequestHandler):
-        def __init__(self, *args, **kwargs):
-            super().__init__(*args, directory=abs_root, **kwargs)
+    Handler = make_handler(abs_root)
 
-    print(f"[*] Starting HTTP Server on port {port} serving {abs_root}")
-    with socketserver.TCPServer(("0.0.0.0", port), Handler) as httpd:
-        try:
-            httpd.serve_forever()
-        except KeyboardInterrupt:
-            pass
-        finally:
-            httpd.server_close()
+    print(f"[*] Starting HTTP Server on port {port} serving {abs_root} ({workers} workers)")
+    serve(port, Handler, workers=workers, on_shutdown=on_shutdown)
 
 def start_full_service(port: int = 8080):
     """
@@ -31,8 +22,12 @@ def start_full_service(port: int = 8080):
     
     t_watcher = threading.Thread(target=watcher.start, args=(2,), daemon=True)
     t_watcher.start()
-    
-    run_http_server(port, "www")
+
+    def _shutdown():
+        watcher.stop()
+        gen.close()
+
+    run_http_server(port, "www", on_shutdown=_shutdown)
 
 if __name__ == "__main__":
-    start_full_service()
\ No newline at end of file
+    start_full_service()
@@ -0,0 +1,344 @@
+import email.utils
+import http.server
+import io
+import os
+import select
+import signal
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Callable
+from core.config import SERVER_CONFIG
+from server.page_cache import CachedPage, PageCache
+
+# 按优先级排列的 (Content-Encoding, 文件后缀)
+PRECOMPRESSED_VARIANTS = (("br", ".br"), ("gzip", ".gz"))
+
+
+class PooledHTTPServer(socketserver.TCPServer):
+    """
+    使用固定大小线程池处理连接的 HTTP 服务器。
+    与 ThreadingHTTPServer 不同，并发线程数有上限；超出的连接在线程池队列中等待。
+    空闲的 keep-alive 连接在有连接排队时尽快让出工作线程，关闭服务器时立即结束。
+    """
+    allow_reuse_address = True
+    request_queue_size = 128
+    # 空闲连接等待下一个请求时，检查排队与关闭状态的间隔（秒）
+    poll_interval = 0.2
+
+    def __init__(self, server_address, handler_class, workers: int = SERVER_CONFIG["workers"]):
+        self.workers = workers
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="http")
+        self._queued: set = set()  # 已接受、尚未分到工作线程的连接
+        self._queued_lock = threading.Lock()
+        self._closing = threading.Event()
+        super().__init__(server_address, handler_class)
+
+    def process_request(self, request, client_address):
+        with self._queued_lock:
+            self._queued.add(request)
+        self._pool.submit(self._process_request_worker, request, client_address)
+
+    def _process_request_worker(self, request, client_address):
+        with self._queued_lock:
+            self._queued.discard(request)
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def wait_for_request(self, sock, idle_timeout: float) -> bool:
+        """
+        keep-alive 连接等待下一个请求，套接字可读时返回 True。
+        空闲超过 idle_timeout、有连接排队且空闲超过 keepalive_busy_timeout、或服务器正在关闭时返回 False。
+        """
+        now = time.monotonic()
+        deadline = now + idle_timeout
+        busy_deadline = now + SERVER_CONFIG["keepalive_busy_timeout"]
+        while not self._closing.is_set():
+            now = time.monotonic()
+            if now >= deadline or (self._queued and now >= busy_deadline):
+                return False
+            try:
+                ready, _, _ = select.select([sock], [], [], min(self.poll_interval, deadline - now))
+            except (OSError, ValueError):
+                return False
+            if ready:
+                return True
+        return False
+
+    def server_close(self):
+        self._closing.set()
+        super().server_close()
+        # 只等待正在处理的请求；排队中的连接直接关闭，空闲的 keep-alive 连接在 poll_interval 内结束
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        with self._queued_lock:
+            queued, self._queued = self._queued, set()
+        for request in queued:
+            self.shutdown_request(request)
+
+
+def make_handler(root_dir: str, quiet: bool = False,
+                 page_cache: PageCache | None = None) -> type[http.server.SimpleHTTPRequestHandler]:
+    abs_root = os.path.abspath(root_dir)
+
+    class Handler(http.server.SimpleHTTPRequestHandler):
+        # HTTP/1.1 默认启用 keep-alive，一个连接可连续处理多个请求
+        protocol_version = "HTTP/1.1"
+        # 空闲连接的读超时，避免慢客户端长期占用工作线程
+        timeout = SERVER_CONFIG["keepalive_timeout"]
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=abs_root, **kwargs)
+
+        def log_message(self, format, *args):
+            if not quiet:
+                super().log_message(format, *args)
+
+        def _has_buffered_request(self) -> bool:
+            """客户端流水线发送的下一个请求可能已在 rfile 缓冲区中，套接字本身不再可读。"""
+            self.connection.settimeout(0)
+            try:
+                return bool(self.rfile.peek(1))
+            except OSError:
+                return True  # 交给 handle_one_request 处理连接错误
+            finally:
+                self.connection.settimeout(self.timeout)
+
+        def handle(self):
+            wait_for_request = getattr(self.server, "wait_for_request", None)
+            if wait_for_request is None:
+                return super().handle()
+            self.close_connection = True
+            self.handle_one_request()
+            while not self.close_connection:
+                if not self._has_buffered_request() and not wait_for_request(self.connection, self.timeout):
+                    break
+                self.handle_one_request()
+
+        def _is_not_modified(self, etag: str, mtime: float) -> bool:
+            if_none_match = self.headers.get("If-None-Match")
+            if if_none_match is not None:
+                tags = [t.strip() for t in if_none_match.split(",")]
+                return "*" in tags or etag in tags or ("W/" + etag) in tags
+            if_modified_since = self.headers.get("If-Modified-Since")
+            if if_modified_since:
+                try:
+                    since = email.utils.parsedate_to_datetime(if_modified_since)
+                except (TypeError, ValueError, IndexError, OverflowError):
+                    return False
+                return since is not None and int(mtime) <= since.timestamp()
+            return False
+
+        def _requested_range(self, size: int, etag: str, last_modified: str):
+            """
+            解析单段 Range 请求，返回 (start, end)（闭区间）。
+            无 Range、多段 Range、语法错误（如 bytes=5-3）或 If-Range 不匹配时返回 None（返回完整内容）；
+            范围无法满足（起点超出文件大小）时返回 False。
+            """
+            header = self.headers.get("Range")
+            if not header:
+                return None
+            if_range = self.headers.get("If-Range")
+            if if_range and if_range.strip() not in (etag, last_modified):
+                return None
+            unit, _, spec = header.partition("=")
+            if unit.strip().lower() != "bytes" or "," in spec:
+                return None
+            first, _, last = spec.strip().partition("-")
+            first, last = first.strip(), last.strip()
+            if not (first or last) or not all(v.isdecimal() for v in (first, last) if v):
+                return None
+            if first:
+                start = int(first)
+                end = int(last) if last else size - 1
+                if last and start > end:
+                    # RFC 7233 2.1: last-byte-pos < first-byte-pos 属于语法错误，忽略 Range
+                    return None
+            else:
+                # bytes=-N 表示最后 N 个字节
+                length = int(last)
+                if length <= 0:
+                    return False
+                start, end = max(size - length, 0), size - 1
+            if start >= size:
+                return False
+            return start, min(end, size - 1)
+
+        def _send_validators(self, etag: str, last_modified: str):
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", last_modified)
+
+        def _send_body_headers(self, fs_path: str, size: int, etag: str, mtime: float,
+                               last_modified: str, encoding: str | None = None,
+                               vary: bool = False) -> tuple[int, int] | None:
+            """
+            发送状态行与头部（200 / 206 / 304 / 416），返回需要发送的 (offset, count)；
+            不需要发送正文时返回 None。vary 表示该路径存在预压缩变体，响应随 Accept-Encoding 变化。
+            """
+            if self._is_not_modified(etag, mtime):
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                if vary:
+                    self.send_header("Vary", "Accept-Encoding")
+                self._send_validators(etag, last_modified)
+                self.end_headers()
+                return None
+
+            rng = self._requested_range(size, etag, last_modified)
+            if rng is False:
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return None
+
+            if rng is None:
+                self.send_response(HTTPStatus.OK)
+                offset, count = 0, size
+            else:
+                self.send_response(HTTPStatus.PARTIAL_CONTENT)
+                offset, count = rng[0], rng[1] - rng[0] + 1
+                self.send_header("Content-Range", f"bytes {rng[0]}-{rng[1]}/{size}")
+            self.send_header("Content-type", self.guess_type(fs_path))
+            self.send_header("Content-Length", str(count))
+            if encoding:
+                self.send_header("Content-Encoding", encoding)
+            if vary:
+                self.send_header("Vary", "Accept-Encoding")
+            self._send_validators(etag, last_modified)
+            self.end_headers()
+            return offset, count
+
+        def _accepted_encodings(self) -> set[str]:
+            """Accept-Encoding 中 q > 0 的编码；"*" 匹配未单独列出的预压缩编码。"""
+            weights = {}
+            for item in self.headers.get("Accept-Encoding", "").split(","):
+                name, *params = [part.strip() for part in item.split(";")]
+                if not name:
+                    continue
+                q = 1.0
+                for param in params:
+                    key, _, value = param.partition("=")
+                    if key.strip().lower() == "q":
+                        try:
+                            q = float(value)
+                        except ValueError:
+                            q = 0.0
+                weights[name.lower()] = q
+            wildcard = weights.pop("*", 0)
+            accepted = {name for name, q in weights.items() if q > 0}
+            if wildcard > 0:
+                accepted |= {name for name, _ in PRECOMPRESSED_VARIANTS if name not in weights}
+            return accepted
+
+        def _select_variant(self, fs_path: str) -> tuple[CachedPage | None, str, str | None, bool]:
+            """
+            按 Accept-Encoding 选择构建时生成的 .br / .gz 变体，零运行时压缩开销。
+            返回 (page, path, encoding, vary)：page 为内存缓存中的内容，未缓存（无缓存或超过单条上限）时为 None，
+            由调用方从 path 直接发送文件；vary 表示存在可用的变体（不论客户端是否接受）。
+            """
+            # Range 请求只针对原始内容，避免与压缩表示的字节区间混淆
+            accepted = self._accepted_encodings() if "Range" not in self.headers else set()
+            chosen, vary = None, False
+            for encoding, suffix in PRECOMPRESSED_VARIANTS:
+                variant = fs_path + suffix
+                page = None
+                if page_cache is not None:
+                    if page_cache.is_missing(variant):
+                        continue
+                    page = page_cache.get(variant) or page_cache.load(variant, remember_missing=True)
+                if page is None and not os.path.isfile(variant):
+                    continue
+                vary = True
+                if chosen is None and encoding in accepted:
+                    chosen = (page, variant, encoding)
+            if chosen is not None:
+                return *chosen, vary
+            page = (page_cache.get(fs_path) or page_cache.load(fs_path)) if page_cache is not None else None
+            return page, fs_path, None, vary
+
+        def _send_file_head(self, fs_path: str, file_path: str | None = None,
+                            encoding: str | None = None, vary: bool = False):
+            """
+            未进入内存缓存的普通文件：返回打开的文件，正文由 copyfile 通过 sendfile 零拷贝发送。
+            file_path 为实际发送的文件（预压缩变体），Content-type 仍按 fs_path 判断。
+            """
+            try:
+                f = open(file_path or fs_path, "rb")
+            except OSError:
+                return super().send_head()
+            try:
+                st = os.fstat(f.fileno())
+                etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+                last_modified = email.utils.formatdate(st.st_mtime, usegmt=True)
+                self._body_range = self._send_body_headers(fs_path, st.st_size, etag, st.st_mtime,
+                                                           last_modified, encoding, vary)
+            except BaseException:
+                f.close()
+                raise
+            if self._body_range is None:
+                f.close()
+                return None
+            return f
+
+        def send_head(self):
+            self._body_range = None
+            fs_path = self.translate_path(self.path)
+            if fs_path.endswith(os.sep):
+                fs_path = os.path.join(fs_path, "index.html")
+            page, file_path, encoding, vary = self._select_variant(fs_path)
+            if page is None:
+                if os.path.isfile(file_path):
+                    return self._send_file_head(fs_path, file_path, encoding, vary)
+                # 目录、不存在的路径交给默认实现处理
+                return super().send_head()
+
+            rng = self._send_body_headers(fs_path, len(page.body), page.etag, page.mtime,
+                                          page.last_modified, encoding, vary)
+            if rng is None:
+                return None
+            offset, count = rng
+            return io.BytesIO(page.body[offset:offset + count])
+
+        def copyfile(self, source, outputfile):
+            body_range, self._body_range = self._body_range, None
+            if body_range is None or isinstance(source, io.BytesIO):
+                return super().copyfile(source, outputfile)
+            offset, count = body_range
+            if count:
+                # socket.sendfile 优先使用 os.sendfile，数据不经过 Python 缓冲区
+                self.connection.sendfile(source, offset, count)
+
+    return Handler
+
+
+def serve(port: int, handler_class, workers: int = SERVER_CONFIG["workers"],
+          on_shutdown: Callable[[], None] | None = None) -> None:
+    """
+    阻塞运行 HTTP 服务，直到 Ctrl+C 或收到 SIGTERM。
+    退出时先停止接收新连接、等待处理中的请求完成，再调用 on_shutdown（例如停止 DBWatcher）。
+    """
+    httpd = PooledHTTPServer(("0.0.0.0", port), handler_class, workers=workers)
+
+    def _graceful(signum, frame):
+        # serve_forever 在主线程中运行，shutdown() 必须由其他线程调用
+        threading.Thread(target=httpd.shutdown, daemon=True).start()
+
+    previous = None
+    if threading.current_thread() is threading.main_thread():
+        previous = signal.signal(signal.SIGTERM, _graceful)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[*] Stopping server...")
+    finally:
+        httpd.server_close()
+        if previous is not None:
+            signal.signal(signal.SIGTERM, previous)
+        if on_shutdown:
+            on_shutdown()
@@ -1,18 +1,16 @@
-import socketserver
-import http.server
 import os
 import threading
+from core.config import SERVER_CONFIG
 from generator.builder import StaticSiteGenerator
 from generator.watcher import DBWatcher
 from dao.factory import create_connection
+from server.httpd import make_handler, serve
+from server.page_cache import PageCache
 
 PID_FILE = "server.pid"
 WEB_ROOT = "public"
 
-class ReuseAddrTCPServer(socketserver.TCPServer):
-    allow_reuse_address = True
-
-def server_start(port: int) -> None:
+def server_start(port: int, workers: int = SERVER_CONFIG["workers"]) -> None:
     try:
         conn = create_connection()
         conn.ping()
@@ -35,24 +33,24 @@ def server_start(port: int) -> None:
     if not os.path.exists(abs_root):
         os.makedirs(abs_root)
 
-    class Handler(http.server.SimpleHTTPRequestHandler):
-        def __init__(self, *args, **kwargs):
-            super().__init__(*args, directory=abs_root, **kwargs)
-        
-        def log_message(self, format, *args):
-            pass
+    page_cache = None
+    if SERVER_CONFIG["page_cache_bytes"] > 0:
+        page_cache = PageCache(SERVER_CONFIG["page_cache_bytes"], SERVER_CONFIG["page_cache_max_entry"])
+        # Generator 改写或删除文件时直接让对应缓存失效
+        gen.add_listener(page_cache.invalidate)
+    Handler = make_handler(abs_root, quiet=True, page_cache=page_cache)
 
-    print(f"[+] Server started on port {port}.")
+    print(f"[+] Server started on port {port} ({workers} workers).")
     print(f"[+] Root: {abs_root}")
     print(f"[+] Example: http://localhost:{port}/<username>/index.html")
     print("[*] Press Ctrl+C to stop.")
 
+    def _shutdown():
+        watcher.stop()
+        gen.close()
+
     try:
-        with ReuseAddrTCPServer(("0.0.0.0", port), Handler) as httpd:
-            httpd.serve_forever()
-    except KeyboardInterrupt:
-        print("\n[*] Stopping server...")
+        serve(port, Handler, workers=workers, on_shutdown=_shutdown)
     finally:
-        watcher.stop()
         if os.path.exists(PID_FILE):
-            os.remove(PID_FILE)
\ No newline at end of file
+            os.remove(PID_FILE)
@@ -0,0 +1,120 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from email.utils import formatdate
+
+
+@dataclass
+class CachedPage:
+    body: bytes
+    etag: str
+    mtime: float
+    last_modified: str  # RFC 7231 格式的 mtime
+
+
+class PageCache:
+    """
+    静态页面的内存 LRU 缓存，键为文件绝对路径。
+    页面内容只在 StaticSiteGenerator 改写/删除文件时失效（见 invalidate），命中时不访问磁盘。
+    预压缩变体（.gz / .br）以各自的文件路径作为键，与原文件独立缓存。
+    """
+
+    MISSING_LIMIT = 65536
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_entry_bytes: int = 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._pages: OrderedDict[str, CachedPage] = OrderedDict()
+        self._size = 0
+        # 正在加载的路径 -> [进行中的加载数, 加载期间的失效次数]；加载期间若发生失效则丢弃读到的旧内容。
+        # 只记录进行中的加载，条目随最后一个加载结束而删除，不随访问过的路径数增长
+        self._loading: dict[str, list[int]] = {}
+        # 已确认不存在的变体文件，避免每次请求都去磁盘探测
+        self._missing: OrderedDict[str, None] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> CachedPage | None:
+        with self._lock:
+            page = self._pages.get(path)
+            if page is not None:
+                self._pages.move_to_end(path)
+            return page
+
+    def is_missing(self, path: str) -> bool:
+        with self._lock:
+            return path in self._missing
+
+    def load(self, path: str, remember_missing: bool = False) -> CachedPage | None:
+        """
+        从磁盘读取文件并放入缓存；文件不存在或超过单条上限时返回 None。
+        remember_missing=True 时记录不存在的文件，直到该路径被 invalidate。
+        """
+        with self._lock:
+            state = self._loading.setdefault(path, [0, 0])
+            state[0] += 1
+            epoch = state[1]
+        try:
+            return self._load(path, remember_missing, state, epoch)
+        finally:
+            with self._lock:
+                state[0] -= 1
+                if state[0] == 0:
+                    del self._loading[path]
+
+    def _load(self, path: str, remember_missing: bool, state: list[int], epoch: int) -> CachedPage | None:
+        try:
+            with open(path, "rb") as f:
+                st = os.fstat(f.fileno())
+                if st.st_size > self.max_entry_bytes:
+                    return None
+                body = f.read()
+        except FileNotFoundError:
+            if remember_missing:
+                with self._lock:
+                    if state[1] == epoch:
+                        self._missing[path] = None
+                        if len(self._missing) > self.MISSING_LIMIT:
+                            self._missing.popitem(last=False)
+            return None
+        except OSError:
+            return None
+
+        page = CachedPage(
+            body=body,
+            etag='"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"',
+            mtime=st.st_mtime,
+            last_modified=formatdate(st.st_mtime, usegmt=True),
+        )
+        with self._lock:
+            if state[1] == epoch:
+                self._put(path, page)
+        return page
+
+    def _put(self, path: str, page: CachedPage):
+        old = self._pages.pop(path, None)
+        if old is not None:
+            self._size -= len(old.body)
+        self._pages[path] = page
+        self._size += len(page.body)
+        while self._size > self.max_bytes and self._pages:
+            _, evicted = self._pages.popitem(last=False)
+            self._size -= len(evicted.body)
+
+    def invalidate(self, path: str) -> None:
+        path = os.path.abspath(path)
+        with self._lock:
+            state = self._loading.get(path)
+            if state is not None:
+                state[1] += 1
+            self._missing.pop(path, None)
+            old = self._pages.pop(path, None)
+            if old is not None:
+                self._size -= len(old.body)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pages.clear()
+            self._missing.clear()
+            self._size = 0
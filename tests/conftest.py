@@ -0,0 +1,53 @@
+from unittest.mock import MagicMock
+import pytest
+from core.config import NOTIFY_CONFIG
+from core import url_manager
+from core.url_manager import URLManager
+from dao import events
+
+
+@pytest.fixture(autouse=True)
+def no_notify(monkeypatch):
+    """测试默认不向本机 UDP 端口广播事件；需要推送的测试自行绑定临时端口并打开。"""
+    monkeypatch.setitem(NOTIFY_CONFIG, "enabled", False)
+
+
+class FakeMapDAO:
+    """内存中的 url_mappings，按数据库排序规则（不区分大小写）匹配并返回库中保存的写法。"""
+    rows: dict[str, str] = {}
+    queries: list = []
+
+    def __init__(self, conn):
+        pass
+
+    def list_mappings(self):
+        FakeMapDAO.queries.append("list")
+        return list(self.rows.items())
+
+    def get_cids_by_urls(self, paths):
+        FakeMapDAO.queries.append(("batch", tuple(paths)))
+        folded = {p.casefold() for p in paths}
+        return {url: cid for cid, url in self.rows.items() if url.casefold() in folded}
+
+
+@pytest.fixture
+def url_maps(monkeypatch):
+    """每个测试独立的映射表与查询记录，测试结束后还原。"""
+    monkeypatch.setattr(FakeMapDAO, "rows", {"c1": "/alice/One.html", "c2": "/alice/Two.html"})
+    monkeypatch.setattr(FakeMapDAO, "queries", [])
+    return FakeMapDAO
+
+
+@pytest.fixture
+def mgr(monkeypatch, url_maps):
+    """使用 url_maps 的 URLManager，路由表、负缓存与订阅状态均为全新。"""
+    monkeypatch.setattr(url_manager, "create_connection", MagicMock())
+    monkeypatch.setattr(url_manager, "MySQLUrlMapDAO", url_maps)
+    monkeypatch.setattr(URLManager, "_url_to_cid", {})
+    monkeypatch.setattr(URLManager, "_cid_to_url", {})
+    monkeypatch.setattr(URLManager, "_missing", set())
+    monkeypatch.setattr(URLManager, "_routes_loaded", False)
+    monkeypatch.setattr(URLManager, "_subscribed", False)
+    m = URLManager()
+    yield m
+    events.unsubscribe(m.handle_event)
@@ -0,0 +1,97 @@
+import os
+from core.config import GENERATOR_CONFIG
+from generator.builder import StaticSiteGenerator
+
+
+def make_gen(tmp_path, monkeypatch):
+    monkeypatch.setitem(GENERATOR_CONFIG, "render_cache_dir", None)
+    gen = StaticSiteGenerator(str(tmp_path / "public"), workers=1)
+    gen.url_mgr._cid_map.clear()
+    return gen
+
+
+def test_identical_content_not_rewritten(tmp_path, monkeypatch):
+    gen = make_gen(tmp_path, monkeypatch)
+    path = str(tmp_path / "public" / "a.html")
+    assert gen._write_file(path, "<p>x</p>")
+    os.utime(path, (1, 1))
+    gen._digests.clear()  # 模拟重启：只能依靠文件本身比较
+    assert not gen._write_file(path, "<p>x</p>")
+    assert os.stat(path).st_mtime == 1
+    assert gen._write_file(path, "<p>y</p>")
+    assert open(path, encoding="utf-8").read() == "<p>y</p>"
+    assert [n for n in os.listdir(tmp_path / "public") if n.endswith(".tmp")] == []
+
+
+def test_title_change_moves_page(tmp_path, monkeypatch):
+    gen = make_gen(tmp_path, monkeypatch)
+    post = {"cid": "c1", "title": "Old", "context": "x", "date": "2024-01-01"}
+    gen.sync_post_file(post, "alice")
+    gen.sync_post_file(dict(post, title="New"), "alice")
+    assert os.listdir(tmp_path / "public" / "alice") == ["New.html"]
+
+
+def test_precompressed_variant(tmp_path, monkeypatch):
+    import gzip
+    gen = make_gen(tmp_path, monkeypatch)
+    monkeypatch.setitem(GENERATOR_CONFIG, "precompress", True)
+    monkeypatch.setitem(GENERATOR_CONFIG, "precompress_min_bytes", 64)
+    path = str(tmp_path / "public" / "p.html")
+    html = "<p>" + "long body " * 100 + "</p>"
+    gen._write_file(path, html)
+    assert gzip.decompress(open(path + ".gz", "rb").read()).decode("utf-8") == html
+    assert gen._write_file(path, "<p>short</p>")
+    assert not os.path.exists(path + ".gz")
+
+
+def test_serial_build_reports_throughput(tmp_path, monkeypatch, capsys):
+    gen = make_gen(tmp_path, monkeypatch)
+    posts = [({"cid": f"c{i}", "title": f"T{i}", "context": "x", "date": "2024-01-01"}, "alice") for i in range(3)]
+    assert gen.sync_post_files(posts) == 3
+    out = capsys.readouterr().out
+    assert "Generated 3 pages in" in out and "pages/s, serial, 3 written" in out
+
+
+
+def test_batch_resolves_site_links_once(tmp_path, monkeypatch):
+    from generator import builder
+    gen = make_gen(tmp_path, monkeypatch)
+    batches = []
+    monkeypatch.setattr(builder, "prefetch_links", lambda texts: batches.append(list(texts)))
+    monkeypatch.setattr(gen.renderer, "link_rewriter", builder.rewrite_links)
+    monkeypatch.setattr(builder.URLManager, "resolve_urls", lambda self, urls: dict.fromkeys(urls))
+    posts = [({"cid": f"c{i}", "title": f"T{i}", "context": f"[p](/alice/P{i}.html)", "date": "2024-01-01"},
+              "alice") for i in range(2)]
+    gen.sync_post_files(posts)
+    assert batches == [["[p](/alice/P0.html)", "[p](/alice/P1.html)"]]
+
+class FakeBrotli:
+    """用 zlib 代替的 brotli，测试环境未必安装该可选依赖。"""
+    MODE_TEXT = 1
+    compress = staticmethod(lambda data, mode=None: b"BR" + __import__("zlib").compress(data))
+    decompress = staticmethod(lambda data: __import__("zlib").decompress(data[2:]))
+
+
+def test_missing_or_stale_variants_regenerated(tmp_path, monkeypatch):
+    import gzip
+    from generator import builder
+    gen = make_gen(tmp_path, monkeypatch)
+    monkeypatch.setitem(GENERATOR_CONFIG, "precompress", True)
+    monkeypatch.setitem(GENERATOR_CONFIG, "precompress_min_bytes", 1)
+    monkeypatch.setattr(builder, "brotli", FakeBrotli)
+    path = str(tmp_path / "public" / "p.html")
+    gen._write_file(path, "<p>v1</p>")
+    os.remove(path + ".br")
+    with open(path + ".gz", "wb") as f:
+        f.write(gzip.compress(b"<p>old</p>"))
+
+    gen._digests.clear()  # 重启后原文件未变，只剩变体需要修复
+    gen._write_file(path, "<p>v1</p>")
+    assert FakeBrotli.decompress(open(path + ".br", "rb").read()) == b"<p>v1</p>"
+    assert gzip.decompress(open(path + ".gz", "rb").read()) == b"<p>v1</p>"
+
+    # brotli 不可用后，残留的 .br 被删除
+    monkeypatch.setattr(builder, "brotli", None)
+    gen._digests.clear()
+    gen._write_file(path, "<p>v1</p>")
+    assert not os.path.exists(path + ".br")
@@ -0,0 +1,104 @@
+import time
+from unittest.mock import MagicMock
+from dao import events
+from dao.cache import TTLCache, token_cache, username_cache
+from dao.user_dao import MySQLUserDAO
+from core.session import RequestScope
+
+
+def test_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_ttl_expiry():
+    cache = TTLCache(maxsize=2, ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_token_rotation_invalidates_cache():
+    """更新 token 或删除用户后，旧 token 不能再命中缓存"""
+    token_cache.clear()
+    token_cache.set("old_token", 7)
+    token_cache.set("other", 8)
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__.return_value.rowcount = 1
+    dao = MySQLUserDAO(conn)
+    dao.update_user(7, {"token": "new_token"})
+    assert token_cache.get("old_token") is None
+    assert token_cache.get("other") == 8
+
+    dao.delete_user(8)
+    assert token_cache.get("other") is None
+
+
+def test_scoped_update_invalidates_only_after_commit():
+    """事务内修改 token：提交前并发写回的旧条目，在发布事件（提交后）时一并清除"""
+    token_cache.clear()
+    token_cache.set("old_token", 7)
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__.return_value.rowcount = 1
+    dao = MySQLUserDAO(conn, autocommit=False)
+    dao.update_user(7, {"token": "new_token"})
+    # 尚未提交：其他请求仍可能读到旧 token 并重新缓存
+    token_cache.set("old_token", 7)
+    assert dao.pending_events == [("user", "7", "update", None)]
+
+    scope = RequestScope(conn, 7)
+    scope.users = dao
+    scope.publish_pending()
+    assert token_cache.get("old_token") is None
+
+
+def test_delete_user_logs_cascaded_posts():
+    conn = MagicMock()
+    cur = conn.cursor.return_value.__enter__.return_value
+    cur.rowcount = 1
+    MySQLUserDAO(conn).delete_user(9)
+    sqls = [c[0][0] for c in cur.execute.call_args_list]
+    # 级联删除前为该用户的文章写入删除日志，二者在同一事务中提交
+    assert sqls[0].startswith("INSERT INTO post_changes") and "owner_id" in sqls[0]
+    assert sqls[1].startswith("DELETE FROM users")
+    assert conn.commit.call_count == 1
+
+
+def test_get_usernames_batches_misses_and_uses_cache():
+    username_cache.clear()
+    username_cache.set(1, "alice")
+    conn = MagicMock()
+    cur = conn.cursor.return_value.__enter__.return_value
+    cur.fetchall.return_value = [(2, "bob")]
+    dao = MySQLUserDAO(conn)
+
+    # 命中的 1 不查询，未命中的 2、3 合并为一次 IN 查询；不存在的 3 不出现在结果中
+    assert dao.get_usernames([1, 2, 3, 2]) == {1: "alice", 2: "bob"}
+    cur.execute.assert_called_once()
+    sql, params = cur.execute.call_args[0]
+    assert "WHERE id IN (%s, %s)" in sql and sorted(params) == [2, 3]
+
+    # 全部命中时不访问数据库
+    cur.execute.reset_mock()
+    assert dao.get_usernames([1, 2]) == {1: "alice", 2: "bob"}
+    cur.execute.assert_not_called()
+
+
+def test_user_event_invalidates_cached_username():
+    username_cache.clear()
+    username_cache.set(2, "bob")
+    conn = MagicMock()
+    cur = conn.cursor.return_value.__enter__.return_value
+    cur.fetchall.return_value = [(2, "bobby")]
+    dao = MySQLUserDAO(conn)
+
+    events.publish("user", "2", "update")
+    assert username_cache.get(2) is None
+    assert dao.get_usernames([2]) == {2: "bobby"}
+    cur.execute.assert_called_once()
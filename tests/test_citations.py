@@ -0,0 +1,81 @@
+from core import citations, url_manager
+from dao import events
+
+HOST = f"http://{url_manager.SERVER_CONFIG['host']}:{url_manager.SERVER_CONFIG['port']}"
+
+
+def test_iter_links_finds_every_link_form():
+    text = (
+        '[a](/alice/One.html "title") <a href="/x?a=1&amp;b=2">x</a> '
+        "<https://example.com/auto> see https://example.com/bare."
+    )
+    urls = [url for _, _, url in citations.iter_links(text)]
+    assert urls == ["/alice/One.html", "/x?a=1&b=2", "https://example.com/auto", "https://example.com/bare"]
+    start, end, url = list(citations.iter_links(text))[3]
+    assert text[start:end] == url
+
+
+def test_extract_site_links_filters_external_and_dedups():
+    text = f"[a]({HOST}/alice/One.html) [b](/alice/One.html) [c]({HOST}/alice/One.html) https://example.com/x"
+    assert citations.extract_site_links(text) == [f"{HOST}/alice/One.html", "/alice/One.html"]
+
+
+def test_scan_citations_resolves_in_one_batch(mgr, url_maps):
+    docs = {
+        "c1": f"[self](/alice/One.html) [two]({HOST}/alice/Two.html) [new](/alice/New.html)",
+        "c3": "[one](/alice/one.html) [gone](/alice/Gone.html)",
+        "c4": None,
+    }
+    result = citations.scan_citations(docs, known={"/alice/New.html": "c9"})
+    assert result == {"c1": ["c2", "c9"], "c3": ["c1"], "c4": []}
+    # 路由表一次载入（大小写不同的写法直接命中），未命中的路径合并为一次查询
+    assert url_maps.queries[0] == "list"
+    batches = [q for q in url_maps.queries if q != "list"]
+    assert batches == [("batch", ("/alice/Gone.html",))]
+
+
+def test_scan_citations_without_links_skips_lookup(mgr, url_maps):
+    assert citations.scan_citations({"c1": "plain text"}) == {"c1": []}
+    assert url_maps.queries == []
+
+
+def test_rewrite_links_points_to_current_path(mgr):
+    page = (
+        f'<a href="{HOST}/alice/one.html#sec">a</a> <a href="/alice/Two.html?x=1&amp;y=2">b</a> '
+        '<a href="/alice/Gone.html">c</a> <a href="https://example.com/alice/One.html">d</a>'
+    )
+    # 写法不同的站内链接改写为当前的规范路径，未知与外站链接保持不变
+    assert citations.rewrite_links(page) == (
+        '<a href="/alice/One.html#sec">a</a> <a href="/alice/Two.html?x=1&amp;y=2">b</a> '
+        '<a href="/alice/Gone.html">c</a> <a href="https://example.com/alice/One.html">d</a>'
+    )
+    assert citations.rewrite_links("<p>no links</p>") == "<p>no links</p>"
+
+
+def test_rewrite_links_only_touches_anchor_hrefs(mgr):
+    from generator.renderer import render_markdown
+    page = render_markdown(
+        "[a](/alice/one.html)\n\n`[b](/alice/one.html)`\n\n"
+        "    <a href=\"/alice/one.html\">code</a>\n\n![img](/alice/one.html)"
+    )
+    rewritten = citations.rewrite_links(page)
+    assert rewritten.count('href="/alice/One.html"') == 1
+    assert rewritten.count("/alice/one.html") == 3
+
+
+def test_rewrite_links_caches_missing_paths_until_mappings_change(mgr, url_maps):
+    pages = ['<a href="/alice/index.html">i</a> <a href="/">home</a>',
+             '<a href="/alice/index.html">i</a> <a href="/alice/two.html">t</a>']
+    citations.prefetch_links(["[i](/alice/index.html) [h](/) [t](/alice/two.html)"])
+    assert len([q for q in url_maps.queries if q != "list"]) == 1
+    for page in pages:
+        citations.rewrite_links(page)
+    # 整批一次解析；非文章路径的未命中被缓存，逐页改写不再查询
+    assert len([q for q in url_maps.queries if q != "list"]) == 1
+
+    # 导入只发布汇总事件：清空负缓存，新路径重新查询
+    url_maps.rows["c5"] = "/alice/index.html"
+    events.publish("post", "7", "import", "1")
+    assert citations.rewrite_links(pages[0]) == '<a href="/alice/index.html">i</a> <a href="/">home</a>'
+    assert mgr.resolve_urls(["/alice/INDEX.html"]) == {"/alice/INDEX.html": "c5"}
+    assert len([q for q in url_maps.queries if q != "list"]) == 2
@@ -28,6 +28,12 @@ class TestServerCommands:
         run_cli(["server", "start", "8080"])
         mock_start.assert_called_once_with(8080)
 
+    @patch("server.manager.server_start")
+    def test_server_start_workers(self, mock_start, run_cli):
+        """[S-02] 指定 HTTP 工作线程数"""
+        run_cli(["server", "start", "8080", "--workers", "32"])
+        mock_start.assert_called_once_with(8080, workers=32)
+
 # ==========================================
 # User Tests
 # ==========================================
@@ -0,0 +1,162 @@
+import gzip
+import json
+from contextlib import contextmanager
+from datetime import date
+from unittest.mock import MagicMock
+import pytest
+from core import exporter, importer
+
+ROWS = [
+    ("c1", "First", "# First\\n\\nbody", "多行\n描述", None, date(2024, 1, 2), "alice", "/alice/First.html", '["c2", "c0"]'),
+    ("c2", "Second", "text", None, "misc", date(2024, 1, 3), "alice", None, None),
+]
+
+
+def fake_scope_factory(rows):
+    scope = MagicMock()
+    scope.user_id = 7
+    cur = scope.conn.cursor.return_value.__enter__.return_value
+    cur.__iter__.return_value = iter(rows)
+
+    @contextmanager
+    def fake_scope(token):
+        yield scope
+    return fake_scope, scope, cur
+
+
+def test_export_jsonl_gzip_streams_with_server_side_cursor(tmp_path, monkeypatch):
+    fake_scope, scope, cur = fake_scope_factory(ROWS)
+    monkeypatch.setattr(exporter, "request_scope", fake_scope)
+    out = tmp_path / "backup.jsonl.gz"
+    result = exporter.export_posts("tok", str(out), compress=True)
+
+    assert result.exported == 2
+    assert scope.conn.cursor.call_args[0][0] is exporter.pymysql.cursors.SSCursor
+    sql, params = cur.execute.call_args[0]
+    assert "WHERE p.owner_id = %s" in sql and params == (7,)
+    with gzip.open(out, "rt", encoding="utf-8") as f:
+        posts = [json.loads(line) for line in f]
+    assert posts[0]["references"] == ["c0", "c2"] and posts[0]["date"] == "2024-01-02"
+    assert posts[1]["url_path"] is None and posts[1]["references"] == []
+    # 导出文件可直接再次导入
+    assert [r["title"] for r in importer.iter_records(str(out))] == ["First", "Second"]
+
+
+def test_export_markdown_round_trips_through_importer(tmp_path, monkeypatch):
+    fake_scope, _, cur = fake_scope_factory(ROWS)
+    monkeypatch.setattr(exporter, "request_scope", fake_scope)
+    out = tmp_path / "md"
+    exporter.export_posts("tok", str(out), fmt="markdown", all_users=True)
+
+    assert cur.execute.call_args[0][1] == ()
+    assert (out / "alice" / "First.md").exists() and (out / "alice" / "c2.md").exists()
+    records = {r["title"]: r for r in importer.iter_records(str(out))}
+    assert records["First"]["description"] == "多行\n描述"
+    assert records["First"]["date"] == "2024-01-02"
+    assert records["Second"]["catagory"] == "misc" and records["Second"]["context"] == "text"
+
+
+def test_export_markdown_uses_decoded_title_on_disk(tmp_path, monkeypatch):
+    rows = [("c3", "静态站点", "body", None, None, date(2024, 1, 4), "alice", "/alice/%E9%9D%99%E6%80%81%E7%AB%99%E7%82%B9.html", None)]
+    fake_scope, _, _ = fake_scope_factory(rows)
+    monkeypatch.setattr(exporter, "request_scope", fake_scope)
+    exporter.export_posts("tok", str(tmp_path), fmt="markdown")
+    assert [p.name for p in (tmp_path / "alice").iterdir()] == ["静态站点.md"]
+
+
+def test_export_markdown_rejects_traversal_paths(tmp_path, monkeypatch):
+    rows = [("c4", "Esc", "body", None, None, date(2024, 1, 4), "alice", "/alice/../../escape.html", None),
+            ("c5", "Enc", "body", None, None, date(2024, 1, 4), "alice", "/alice/%2e%2e/%2e%2e/escape.html", None)]
+    fake_scope, _, _ = fake_scope_factory(rows)
+    monkeypatch.setattr(exporter, "request_scope", fake_scope)
+    out = tmp_path / "md"
+    exporter.export_posts("tok", str(out), fmt="markdown")
+    # 不安全的映射退回 CID 命名，不会写到 out_dir 之外
+    assert sorted(p.name for p in (out / "alice").iterdir()) == ["c4.md", "c5.md"]
+    assert not (tmp_path / "escape.md").exists()
+
+
+def test_markdown_path_raises_when_fallback_unsafe():
+    post = {"url_path": "/../x.html", "author": "..", "cid": "c1"}
+    with pytest.raises(ValueError):
+        exporter._markdown_path("/tmp/out", post, False)
+
+
+def test_import_regenerates_traversal_url_path(tmp_path, monkeypatch):
+    jsonl = tmp_path / "posts.jsonl"
+    jsonl.write_text(json.dumps({"title": "Esc", "url_path": "/alice/../../escape.html"}) + "\n"
+                     + json.dumps({"title": "Enc", "url_path": "/alice/%2e%2e/Enc.html"}) + "\n",
+                     encoding="utf-8")
+    scope = MagicMock()
+    scope.user_id = 7
+    scope.users.get_usernames.return_value = {7: "alice"}
+    scope.posts.existing_titles.return_value = []
+    scope.url_maps.get_cids_by_urls.return_value = {}
+    scope.posts.get_many.return_value = {}
+
+    @contextmanager
+    def import_scope(token):
+        yield scope
+
+    monkeypatch.setattr(importer, "request_scope", import_scope)
+    importer.import_posts("tok", str(jsonl))
+    mappings = [m[1] for m in scope.url_maps.upsert_mappings.call_args[0][0]]
+    assert mappings == ["/alice/Esc.html", "/alice/Enc.html"]
+
+
+def test_import_honors_exported_cid_and_references(tmp_path, monkeypatch):
+    fake_scope, _, _ = fake_scope_factory(ROWS + [
+        ("c9", "Other", None, None, None, date(2024, 1, 5), "bob", "/bob/Other.html", '["c1"]')])
+    monkeypatch.setattr(exporter, "request_scope", fake_scope)
+    out = tmp_path / "md"
+    exporter.export_posts("tok", str(out), fmt="markdown", all_users=True)
+
+    scope = MagicMock()
+    scope.user_id = 7
+    scope.users.get_usernames.return_value = {7: "alice"}
+    scope.posts.existing_titles.return_value = []
+    scope.url_maps.get_cids_by_urls.return_value = {}
+    scope.posts.get_many.return_value = {}
+    scopes = []
+
+    @contextmanager
+    def import_scope(token):
+        scopes.append(token)
+        yield scope
+
+    monkeypatch.setattr(importer, "request_scope", import_scope)
+    # 每块一篇：c1 引用的 c2 在之后的块才导入
+    result = importer.import_posts("tok", str(out), chunk_size=1)
+    # 3 个导入事务 + 3 条引用按块大小分批写入
+    assert result.imported == 3 and len(scopes) == 6
+
+    created = {row[0]: row[1] for call in scope.posts.create_posts.call_args_list for row in call[0][1]}
+    assert created == {"c1": "First", "c2": "Second", "c9": "Other"}
+    mappings = dict(m for call in scope.url_maps.upsert_mappings.call_args_list for m in call[0][0])
+    # 站内路径总是按标题重新生成
+    assert mappings == {"c1": "/alice/First.html", "c2": "/alice/Second.html", "c9": "/alice/Other.html"}
+    refs = [p for call in scope.references.add_references.call_args_list for p in call[0][0]]
+    assert sorted(refs) == [("c1", "c0"), ("c1", "c2"), ("c9", "c1")]
+
+
+def test_import_skips_existing_cids(tmp_path, monkeypatch):
+    jsonl = tmp_path / "posts.jsonl"
+    jsonl.write_text(json.dumps({"cid": "c1", "title": "A"}) + "\n"
+                     + json.dumps({"cid": "C1", "title": "B"}) + "\n"
+                     + json.dumps({"cid": "c2", "title": "C"}) + "\n", encoding="utf-8")
+    scope = MagicMock()
+    scope.user_id = 7
+    scope.users.get_usernames.return_value = {7: "alice"}
+    scope.posts.existing_titles.return_value = []
+    scope.url_maps.get_cids_by_urls.return_value = {}
+    scope.posts.get_many.return_value = {"c2": {"cid": "c2"}}
+
+    @contextmanager
+    def import_scope(token):
+        yield scope
+
+    monkeypatch.setattr(importer, "request_scope", import_scope)
+    result = importer.import_posts("tok", str(jsonl))
+    # CID 同样按排序规则比较，"C1" 与 "c1" 重复；c2 已存在
+    assert (result.imported, result.skipped) == (1, 2)
+    scope.posts.get_many.assert_called_once_with(["c1", "c2"], ["cid"])
@@ -0,0 +1,217 @@
+import http.client
+import socket
+import threading
+import time
+import pytest
+from core.config import SERVER_CONFIG
+from server.httpd import PooledHTTPServer, make_handler
+from server.page_cache import PageCache
+
+
+@pytest.fixture
+def serve_dir(tmp_path):
+    """在临时端口上运行真实的 PooledHTTPServer，返回 (root, port, server)。"""
+    servers = []
+
+    def start(page_cache: PageCache | None = None, workers: int = 2):
+        httpd = PooledHTTPServer(("127.0.0.1", 0), make_handler(str(tmp_path), quiet=True, page_cache=page_cache),
+                                 workers=workers)
+        threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True).start()
+        servers.append(httpd)
+        return httpd.server_address[1], httpd
+
+    yield tmp_path, start
+    for httpd in servers:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def request(port: int, path: str = "/", headers: dict | None = None, conn=None):
+    conn = conn or http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.request("GET", path, headers=headers or {})
+    resp = conn.getresponse()
+    return resp, resp.read()
+
+
+def test_idle_keepalive_does_not_starve_new_clients(serve_dir, monkeypatch):
+    monkeypatch.setitem(SERVER_CONFIG, "keepalive_busy_timeout", 0.2)
+    root, start = serve_dir
+    (root / "a.html").write_bytes(b"a")
+    port, _ = start(workers=1)
+    idle = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    resp, _ = request(port, "/a.html", conn=idle)
+    assert resp.status == 200 and not resp.will_close
+
+    # 唯一的工作线程被空闲连接占用：新连接排队后，空闲连接应很快让出线程
+    begin = time.monotonic()
+    resp, body = request(port, "/a.html")
+    assert body == b"a" and time.monotonic() - begin < SERVER_CONFIG["keepalive_timeout"] / 2
+    idle.close()
+
+
+def test_pipelined_requests_on_one_connection(serve_dir):
+    root, start = serve_dir
+    (root / "a.html").write_bytes(b"a")
+    port, _ = start()
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        sock.sendall(b"GET /a.html HTTP/1.1\r\nHost: x\r\n\r\n" * 2)
+        data = b""
+        while data.count(b"200 OK") < 2:
+            chunk = sock.recv(65536)
+            assert chunk
+            data += chunk
+
+
+def test_close_does_not_wait_for_idle_keepalive(serve_dir):
+    root, start = serve_dir
+    (root / "a.html").write_bytes(b"a")
+    port, httpd = start(workers=1)
+    idle = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    request(port, "/a.html", conn=idle)
+    queued = socket.create_connection(("127.0.0.1", port), timeout=5)
+
+    begin = time.monotonic()
+    httpd.shutdown()
+    httpd.server_close()
+    assert time.monotonic() - begin < 2
+    # 排队中（或尚未被 accept）的连接被关闭而不是一直挂起
+    try:
+        assert queued.recv(1) == b""
+    except ConnectionResetError:
+        pass
+    queued.close()
+    idle.close()
+
+
+@pytest.mark.parametrize("cached", [True, False])
+def test_conditional_get_and_validators(serve_dir, cached):
+    root, start = serve_dir
+    (root / "a.html").write_bytes(b"<p>hello</p>")
+    port, _ = start(PageCache() if cached else None)
+
+    resp, body = request(port, "/a.html")
+    assert resp.status == 200 and body == b"<p>hello</p>"
+    etag, last_modified = resp.getheader("ETag"), resp.getheader("Last-Modified")
+    assert etag.startswith('"') and last_modified.endswith("GMT")
+    assert resp.getheader("Content-Length") == "12"
+    assert resp.getheader("Content-type") == "text/html"
+    assert resp.getheader("Accept-Ranges") == "bytes"
+
+    resp, body = request(port, "/a.html", {"If-None-Match": etag})
+    assert resp.status == 304 and body == b"" and resp.getheader("ETag") == etag
+    resp, _ = request(port, "/a.html", {"If-None-Match": f'"other", W/{etag}'})
+    assert resp.status == 304
+    resp, _ = request(port, "/a.html", {"If-Modified-Since": last_modified})
+    assert resp.status == 304 and resp.getheader("Last-Modified") == last_modified
+    # If-None-Match 优先于 If-Modified-Since
+    resp, body = request(port, "/a.html", {"If-None-Match": '"other"', "If-Modified-Since": last_modified})
+    assert resp.status == 200 and body == b"<p>hello</p>"
+    resp, _ = request(port, "/a.html", {"If-Modified-Since": "Thu, 01 Jan 1970 00:00:00 GMT"})
+    assert resp.status == 200
+
+
+@pytest.mark.parametrize("accept, expected", [
+    ("br, gzip", "br"),
+    ("gzip, br;q=0.5", "br"),
+    ("gzip, br;q=0", "gzip"),
+    ("br;q=0, gzip;q=0", None),
+    ("identity", None),
+    ("*", "br"),
+    ("*, br;q=0", "gzip"),
+    ("", None),
+])
+def test_accept_encoding_selects_variant(serve_dir, accept, expected):
+    root, start = serve_dir
+    (root / "a.html").write_bytes(b"plain")
+    (root / "a.html.br").write_bytes(b"brotli")
+    (root / "a.html.gz").write_bytes(b"gzipped")
+    port, _ = start(PageCache())
+    resp, body = request(port, "/a.html", {"Accept-Encoding": accept})
+    assert resp.getheader("Content-Encoding") == expected
+    assert body == {"br": b"brotli", "gzip": b"gzipped", None: b"plain"}[expected]
+    assert resp.getheader("Vary") == "Accept-Encoding"
+
+
+@pytest.mark.parametrize("cache", ["none", "disabled", "too_small"])
+def test_variant_served_from_disk_without_cache_entry(serve_dir, cache):
+    root, start = serve_dir
+    (root / "a.html").write_bytes(b"plain")
+    (root / "a.html.gz").write_bytes(b"gzipped")
+    page_cache = {"none": None, "disabled": PageCache(max_bytes=0), "too_small": PageCache(max_entry_bytes=1)}[cache]
+    port, _ = start(page_cache)
+    resp, body = request(port, "/a.html", {"Accept-Encoding": "gzip"})
+    assert resp.status == 200 and body == b"gzipped"
+    assert resp.getheader("Content-Encoding") == "gzip" and resp.getheader("Vary") == "Accept-Encoding"
+    assert resp.getheader("Content-type") == "text/html"
+    resp, body = request(port, "/a.html", {"Accept-Encoding": "identity"})
+    assert body == b"plain" and resp.getheader("Content-Encoding") is None
+    assert resp.getheader("Vary") == "Accept-Encoding"
+
+
+def test_vary_only_when_variants_exist(serve_dir):
+    root, start = serve_dir
+    (root / "a.html").write_bytes(b"plain")
+    (root / "b.html").write_bytes(b"plain")
+    (root / "b.html.gz").write_bytes(b"gzipped")
+    port, _ = start(PageCache())
+    resp, _ = request(port, "/a.html", {"Accept-Encoding": "gzip"})
+    assert resp.getheader("Vary") is None and resp.getheader("Content-Encoding") is None
+    resp, _ = request(port, "/b.html", {"Accept-Encoding": "identity"})
+    assert resp.getheader("Vary") == "Accept-Encoding"
+    etag = resp.getheader("ETag")
+    resp, _ = request(port, "/b.html", {"If-None-Match": etag})
+    assert resp.status == 304 and resp.getheader("Vary") == "Accept-Encoding"
+
+
+BODY = bytes(range(256)) * 40  # 10240 字节
+
+
+@pytest.mark.parametrize("mode", ["cached", "sendfile"])
+@pytest.mark.parametrize("header, status, expected", [
+    ("bytes=0-9", 206, (0, 9)),
+    ("bytes=10240-", 416, None),
+    ("bytes=100-", 206, (100, 10239)),
+    ("bytes=-16", 206, (10224, 10239)),
+    ("bytes=-99999", 206, (0, 10239)),
+    ("bytes=10000-99999", 206, (10000, 10239)),
+    ("bytes=5-3", 200, None),           # 语法错误，忽略 Range
+    ("bytes=0-1,4-5", 200, None),       # 多段 Range 返回完整内容
+    ("bytes=abc", 200, None),
+    ("items=0-1", 200, None),
+    ("bytes=-0", 416, None),
+])
+def test_range_requests(serve_dir, monkeypatch, mode, header, status, expected):
+    root, start = serve_dir
+    (root / "f.bin").write_bytes(BODY)
+    sent = []
+    real_sendfile = socket.socket.sendfile
+    monkeypatch.setattr(socket.socket, "sendfile",
+                        lambda self, f, offset=0, count=None: sent.append((offset, count))
+                        or real_sendfile(self, f, offset, count))
+    # sendfile: 超过内存缓存单条上限的文件直接从磁盘零拷贝发送
+    port, _ = start(PageCache() if mode == "cached" else PageCache(max_entry_bytes=1024))
+    resp, body = request(port, "/f.bin", {"Range": header})
+    assert resp.status == status
+    if status == 206:
+        first, last = expected
+        assert body == BODY[first:last + 1]
+        assert resp.getheader("Content-Range") == f"bytes {first}-{last}/{len(BODY)}"
+        assert resp.getheader("Content-Length") == str(last - first + 1)
+        assert sent == ([] if mode == "cached" else [(first, last - first + 1)])
+    elif status == 416:
+        assert body == b"" and resp.getheader("Content-Range") == f"bytes */{len(BODY)}"
+    else:
+        assert body == BODY and resp.getheader("Content-Range") is None
+        assert sent == ([] if mode == "cached" else [(0, len(BODY))])
+
+
+def test_if_range_mismatch_returns_full_body(serve_dir):
+    root, start = serve_dir
+    (root / "f.bin").write_bytes(BODY)
+    port, _ = start(PageCache())
+    resp, _ = request(port, "/f.bin")
+    etag = resp.getheader("ETag")
+    resp, body = request(port, "/f.bin", {"Range": "bytes=0-3", "If-Range": etag})
+    assert resp.status == 206 and body == BODY[:4]
+    resp, body = request(port, "/f.bin", {"Range": "bytes=0-3", "If-Range": '"stale"'})
+    assert resp.status == 200 and body == BODY
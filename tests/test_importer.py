@@ -0,0 +1,152 @@
+import json
+from contextlib import contextmanager
+from unittest.mock import MagicMock
+import pytest
+from core import importer
+from core.url_manager import URLManager
+
+
+def test_iter_records_markdown_and_jsonl(tmp_path):
+    md = tmp_path / "md" / "2024"
+    md.mkdir(parents=True)
+    (md / "b.md").write_text("---\ntitle: \"Front Title\"\ndate: 2024-01-02\n---\nbody", encoding="utf-8")
+    (md / "a.md").write_text("# 标题\n\n正文", encoding="utf-8")
+    (md / "notes.txt").write_text("ignored", encoding="utf-8")
+    records = list(importer.iter_records(str(tmp_path / "md")))
+    assert [r["title"] for r in records] == ["标题", "Front Title"]
+    assert records[1]["date"] == "2024-01-02" and records[1]["context"] == "body"
+
+    jsonl = tmp_path / "posts.jsonl"
+    jsonl.write_text(json.dumps({"title": "J"}) + "\n\n" + json.dumps({"title": "K"}) + "\n", encoding="utf-8")
+    assert [r["title"] for r in importer.iter_records(str(jsonl))] == ["J", "K"]
+
+
+def test_iter_records_reports_bad_date_location(tmp_path):
+    jsonl = tmp_path / "posts.jsonl"
+    jsonl.write_text(json.dumps({"title": "J", "date": "2024-01-02"}) + "\n"
+                     + json.dumps({"title": "K", "date": "2024/01/02"}) + "\n", encoding="utf-8")
+    with pytest.raises(ValueError, match=r"posts\.jsonl:2: invalid date '2024/01/02'"):
+        list(importer.iter_records(str(jsonl)))
+
+    md = tmp_path / "md"
+    md.mkdir()
+    (md / "a.md").write_text("---\ndate: 02.01.2024\n---\nbody", encoding="utf-8")
+    with pytest.raises(ValueError, match=r"a\.md: invalid date"):
+        list(importer.iter_records(str(md)))
+
+
+def test_import_posts_chunks_and_skips_duplicates(tmp_path, monkeypatch):
+    jsonl = tmp_path / "posts.jsonl"
+    titles = ["A", "B", "a", "Taken", "C", "D"]
+    jsonl.write_text("".join(json.dumps({"title": t, "context": "x"}) + "\n" for t in titles), encoding="utf-8")
+
+    scope = MagicMock()
+    scope.user_id = 7
+    scope.users.get_usernames.return_value = {7: "alice"}
+    scope.posts.existing_titles.side_effect = lambda owner, ts: {t for t in ts if t == "Taken"}
+    scope.url_maps.get_cids_by_urls.return_value = {}
+    scopes = []
+
+    @contextmanager
+    def fake_scope(token):
+        scopes.append(token)
+        yield scope
+
+    monkeypatch.setattr(importer, "request_scope", fake_scope)
+    result = importer.import_posts("tok", str(jsonl), chunk_size=4)
+
+    # 6 条记录分 2 个事务；"a" 与 "A" 重复，"Taken" 已存在
+    assert len(scopes) == 2
+    assert (result.imported, result.skipped) == (4, 2)
+    created = [row for call in scope.posts.create_posts.call_args_list for row in call[0][1]]
+    assert [row[1] for row in created] == ["A", "B", "C", "D"]
+    mappings = [m for call in scope.url_maps.upsert_mappings.call_args_list for m in call[0][0]]
+    assert [m[1] for m in mappings] == ["/alice/A.html", "/alice/B.html", "/alice/C.html", "/alice/D.html"]
+    assert [m[0] for m in mappings] == [row[0] for row in created]
+
+
+def test_import_posts_records_citations_within_chunk(tmp_path, monkeypatch):
+    jsonl = tmp_path / "posts.jsonl"
+    records = [
+        {"title": "A", "context": "base"},
+        {"title": "B", "context": "see [A](/alice/A.html) and [A again](/alice/a.html) or https://example.com/x"},
+    ]
+    jsonl.write_text("".join(json.dumps(r) + "\n" for r in records), encoding="utf-8")
+
+    scope = MagicMock()
+    scope.user_id = 7
+    scope.users.get_usernames.return_value = {7: "alice"}
+    scope.posts.existing_titles.return_value = []
+    scope.url_maps.get_cids_by_urls.return_value = {}
+
+    @contextmanager
+    def fake_scope(token):
+        yield scope
+
+    monkeypatch.setattr(importer, "request_scope", fake_scope)
+    importer.import_posts("tok", str(jsonl))
+
+    created = scope.posts.create_posts.call_args[0][1]
+    cid_a, cid_b = created[0][0], created[1][0]
+    # 同一块内的映射尚未提交，引用直接按本块的 url_path 解析，不查询 URLManager
+    scope.references.add_references.assert_called_once_with([(cid_b, cid_a)])
+
+
+def test_import_posts_dedups_with_database_collation(tmp_path, monkeypatch):
+    jsonl = tmp_path / "posts.jsonl"
+    # utf8mb4_unicode_ci 不区分重音与全半角
+    titles = ["Café", "Cafe", "ＡＢＣ", "abc", "Über"]
+    jsonl.write_text("".join(json.dumps({"title": t}) + "\n" for t in titles), encoding="utf-8")
+
+    scope = MagicMock()
+    scope.user_id = 7
+    scope.users.get_usernames.return_value = {7: "alice"}
+    # 数据库按排序规则返回已存储的写法
+    scope.posts.existing_titles.side_effect = lambda owner, ts: {"uber"} if "Über" in ts else set()
+    scope.url_maps.get_cids_by_urls.return_value = {}
+
+    @contextmanager
+    def fake_scope(token):
+        yield scope
+
+    monkeypatch.setattr(importer, "request_scope", fake_scope)
+    result = importer.import_posts("tok", str(jsonl))
+    assert (result.imported, result.skipped) == (2, 3)
+    assert [row[1] for row in scope.posts.create_posts.call_args[0][1]] == ["Café", "ＡＢＣ"]
+
+
+def test_import_posts_records_citations_to_later_chunks(tmp_path, monkeypatch):
+    jsonl = tmp_path / "posts.jsonl"
+    records = [
+        {"title": "A", "context": "forward [B](/alice/b.html) and [index](/alice/index.html)"},
+        {"title": "B", "context": "back [A](/alice/A.html)"},
+    ]
+    jsonl.write_text("".join(json.dumps(r) + "\n" for r in records), encoding="utf-8")
+
+    scope = MagicMock()
+    scope.user_id = 7
+    scope.users.get_usernames.return_value = {7: "alice"}
+    scope.posts.existing_titles.return_value = []
+    scope.url_maps.get_cids_by_urls.return_value = {}
+    scope.posts.get_many.return_value = {}
+    resolved = {}
+    # 之前的块已提交，由 URLManager 解析；之后的块此时还不存在
+    monkeypatch.setattr(URLManager, "resolve_urls", lambda self, urls: {u: resolved.get(u) for u in urls})
+
+    @contextmanager
+    def fake_scope(token):
+        yield scope
+
+    def create_posts(owner, rows):
+        for row in rows:
+            resolved[f"/alice/{row[1]}.html"] = row[0]
+
+    scope.posts.create_posts.side_effect = create_posts
+    monkeypatch.setattr(importer, "request_scope", fake_scope)
+    importer.import_posts("tok", str(jsonl), chunk_size=1)
+
+    cid_a = scope.posts.create_posts.call_args_list[0][0][1][0][0]
+    cid_b = scope.posts.create_posts.call_args_list[1][0][1][0][0]
+    calls = [call[0][0] for call in scope.references.add_references.call_args_list]
+    # 第二块中的 B -> A 随块写入；A -> B 在全部块提交后补上
+    assert calls == [[], [(cid_b, cid_a)], [(cid_a, cid_b)]]
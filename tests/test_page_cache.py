@@ -0,0 +1,56 @@
+from server.page_cache import PageCache
+
+
+def test_hit_does_not_read_disk(tmp_path):
+    path = tmp_path / "index.html"
+    path.write_text("v1")
+    cache = PageCache()
+    cache.load(str(path))
+    path.write_text("v2")
+    assert cache.get(str(path)).body == b"v1"
+    cache.invalidate(str(path))
+    assert cache.get(str(path)) is None
+    assert cache.load(str(path)).body == b"v2"
+
+
+def test_size_limits(tmp_path):
+    cache = PageCache(max_bytes=6, max_entry_bytes=4)
+    for name in ("a", "b"):
+        (tmp_path / name).write_text(name * 3)
+        cache.load(str(tmp_path / name))
+    (tmp_path / "big").write_text("x" * 5)
+    assert cache.load(str(tmp_path / "big")) is None
+    (tmp_path / "c").write_text("ccc")
+    cache.load(str(tmp_path / "c"))
+    assert cache.get(str(tmp_path / "a")) is None
+    assert cache.get(str(tmp_path / "b")) is not None
+
+
+def test_invalidate_during_load_discards_stale_read(tmp_path, monkeypatch):
+    from server import page_cache
+    path = str(tmp_path / "p.html")
+    (tmp_path / "p.html").write_text("v1")
+    cache = PageCache()
+    real_fstat = page_cache.os.fstat
+
+    def racing_fstat(fd):
+        # 读取期间生成器改写了文件
+        cache.invalidate(path)
+        return real_fstat(fd)
+
+    monkeypatch.setattr(page_cache.os, "fstat", racing_fstat)
+    assert cache.load(path).body == b"v1"
+    assert cache.get(path) is None
+    monkeypatch.undo()
+    assert cache.load(path) is not None and cache.get(path) is not None
+
+
+def test_bookkeeping_does_not_grow_with_paths(tmp_path):
+    cache = PageCache(max_bytes=4)
+    for i in range(100):
+        p = tmp_path / f"{i}.html"
+        p.write_text("abcd")
+        cache.load(str(p))
+        cache.invalidate(str(p))
+    assert cache._loading == {}
+    assert len(cache._pages) <= 1
@@ -0,0 +1,86 @@
+from datetime import date
+from unittest.mock import MagicMock
+import pytest
+from dao.post_dao import MySQLPostDAO
+
+
+def make_dao(rows):
+    conn = MagicMock()
+    cur = conn.cursor.return_value.__enter__.return_value
+    cur.fetchall.return_value = rows
+    return MySQLPostDAO(conn), cur
+
+
+def test_first_page_returns_cursor_of_last_row():
+    dao, cur = make_dao([(9, date(2024, 5, 2), "c9"), (7, date(2024, 5, 1), "c7"), (3, date(2024, 5, 1), "c3")])
+    rows, cursor = dao.list_page(2)
+    assert rows == ["c9", "c7"]
+    assert cursor == "2024-05-01_7"
+    sql, params = cur.execute.call_args[0]
+    assert "WHERE" not in sql and "ORDER BY date DESC, id DESC" in sql
+    assert params == [3]
+
+
+def test_next_page_uses_keyset_and_projection():
+    dao, cur = make_dao([(3, date(2024, 5, 1), "c3", "Title")])
+    rows, cursor = dao.list_page(2, cursor="2024-05-01_7", fields=["title"])
+    assert rows == [{"cid": "c3", "title": "Title"}]
+    assert cursor is None
+    sql, params = cur.execute.call_args[0]
+    assert "date < %s OR (date = %s AND id < %s)" in sql and "OFFSET" not in sql
+    assert params == ["2024-05-01", "2024-05-01", 7, 3]
+
+
+def test_rejects_unknown_field_and_bad_cursor():
+    dao, _ = make_dao([])
+    with pytest.raises(ValueError):
+        dao.list_page(10, fields=["password_hash"])
+    with pytest.raises(ValueError):
+        dao.list_page(10, cursor="garbage")
+
+
+@pytest.mark.parametrize("limit", [0, -1])
+def test_rejects_non_positive_page_size(limit):
+    dao, cur = make_dao([(9, date(2024, 5, 2), "c9")])
+    with pytest.raises(ValueError):
+        dao.list_page(limit)
+    cur.execute.assert_not_called()
+
+
+@pytest.mark.parametrize("count", ["0", "-5"])
+def test_cli_rejects_non_positive_count(monkeypatch, capsys, count):
+    import cli
+    monkeypatch.setattr("sys.argv", ["mc", "post", "list", count, "--cursor", "2024-05-01_7"])
+    page = MagicMock()
+    monkeypatch.setattr(cli.post, "post_page", page)
+    with pytest.raises(SystemExit):
+        cli.main()
+    page.assert_not_called()
+    assert "positive integer" in capsys.readouterr().err
+
+
+def test_post_list_uses_keyset_page(monkeypatch):
+    from contextlib import contextmanager
+    from core import post
+    scope = MagicMock()
+    scope.posts.list_page.return_value = (["c9", "c7"], "2024-05-01_7")
+
+    @contextmanager
+    def fake_scope(token):
+        yield scope
+
+    monkeypatch.setattr(post, "request_scope", fake_scope)
+    assert post.post_list("tok", 2) == ["c9", "c7"]
+    scope.posts.list_page.assert_called_once_with(2, cursor=None, fields=None)
+    scope.posts.list_posts.assert_not_called()
+
+
+def test_cli_plain_list_prints_next_cursor(monkeypatch, capsys):
+    import cli
+    monkeypatch.setattr("sys.argv", ["mc", "post", "list", "2"])
+    monkeypatch.setattr(cli.store, "load_local_token", lambda: "tok")
+    page = MagicMock(return_value=(["c9", "c7"], "2024-05-01_7"))
+    monkeypatch.setattr(cli.post, "post_page", page)
+    cli.main()
+    page.assert_called_once_with("tok", 2, None, None)
+    assert capsys.readouterr().out.splitlines() == ["Posts: ['c9', 'c7']", "Next cursor: 2024-05-01_7"]
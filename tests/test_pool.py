@@ -0,0 +1,136 @@
+import socket
+import threading
+import pytest
+from dao import factory
+from dao.factory import ConnectionPool
+
+
+class FakeConn:
+    def __init__(self):
+        self.server_status = 0
+        self.closed = False
+        self.pings = 0
+        self.rollbacks = 0
+        self.alive = True
+
+    def ping(self, reconnect=False):
+        self.pings += 1
+        if not self.alive:
+            raise ConnectionError("gone")
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.server_status = 0
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def made():
+    return []
+
+
+@pytest.fixture
+def pool(made):
+    def connect():
+        c = FakeConn()
+        made.append(c)
+        return c
+    return ConnectionPool(connect=connect, size=2, timeout=0.2, idle_timeout=60, ping_interval=0)
+
+
+def test_reuse_connection(pool, made):
+    """归还后的连接被再次借出，而不是重新建立"""
+    with pool.connection():
+        pass
+    with pool.connection():
+        pass
+    assert len(made) == 1
+    assert made[0].pings == 1
+
+
+def test_rollback_open_transaction_on_release(pool, made):
+    conn = pool.acquire()
+    made[0].server_status = 1  # SERVER_STATUS_IN_TRANS
+    conn.close()
+    assert made[0].rollbacks == 1 and made[0].server_status == 0
+    # 没有未提交事务时归还不回滚
+    pool.acquire().close()
+    assert made[0].rollbacks == 1
+    assert len(made) == 1
+
+
+def test_unhealthy_connection_replaced(pool, made):
+    with pool.connection():
+        pass
+    made[0].alive = False
+    with pool.connection() as conn:
+        assert conn._raw is made[1]
+    assert made[0].closed
+
+
+def test_exhausted_pool_times_out(pool):
+    a, b = pool.acquire(), pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire()
+    a.close()
+    b.close()
+
+
+def test_waiter_gets_released_connection(pool, made):
+    a, b = pool.acquire(), pool.acquire()
+    got = []
+    t = threading.Thread(target=lambda: got.append(pool.acquire()))
+    t.start()
+    a.close()
+    t.join(1)
+    assert got and got[0]._raw is made[0]
+    b.close()
+
+
+def test_idle_eviction(made):
+    pool = ConnectionPool(connect=lambda: made.append(FakeConn()) or made[-1],
+                          size=2, idle_timeout=0, ping_interval=0)
+    with pool.connection():
+        pass
+    with pool.connection():
+        pass
+    assert made[0].closed
+    assert len(made) == 2
+
+
+def test_double_close_is_noop(pool, made):
+    conn = pool.acquire()
+    conn.close()
+    conn.close()
+    assert len(pool._idle) == 1
+
+
+def test_dead_idle_connection_replaced_within_ping_interval(made):
+    """服务器在空闲期间关闭了连接：不等 ping_interval 到期，借出前即发现并重建"""
+    ours, server = socket.socketpair()
+    def connect():
+        c = FakeConn()
+        c._sock = ours if not made else None
+        made.append(c)
+        return c
+    pool = ConnectionPool(connect=connect, size=2, ping_interval=3600)
+    with pool.connection():
+        pass
+    with pool.connection() as conn:
+        assert conn._raw is made[0]
+    server.close()
+    with pool.connection() as conn:
+        assert conn._raw is made[1]
+    assert made[0].closed and made[0].pings == 0
+    ours.close()
+
+
+def test_configure_pool_rejects_unknown_options(monkeypatch):
+    monkeypatch.setattr(factory, "POOL_CONFIG", dict(factory.POOL_CONFIG))
+    with pytest.raises(ValueError, match="sizee"):
+        factory.configure_pool(sizee=4)
+    assert "sizee" not in factory.POOL_CONFIG
+    factory.configure_pool(size=4)
+    assert factory.POOL_CONFIG["size"] == 4
@@ -0,0 +1,107 @@
+from unittest.mock import MagicMock
+import pytest
+from dao.post_dao import MySQLPostDAO
+
+
+def make_dao(rows=(), rowcount=1):
+    conn = MagicMock()
+    cur = conn.cursor.return_value.__enter__.return_value
+    cur.fetchall.return_value = list(rows)
+    cur.rowcount = rowcount
+    return MySQLPostDAO(conn, autocommit=False), conn, cur
+
+
+def test_update_fields_single_statement():
+    dao, conn, cur = make_dao()
+    assert dao.update_fields("c1", {"title": "T", "context": "body"})
+    sql, params = cur.execute.call_args_list[0][0]
+    assert sql == "UPDATE posts SET `title` = %s, `context` = %s WHERE cid = %s"
+    assert params == ("T", "body", "c1")
+    # 变更日志一条、事件一条，由调用方统一提交
+    conn.commit.assert_not_called()
+    assert dao.pending_events == [("post", "c1", "update", None)]
+
+
+def test_update_fields_rejects_unknown_field():
+    dao, _, cur = make_dao()
+    assert not dao.update_fields("c1", {"title": "T", "owner_id": 2})
+    cur.execute.assert_not_called()
+
+
+def test_get_many_and_get_fields():
+    dao, _, cur = make_dao(rows=[("c2", "B", None), ("c1", "A", "desc")])
+    result = dao.get_many(["c1", "c2", "c1", "c3"], ["title", "description"])
+    assert result == {"c1": {"title": "A", "description": "desc"},
+                      "c2": {"title": "B", "description": None}}
+    sql, params = cur.execute.call_args[0]
+    assert sql.count("%s") == 3 and params == ["c1", "c2", "c3"]
+
+    cur.fetchall.return_value = []
+    assert dao.get_fields("missing", ["title"]) is None
+    with pytest.raises(ValueError):
+        dao.get_fields("c1", ["password_hash"])
+
+
+def test_cli_get_several_cids_uses_one_batch(monkeypatch, capsys):
+    import cli
+    monkeypatch.setattr("sys.argv", ["mc", "post", "get", "c1", "c2", "c1", "title,date"])
+    monkeypatch.setattr(cli.store, "load_local_token", lambda: "tok")
+    get_many = MagicMock(return_value={"c1": {"title": "A", "date": "2024-05-01"}})
+    monkeypatch.setattr(cli.post, "post_get_many", get_many)
+    cli.main()
+    get_many.assert_called_once_with("tok", ["c1", "c2", "c1"], ["title", "date"])
+    assert capsys.readouterr().out.splitlines() == [
+        "c1 title: A", "c1 date: 2024-05-01", "c2: not found"]
+
+
+def test_batch_writes_publish_one_summary_event():
+    from dao.reference_dao import MySQLPostReferenceDAO
+    from dao.url_map_dao import MySQLUrlMapDAO
+    dao, conn, _ = make_dao()
+    rows = [(f"c{i}", f"T{i}", None, None, None, "2024-05-01") for i in range(3)]
+    dao.create_posts(7, rows)
+    maps = MySQLUrlMapDAO(conn, autocommit=False)
+    maps.upsert_mappings([(r[0], f"/alice/{r[1]}.html") for r in rows])
+    refs = MySQLPostReferenceDAO(conn, autocommit=False)
+    refs.add_references([("c1", "c0"), ("c2", "c0")])
+    assert dao.pending_events == [("post", "7", "import", "3")]
+    assert maps.pending_events == [] and refs.pending_events == [("reference", "*", "import", "2")]
+
+
+def test_set_references_writes_only_the_difference():
+    from dao.reference_dao import MySQLPostReferenceDAO
+    conn = MagicMock()
+    cur = conn.cursor.return_value.__enter__.return_value
+    cur.fetchall.return_value = [("c2",), ("c3",)]
+    refs = MySQLPostReferenceDAO(conn, autocommit=False)
+    refs.set_references("c1", ["c3", "c4"])
+    sqls = [c[0][0] for c in cur.execute.call_args_list]
+    assert sqls[1].startswith("DELETE FROM post_references") and cur.execute.call_args_list[1][0][1] == ("c1", "c2")
+    assert cur.executemany.call_args_list[0][0][1] == [("c1", "c4")]
+    assert any(s.startswith("INSERT INTO post_changes") for s in sqls)
+    conn.commit.assert_not_called()
+    assert refs.pending_events == [("reference", "c1", "add", "c4"), ("reference", "c1", "remove", "c2")]
+
+
+@pytest.mark.parametrize("update", [
+    lambda post: post.post_update("tok", "c1", "context", "see /alice/Two.html"),
+    lambda post: post.post_update_fields("tok", "c1", {"context": "see /alice/Two.html", "catagory": "x"}),
+])
+def test_context_update_rescans_citations_in_same_scope(monkeypatch, update):
+    from contextlib import contextmanager
+    from core import post
+    scope = MagicMock()
+    scope.posts.update_field.return_value = True
+    scope.posts.update_fields.return_value = True
+    scopes = []
+
+    @contextmanager
+    def fake_scope(token):
+        scopes.append(token)
+        yield scope
+
+    monkeypatch.setattr(post, "request_scope", fake_scope)
+    monkeypatch.setattr(post, "scan_citations", lambda docs: {"c1": ["c2"]} if "/alice/Two.html" in docs["c1"] else {})
+    assert update(post)
+    assert len(scopes) == 1
+    scope.references.set_references.assert_called_once_with("c1", ["c2"])
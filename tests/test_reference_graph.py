@@ -0,0 +1,138 @@
+from unittest.mock import MagicMock
+from dao import reference_graph
+from dao.reference_graph import ReferenceGraph
+
+
+def make_graph():
+    graph = ReferenceGraph()
+    rows = [("a", "b"), ("b", "c"), ("c", "a"), ("c", "d"), ("d", "gone"), ("e", "e")]
+    rows += [(cid, None) for cid in "abcdef"]
+    graph.load_rows(rows)
+    return graph
+
+
+def test_forward_backward_and_transitive():
+    graph = make_graph()
+    assert graph.references("c") == ["a", "d"]
+    assert sorted(graph.cited_by("a")) == ["c"]
+    assert graph.dependencies("a") == ["b", "c", "d", "gone"]
+    assert graph.dependencies("a", max_depth=1) == ["b"]
+    assert sorted(graph.dependents("d")) == ["a", "b", "c"]
+    assert graph.references("missing") == []
+
+
+def test_cycles_dangling_orphans():
+    graph = make_graph()
+    assert sorted(graph.cycles()) == [["a", "b", "c"], ["e"]]
+    assert graph.dangling() == [("d", "gone")]
+    assert graph.orphans() == ["f"]
+
+
+def test_incremental_updates_match_rebuild():
+    graph = make_graph()
+    assert graph.set_refs("f", {"a"}) == {"a"}
+    assert graph.set_refs("c", {"d"}) == {"a"}
+    assert graph.set_refs("c", {"d"}) == set()
+    assert graph.references("f") == ["a"] and graph.cited_by("a") == ["f"]
+    assert graph.cycles() == [["e"]]
+    # 删除文章：其引用级联删除，指向它的引用变为悬空
+    graph.set_post("b", False)
+    assert graph.references("b") == []
+    assert graph.dangling() == [("a", "b"), ("d", "gone")]
+    assert graph.edge_count() == 5
+
+    before = {cid: graph.references(cid) for cid in "abcdef"}
+    graph._compact()
+    assert {cid: graph.references(cid) for cid in "abcdef"} == before
+    assert not graph._removed and not graph._added_out
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        posts, refs = self.db
+        if sql.startswith("SELECT post_cid, ref_cid FROM post_references UNION ALL"):
+            self.rows = list(refs) + [(cid, None) for cid in posts]
+        elif sql.startswith("SELECT cid FROM posts"):
+            self.rows = [(cid,) for cid in params if cid in posts]
+        else:
+            self.rows = [r for r in refs if r[0] in params]
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeConn:
+    def __init__(self, posts, refs):
+        self.db = (posts, refs)
+
+    def cursor(self):
+        return FakeCursor(self.db)
+
+    def commit(self):
+        pass
+
+
+class FakeChanges:
+    rows: list = []
+
+    def __init__(self, conn):
+        pass
+
+    def get_bounds(self):
+        return (self.rows[0][0], self.rows[-1][0]) if self.rows else (0, 0)
+
+    def list_changes(self, after_id, limit=1000):
+        return [r for r in self.rows if r[0] > after_id][:limit]
+
+    def get_changes(self, ids):
+        return [r for r in self.rows if r[0] in ids]
+
+
+def test_sync_applies_other_processes_writes_from_change_log(monkeypatch):
+    monkeypatch.setattr(reference_graph, "MySQLPostChangeDAO", FakeChanges)
+    monkeypatch.setattr(FakeChanges, "rows", [(1, "a", "create")])
+    posts, refs = {"a", "b"}, [("a", "b")]
+    conn = FakeConn(posts, refs)
+    graph = ReferenceGraph()
+    graph.sync(conn)
+    assert graph.cited_by("b") == ["a"] and graph.changes.position == 1
+
+    # 其他进程：c 引用 b，a 被删除（引用随外键级联删除）
+    posts.add("c")
+    posts.discard("a")
+    refs[:] = [("c", "b")]
+    FakeChanges.rows += [(2, "c", "create"), (3, "c", "reference"), (4, "a", "delete")]
+    graph.sync(conn)
+    assert graph.cited_by("b") == ["c"] and graph.references("a") == []
+    assert graph.changes.position == 4
+
+    assert graph.refresh(conn, ["c"]) == set()
+    refs[:] = []
+    assert graph.refresh(conn, ["c"]) == {"b", "c"}
+
+
+def test_get_graph_syncs_unless_driven_by_watcher(monkeypatch):
+    monkeypatch.setattr(reference_graph, "_graph", None)
+    synced = []
+    monkeypatch.setattr(ReferenceGraph, "sync", lambda self, conn: synced.append(self))
+    monkeypatch.setattr(reference_graph, "connection", MagicMock())
+    graph = reference_graph.get_graph(sync=False)
+    assert synced == [] and reference_graph.get_graph() is graph and synced == [graph]
+
+
+def test_sync_skips_graph_driven_by_watcher():
+    graph = ReferenceGraph()
+    graph.driven = True
+    conn = MagicMock()
+    graph.sync(conn)
+    conn.cursor.assert_not_called()
+    assert graph.changes.position is None
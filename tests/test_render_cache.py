@@ -0,0 +1,39 @@
+from generator.render_cache import RenderCache
+from generator.renderer import HTMLRenderer
+
+
+def test_survives_restart(tmp_path):
+    cache = RenderCache(str(tmp_path))
+    key = cache.key("# hello")
+    cache.put(key, "<h1>hello</h1>")
+    assert RenderCache(str(tmp_path)).get(key) == "<h1>hello</h1>"
+
+
+def test_lru_eviction_by_size(tmp_path):
+    cache = RenderCache(str(tmp_path), max_bytes=10)
+    a, b, c = cache.key("a"), cache.key("b"), cache.key("c")
+    cache.put(a, "aaaa")
+    cache.put(b, "bbbb")
+    cache.get(a)
+    cache.put(c, "cccc")
+    assert cache.get(b) is None
+    assert cache.get(a) == "aaaa" and cache.get(c) == "cccc"
+
+
+def test_renderer_reuses_cached_body(tmp_path):
+    """正文不变时只改标题，不再重新解析 Markdown"""
+    renderer = HTMLRenderer(RenderCache(str(tmp_path)))
+    post = {"title": "A", "context": "*x*", "date": "2024-01-01"}
+    first = renderer.render_post(post, "alice", "cid1")
+    renderer.cache.put(renderer.cache.key("*x*"), "<p>cached</p>")
+    second = renderer.render_post(dict(post, title="B"), "alice", "cid1")
+    assert "<em>x</em>" in first
+    assert "<p>cached</p>" in second
+
+
+def test_link_rewriter_applies_after_cache(tmp_path):
+    renderer = HTMLRenderer(RenderCache(str(tmp_path)), link_rewriter=lambda s: s.replace("/old", "/new"))
+    page = renderer.render_post({"title": "A", "context": "[x](/old)"}, "alice", "cid1")
+    assert 'href="/new"' in page
+    # 缓存中保存改写前的 HTML，映射变化后重新改写即可
+    assert "/old" in renderer.cache.get(renderer.cache.key("[x](/old)"))
@@ -0,0 +1,198 @@
+from unittest.mock import MagicMock
+import pytest
+from dao.post_dao import MySQLPostDAO
+from dao import search_index
+from dao.search_index import NgramIndex, tokenize
+
+
+def make_dao(rows):
+    conn = MagicMock()
+    cur = conn.cursor.return_value.__enter__.return_value
+    cur.fetchall.return_value = rows
+    return MySQLPostDAO(conn), cur
+
+
+def test_search_uses_fulltext_single_statement():
+    dao, cur = make_dao([("c1",), ("c2",)])
+    assert dao.search_posts("关键字", offset=10, limit=5) == ["c1", "c2"]
+    cur.execute.assert_called_once()
+    sql, params = cur.execute.call_args[0]
+    assert sql.count("MATCH(") == 3 and "LIKE" not in sql
+    assert "ORDER BY MIN(tier)" in sql
+    assert params == ['"关键字"'] * 3 + [5, 10]
+
+
+def test_search_short_keyword_falls_back_to_like():
+    dao, cur = make_dao([])
+    assert dao.search_posts("a") == []
+    sql, params = cur.execute.call_args[0]
+    assert "MATCH(" not in sql and "LIMIT" not in sql
+    assert params == ["%a%"] * 3
+
+
+def test_search_escapes_like_wildcards():
+    dao, cur = make_dao([])
+    dao.search_posts("%")
+    assert cur.execute.call_args[0][1] == ["%\\%%"] * 3
+
+
+@pytest.mark.parametrize("offset, limit", [(-1, None), (0, -5)])
+def test_search_rejects_negative_offset_and_limit(offset, limit):
+    dao, cur = make_dao([])
+    with pytest.raises(ValueError):
+        dao.search_posts("关键字", offset=offset, limit=limit)
+    cur.execute.assert_not_called()
+
+
+@pytest.mark.parametrize("flag", ["--offset", "--count"])
+def test_cli_search_rejects_negative_values(monkeypatch, capsys, flag):
+    import cli
+    monkeypatch.setattr("sys.argv", ["mc", "post", "search", "kw", flag, "-1"])
+    search = MagicMock()
+    monkeypatch.setattr(cli.post, "post_search", search)
+    with pytest.raises(SystemExit):
+        cli.main()
+    search.assert_not_called()
+    assert "non-negative integer" in capsys.readouterr().err
+
+
+def test_tokenize_matches_mysql_ngram_parser():
+    assert tokenize("静态站点 Cache, v2!") == ["静态", "态站", "站点", "ca", "ac", "ch", "he", "v2"]
+    assert tokenize("中 文 a") == ["中", "文", "a"]
+
+
+def test_ngram_index_matches_substrings_like_fulltext():
+    index = NgramIndex()
+    index.add("c1", 1, "PageCache 设计", None, None)
+    index.add("c2", 1, "page-cache", None, None)
+    # 与 FULLTEXT ngram 一致：英文关键字按子串匹配
+    assert index.search("ache") == ["c1", "c2"]
+    assert index.search("gecache") == ["c1"]
+    # 已知差异：标点视为分隔符，"page cache" 也能命中 "page-cache"
+    assert index.search("page cache") == ["c2"]
+    # 单字片段无法由二元组回答
+    assert index.search("a") is None and index.search("page c") is None
+
+
+def test_ngram_index_phrase_and_priority():
+    index = NgramIndex()
+    index.add("c1", 1, "无关标题", "介绍静态站点", "正文")
+    index.add("c2", 1, "静态站点生成器", None, None)
+    index.add("c3", 2, "站点静态", "", "关于静态站点的说明")
+    index.add("c4", 2, "静态 站点", None, None)
+    # title 命中优先，其次 description，再次 context
+    assert index.search("静态站点") == ["c2", "c1", "c3"]
+    assert index.search("静态 站点") == ["c4"]
+    assert index.search("静态站点", offset=1, limit=1) == ["c1"]
+    assert index.search("点静") == ["c3"]
+    # 单个汉字无法由二元组回答，交给数据库
+    assert index.search("静") is None
+
+
+def test_ngram_index_incremental_update():
+    index = NgramIndex()
+    index.add("c1", 1, "Hello World", None, None)
+    index.add("c2", 2, "hello", None, None)
+    index.add("c1", 1, "Goodbye", None, None)
+    assert index.search("hello world") == []
+    assert index.search("goodbye") == ["c1"]
+    index.remove_owner(2)
+    assert index.search("hello") == [] and len(index) == 1
+    index.remove("c1")
+    assert len(index) == 0 and not any(index._postings)
+
+
+class FakeCursor:
+    def __init__(self, posts):
+        self.posts = posts
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        cids = params if params else list(self.posts)
+        self.rows = [(cid, *self.posts[cid]) for cid in cids if cid in self.posts]
+
+    def fetchall(self):
+        return self.rows
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class FakeConn:
+    def __init__(self, posts):
+        self.posts = posts
+
+    def cursor(self, cls=None):
+        return FakeCursor(self.posts)
+
+    def commit(self):
+        pass
+
+
+class FakeChanges:
+    rows: list = []
+
+    def __init__(self, conn):
+        pass
+
+    def get_bounds(self):
+        return (self.rows[0][0], self.rows[-1][0]) if self.rows else (0, 0)
+
+    def list_changes(self, after_id, limit=1000):
+        return [r for r in self.rows if r[0] > after_id][:limit]
+
+    def get_changes(self, ids):
+        return [r for r in self.rows if r[0] in ids]
+
+
+def test_ngram_index_syncs_from_change_log(monkeypatch):
+    monkeypatch.setattr(search_index, "MySQLPostChangeDAO", FakeChanges)
+    monkeypatch.setattr(FakeChanges, "rows", [(1, "c1", "create")])
+    posts = {"c1": (1, "旧标题", None, None)}
+    conn = FakeConn(posts)
+    index = NgramIndex()
+    index.sync(conn)
+    assert index.search("旧标") == ["c1"] and index.changes.position == 1
+
+    # 其他进程的写入只出现在变更日志中
+    posts["c1"] = (1, "新标题", None, None)
+    posts["c2"] = (2, "新文章", None, None)
+    FakeChanges.rows = [(1, "c1", "create"), (2, "c1", "update"), (3, "c2", "create")]
+    index.sync(conn)
+    assert index.search("新") is None and index.search("旧标") == []
+    assert index.search("新标") == ["c1"] and index.search("文章") == ["c2"]
+
+    del posts["c2"]
+    FakeChanges.rows.append((4, "c2", "delete"))
+    index.sync(conn)
+    assert index.search("文章") == [] and len(index) == 1
+
+    # 游标之后的日志已被清理：全量重建
+    posts["c3"] = (1, "第三篇", None, None)
+    FakeChanges.rows = [(9, "c9", "update")]
+    index.sync(conn)
+    assert index.search("三篇") == ["c3"] and index.changes.position == 9
+
+
+def test_search_posts_skips_index_load_for_short_sessions(monkeypatch):
+    from dao import post_dao
+    monkeypatch.setitem(post_dao.SEARCH_CONFIG, "backend", "ngram")
+    monkeypatch.setitem(post_dao.SEARCH_CONFIG, "ngram_warmup", 2)
+    monkeypatch.setattr(search_index, "_index", None)
+    monkeypatch.setattr(search_index, "_misses", 0)
+    loads = []
+    monkeypatch.setattr(NgramIndex, "sync", lambda self, conn: loads.append(self))
+    monkeypatch.setattr(search_index, "connection", MagicMock())
+    dao, cur = make_dao([("c1",)])
+    assert dao.search_posts("关键字") == ["c1"]
+    assert dao.search_posts("关键字") == ["c1"]
+    assert loads == [] and cur.execute.call_count == 2
+    # 超过 warmup 次数后加载索引，之后每次搜索前增量同步
+    assert dao.search_posts("关键字") == []
+    dao.search_posts("关键字")
+    assert len(loads) == 2 and loads[0] is loads[1] and cur.execute.call_count == 2
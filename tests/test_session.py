@@ -0,0 +1,81 @@
+from unittest.mock import MagicMock
+import pytest
+from core import session
+
+
+class FakeConnection:
+    """记录 commit / rollback / close 调用顺序的连接。"""
+
+    def __init__(self, log: list):
+        self.log = log
+
+    def cursor(self):
+        return MagicMock()
+
+    def commit(self):
+        self.log.append("commit")
+
+    def rollback(self):
+        self.log.append("rollback")
+
+    def close(self):
+        self.log.append("close")
+
+
+@pytest.fixture
+def scope_env(monkeypatch):
+    """request_scope 使用的连接、token 校验与事件发布全部替换为记录调用的假对象。"""
+    log, conns, verified = [], [], []
+
+    def create_connection():
+        conn = FakeConnection(log)
+        conns.append(conn)
+        return conn
+
+    def verify_token(token, conn):
+        verified.append((token, conn))
+        return 7
+
+    monkeypatch.setattr(session, "create_connection", create_connection)
+    monkeypatch.setattr(session, "verify_token", verify_token)
+    monkeypatch.setattr(session.events, "publish", lambda *event: log.append(("publish", *event)))
+    return log, conns, verified
+
+
+def test_success_commits_once_then_publishes(scope_env):
+    log, conns, verified = scope_env
+    with session.request_scope("tok") as scope:
+        assert scope.user_id == 7
+        scope.posts.pending_events.append(("post", "c1", "update", None))
+        scope.references.pending_events.append(("reference", "c1", "add", "c2"))
+        assert log == []
+
+    assert len(conns) == 1 and verified == [("tok", conns[0])]
+    assert scope.conn is conns[0] and scope.posts.conn is conns[0]
+    # 只提交一次，事件在提交之后发布，最后关闭连接
+    assert log == ["commit", ("publish", "post", "c1", "update", None),
+                   ("publish", "reference", "c1", "add", "c2"), "close"]
+    assert scope.posts.pending_events == [] and scope.references.pending_events == []
+
+
+def test_exception_rolls_back_without_commit_or_publish(scope_env):
+    log, conns, _ = scope_env
+    with pytest.raises(RuntimeError):
+        with session.request_scope("tok") as scope:
+            scope.posts.pending_events.append(("post", "c1", "update", None))
+            raise RuntimeError("boom")
+    assert len(conns) == 1
+    assert log == ["rollback", "close"]
+
+
+def test_invalid_token_closes_connection(scope_env, monkeypatch):
+    log, conns, _ = scope_env
+
+    def reject(token, conn):
+        raise PermissionError("Invalid token")
+
+    monkeypatch.setattr(session, "verify_token", reject)
+    with pytest.raises(PermissionError):
+        with session.request_scope("bad"):
+            pass
+    assert len(conns) == 1 and log == ["close"]
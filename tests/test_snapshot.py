@@ -0,0 +1,37 @@
+import subprocess
+import sys
+from generator.snapshot import post_digest, save_snapshot, load_snapshot
+
+
+def test_digest_is_stable_across_processes():
+    data = {"cid": "abc", "owner_id": 1, "title": "标题", "context": None}
+    code = ("from generator.snapshot import post_digest;"
+            "print(post_digest({'cid': 'abc', 'owner_id': 1, 'title': '标题', 'context': None}))")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == post_digest(data)
+
+
+def test_roundtrip(tmp_path):
+    path = str(tmp_path / "snap.json.gz")
+    snapshot = {"c1": {"owner_id": 1, "signature": "d1"}, "c2": {"owner_id": 2, "signature": "d2"}}
+    save_snapshot(path, "public", 42, snapshot, {"c1": "alice/hello"})
+    cursor, loaded, paths = load_snapshot(path, "public")
+    assert cursor == 42
+    assert loaded == snapshot
+    assert paths == {"c1": "alice/hello"}
+
+
+def test_other_output_dir_ignored(tmp_path):
+    path = str(tmp_path / "snap.json.gz")
+    save_snapshot(path, "public", 1, {}, {})
+    assert load_snapshot(path, "www") is None
+    assert load_snapshot(str(tmp_path / "missing.gz"), "public") is None
+
+
+def test_roundtrip_titles_and_refs(tmp_path):
+    path = str(tmp_path / "snap.json.gz")
+    snapshot = {"c1": {"owner_id": 1, "signature": "d1", "title": "T", "refs": frozenset({"c2", "c0"})},
+                "c2": {"owner_id": 1, "signature": "d2", "title": "U"}}
+    save_snapshot(path, "public", 3, snapshot, {})
+    _, loaded, _ = load_snapshot(path, "public")
+    assert loaded == snapshot
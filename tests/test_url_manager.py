@@ -0,0 +1,59 @@
+import urllib.parse
+import pytest
+from core import url_manager
+from core.url_manager import URLManager
+from dao import events
+
+
+def test_resolve_urls_in_one_bulk_load(mgr, url_maps):
+    host = f"http://{url_manager.SERVER_CONFIG['host']}:{url_manager.SERVER_CONFIG['port']}"
+    urls = [f"{host}/alice/One.html", "/alice/Two.html", "https://example.com/alice/One.html", "not a url"]
+    assert mgr.resolve_urls(urls) == {urls[0]: "c1", urls[1]: "c2", urls[2]: None, urls[3]: None}
+    assert mgr.get_cid_from_external_url(urls[0]) == "c1"
+    assert url_maps.queries == ["list"]
+
+
+def test_routes_follow_upsert_events_and_fall_back_for_misses(mgr, url_maps):
+    mgr.resolve_urls([])
+    events.publish("url_mapping", "c1", "upsert", "/alice/Renamed.html")
+    assert mgr.resolve_urls(["/alice/Renamed.html"]) == {"/alice/Renamed.html": "c1"}
+    assert mgr.get_url_by_cid("c1") == "/alice/Renamed.html"
+
+    # 其他进程写入、本进程尚未收到事件的映射：合并为一次批量查询
+    url_maps.rows["c3"] = "/bob/New.html"
+    result = mgr.resolve_urls(["/bob/new.html", "/bob/Missing.html"])
+    assert result == {"/bob/new.html": "c3", "/bob/Missing.html": None}
+    assert url_maps.queries[-1] == ("batch", ("/bob/new.html", "/bob/Missing.html"))
+
+    events.publish("post", "c3", "delete")
+    assert mgr.get_url_by_cid("c3") is None
+
+
+def test_case_variants_hit_the_routing_table(mgr, url_maps):
+    mgr.resolve_urls([])
+    urls = ["/ALICE/one.html", "/alice/TWO.html"]
+    assert mgr.resolve_urls(urls) == {urls[0]: "c1", urls[1]: "c2"}
+    assert mgr.resolve_urls(urls) == {urls[0]: "c1", urls[1]: "c2"}
+    assert url_maps.queries == ["list"]
+    # 改名后旧写法不再命中
+    mgr.set_route("c1", "/alice/Uno.html")
+    assert mgr.resolve_urls(["/alice/uno.html"]) == {"/alice/uno.html": "c1"}
+    assert "/alice/one.html" not in mgr._url_to_cid
+
+
+@pytest.mark.parametrize("title", [
+    "", None, "   ", "Hello World", " a / b \\ c ", "a--b---c", "- -/\\-", "静态 站点", "100% a&b?#1",
+    "emoji😀", "\ttab\tinside\t", "　全角空格　", "~keep_.-this",
+])
+def test_slugify_matches_original_safe_title(title):
+    def original(t):
+        if not t:
+            return "untitled"
+        safe = t.strip()
+        safe = safe.replace(" ", "-").replace("/", "-").replace("\\", "-")
+        while "--" in safe:
+            safe = safe.replace("--", "-")
+        return urllib.parse.quote(safe)
+
+    assert url_manager.slugify(title) == original(title)
+    assert URLManager().safe_title(title) == original(title)
@@ -0,0 +1,200 @@
+import threading
+import time
+from unittest.mock import MagicMock
+from core.config import NOTIFY_CONFIG
+from dao import events
+from dao.events import ChangeListener
+from dao.reference_graph import ReferenceGraph
+from generator.watcher import DBWatcher
+from generator.snapshot import post_digest
+
+
+def state(*posts):
+    result = {}
+    for cid, title in posts:
+        data = {"cid": cid, "owner_id": 1, "title": title, "context": "", "description": None,
+                "date": "2024-01-01", "catagory": None}
+        result[cid] = {"owner_id": 1, "data": data, "signature": post_digest(data)}
+    return result
+
+
+def make_watcher(monkeypatch):
+    gen = MagicMock()
+    gen.has_post_file.return_value = True
+    watcher = DBWatcher(gen, snapshot_path=None, graph=ReferenceGraph())
+    titles = {}
+    monkeypatch.setattr(watcher, "_get_usernames", lambda ids: {1: "alice"})
+    monkeypatch.setattr(watcher, "_get_link_targets", lambda cids: {
+        c: {"cid": c, "title": titles[c], "url": f"/alice/{titles[c]}.html"} for c in cids if c in titles})
+    return watcher, gen, titles
+
+
+def rendered(gen):
+    pages = {data["cid"]: data for call in gen.sync_post_files.call_args_list for data, _ in call[0][0]}
+    gen.sync_post_files.reset_mock()
+    return pages
+
+
+def test_reference_diffs_rebuild_only_neighbourhood(monkeypatch):
+    watcher, gen, titles = make_watcher(monkeypatch)
+    titles.update(a="A", b="B", c="C")
+    full = state(("a", "A"), ("b", "B"), ("c", "C"))
+    watcher._apply(None, full, {"a": frozenset({"b"})})
+    pages = rendered(gen)
+    assert set(pages) == {"a", "b", "c"}
+    assert [link["cid"] for link in pages["a"]["references"]] == ["b"]
+    assert [link["cid"] for link in pages["b"]["cited_by"]] == ["a"]
+
+    # c 新增对 b 的引用：只重建 c 与 b
+    monkeypatch.setattr(watcher, "_get_posts_state", lambda conn, cids: {c: full[c] for c in cids})
+    watcher._apply(MagicMock(), state(("c", "C")), {"c": frozenset({"b"})}, checked={"c"})
+    pages = rendered(gen)
+    assert set(pages) == {"b", "c"}
+    assert [link["cid"] for link in pages["b"]["cited_by"]] == ["a", "c"]
+    assert sorted(watcher.graph.cited_by("b")) == ["a", "c"]
+
+    # b 改标题：b 以及引用它的 a、c 都需要更新链接文字
+    titles["b"] = "B2"
+    watcher._apply(MagicMock(), state(("b", "B2")), {}, checked={"b"})
+    pages = rendered(gen)
+    assert set(pages) == {"a", "b", "c"}
+    assert pages["a"]["references"][0]["title"] == "B2"
+
+    # 删除 c：页面被移除，b 的被引用列表随之更新
+    del titles["c"]
+    watcher._apply(MagicMock(), {}, {}, checked={"c"})
+    gen.remove_post_file.assert_called_once_with("c")
+    assert watcher.graph.references("c") == [] and watcher.graph.orphans() == []
+    pages = rendered(gen)
+    assert set(pages) == {"b"}
+    assert [link["cid"] for link in pages["b"]["cited_by"]] == ["a"]
+
+    # 内容未变的全量对账不重建任何页面
+    watcher._apply(None, state(("a", "A"), ("b", "B2")), {"a": frozenset({"b"})})
+    assert rendered(gen) == {}
+
+
+class FakeChanges:
+    rows: list = []
+
+    def __init__(self, conn):
+        pass
+
+    def list_changes(self, after_id, limit=1000):
+        return [r for r in sorted(self.rows) if r[0] > after_id][:limit]
+
+    def get_changes(self, ids):
+        return [r for r in sorted(self.rows) if r[0] in ids]
+
+
+def test_poll_rereads_ids_committed_behind_cursor(monkeypatch):
+    from generator import watcher as watcher_mod
+    watcher, _, _ = make_watcher(monkeypatch)
+    monkeypatch.setattr(watcher_mod, "MySQLPostChangeDAO", FakeChanges)
+    applied = []
+    monkeypatch.setattr(watcher, "_apply_changes", lambda conn, cids: applied.append(cids))
+    cursor = watcher._changes
+    cursor.reset(0)
+
+    # id 2 所在的事务晚于 id 3 提交
+    FakeChanges.rows = [(1, "a", "update"), (3, "c", "update")]
+    watcher._poll_changes(None)
+    assert applied == [{"a", "c"}] and cursor.position == 3 and set(cursor.gaps) == {2}
+
+    FakeChanges.rows.append((2, "b", "update"))
+    applied.clear()
+    watcher._poll_changes(None)
+    assert applied == [{"b"}] and cursor.gaps == {}
+
+    # 一直未出现的 id（回滚、自增跳号）超时后不再补读
+    FakeChanges.rows.append((5, "d", "update"))
+    watcher._poll_changes(None)
+    assert set(cursor.gaps) == {4}
+    cursor.gap_timeout = -1
+    watcher._poll_changes(None)
+    assert cursor.gaps == {}
+
+
+def test_too_many_gaps_fall_back_to_reconcile(monkeypatch):
+    from generator import watcher as watcher_mod
+    watcher, _, _ = make_watcher(monkeypatch)
+    monkeypatch.setattr(watcher_mod, "MySQLPostChangeDAO", FakeChanges)
+    monkeypatch.setattr(watcher, "_apply_changes", lambda conn, cids: None)
+    cursor = watcher._changes
+    cursor.reset(0)
+    cursor.max_gaps = 10
+    FakeChanges.rows = [(100, "a", "update")]
+    watcher._poll_changes(None)
+    assert cursor.gaps == {} and cursor.needs_full(FakeChanges(None))
+
+
+def test_snapshot_restores_reference_graph_and_own_cursor(monkeypatch):
+    from generator import watcher as watcher_mod
+    snapshot = {"a": {"owner_id": 1, "signature": "d", "title": "A", "refs": frozenset({"b"})},
+                "b": {"owner_id": 1, "signature": "d", "title": "B"}}
+    monkeypatch.setattr(watcher_mod, "load_snapshot", lambda path, base: (7, snapshot, {}))
+    gen = MagicMock()
+    watcher = DBWatcher(gen, snapshot_path="snap", graph=ReferenceGraph())
+    assert watcher.load_snapshot()
+    assert watcher.graph.cited_by("b") == ["a"] and watcher.graph.orphans() == []
+    assert watcher.graph.changes is not watcher._changes and watcher._changes.position == 7
+    assert watcher.graph.driven
+
+    # 引用只保存在引用图中，落盘时由引用图写回快照
+    saved = {}
+    monkeypatch.setattr(watcher_mod, "save_snapshot", lambda path, base, cursor, snap, paths: saved.update(snap))
+    watcher.save_snapshot(force=True)
+    assert saved["a"]["refs"] == frozenset({"b"}) and "refs" not in saved["b"]
+    assert "refs" not in watcher._snapshot["a"]
+
+
+def test_reconcile_reloads_routes(monkeypatch):
+    from generator import watcher as watcher_mod
+    watcher, gen, _ = make_watcher(monkeypatch)
+    changes = MagicMock()
+    changes.get_bounds.return_value = (0, 5)
+    monkeypatch.setattr(watcher_mod, "MySQLPostChangeDAO", lambda conn: changes)
+    monkeypatch.setattr(watcher, "_get_current_state", lambda conn: {})
+    monkeypatch.setattr(watcher, "_get_refs", lambda conn: {})
+    watcher._reconcile(MagicMock())
+    gen.url_mgr.load_routes.assert_called_once_with()
+    assert watcher._changes.position == 5
+
+
+def test_pushed_events_wake_watcher_and_are_forwarded(monkeypatch):
+    from generator import watcher as watcher_mod
+    listener = ChangeListener("127.0.0.1", 0)
+    port = listener.sock.getsockname()[1]
+    monkeypatch.setitem(NOTIFY_CONFIG, "enabled", True)
+    monkeypatch.setitem(NOTIFY_CONFIG, "port", port)
+    # 兜底轮询间隔很长：事件必须靠推送唤醒 Watcher
+    monkeypatch.setitem(NOTIFY_CONFIG, "safety_interval", 30)
+    opened = []
+    monkeypatch.setattr(watcher_mod, "ChangeListener", lambda host, p: opened.append((host, p)) or listener)
+    invalidated = []
+    monkeypatch.setattr(watcher_mod, "invalidate_user", invalidated.append)
+
+    gen = MagicMock()
+    received = []
+    gen.url_mgr.handle_event.side_effect = received.append
+    watcher = DBWatcher(gen, snapshot_path=None, graph=ReferenceGraph())
+    scanned = threading.Event()
+    monkeypatch.setattr(watcher, "_scan", scanned.set)
+    thread = threading.Thread(target=watcher.start, daemon=True)
+    thread.start()
+    assert scanned.wait(5)
+
+    events.publish("url_mapping", "c1", "upsert", "/alice/One.html")
+    events.publish("user", "7", "update")
+    deadline = time.monotonic() + 5
+    while len(received) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert opened == [("127.0.0.1", port)]
+    assert [(e.kind, e.key, e.op, e.value) for e in received] == [
+        ("url_mapping", "c1", "upsert", "/alice/One.html"), ("user", "7", "update", None)]
+    assert invalidated == [7]
+
+    watcher.running = False
+    events.publish("post", "c1", "update")
+    thread.join(5)
+    assert not thread.is_alive()